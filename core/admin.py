@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Lecturer, Course, Student, Exam, ExamResult, CourseOutcome, ExamQuestionOutcome, UserLog
+from .models import Lecturer, Course, Student, Exam, ExamResult, CourseOutcome, ExamQuestionOutcome, UserLog, OcrJob, \
+    OcrTask, UploadSession, UploadedExamFile
+from .exam_statistics import rebuild_exam_statistics
 
 # Mevcut User modelini admin panelinden kaldır
 admin.site.unregister(User)
@@ -68,6 +70,13 @@ class ExamResultAdmin(admin.ModelAdmin):
     list_filter = ('exam__exam_type', 'exam__course')
     search_fields = ('student__student_number', 'student__full_name')
 
+    def delete_queryset(self, request, queryset):
+        # Toplu silme ExamResult.delete'i çağırmadığından istatistikler baştan hesaplanır
+        exam_ids = set(queryset.values_list('exam_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for exam_id in exam_ids:
+            rebuild_exam_statistics(exam_id)
+
 
 @admin.register(CourseOutcome)
 class CourseOutcomeAdmin(admin.ModelAdmin):
@@ -103,3 +112,36 @@ class UserLogAdmin(admin.ModelAdmin):
 
     def has_change_permission(self, request, obj=None):
         return False
+
+
+class OcrTaskInline(admin.TabularInline):
+    model = OcrTask
+    extra = 0
+    fields = ('file_path', 'page_number', 'status', 'student_number', 'exam_result', 'attempts', 'error')
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(OcrJob)
+class OcrJobAdmin(admin.ModelAdmin):
+    list_display = ('exam', 'lecturer', 'status', 'total_files', 'success_count', 'failure_count', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('exam__course__code',)
+    readonly_fields = ('roster_numbers', 'success_count', 'failure_count', 'finished_at')
+    inlines = (OcrTaskInline,)
+
+
+class UploadedExamFileInline(admin.TabularInline):
+    model = UploadedExamFile
+    extra = 0
+    fields = ('file_name', 'size', 'sha256', 'state', 'error', 'updated_at')
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('exam', 'lecturer', 'key', 'created_at', 'updated_at')
+    search_fields = ('key', 'exam__course__code')
+    readonly_fields = ('key', 'upload_path')
+    inlines = (UploadedExamFileInline,)
@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from .models import ExamResult
+
+PERCENTILES = (25, 50, 75)
+
+
+def _none_if_nan(value):
+    return None if np.isnan(value) else float(value)
+
+
+@dataclass
+class ScoreMatrix:
+    """Bir sınavın öğrenci x soru puan matrisi ve öğrenci bilgileri"""
+    student_numbers: np.ndarray  # (öğrenci,)
+    departments: np.ndarray  # (öğrenci,)
+    total_scores: np.ndarray  # (öğrenci,)
+    scores: np.ndarray  # (öğrenci, soru)
+    max_scores: np.ndarray  # (soru,) sorunun tam puanı
+
+    @property
+    def student_count(self):
+        return len(self.student_numbers)
+
+    def question_summary(self):
+        """
+        Her soru için ortalama, standart sapma, yüzdelikler, en düşük/en yüksek, sıfırdan farklı
+        en düşük puan ve başarı oranı. Tüm sorular tek seferde vektörel olarak hesaplanır.
+        """
+        question_count = self.scores.shape[1]
+        if self.student_count == 0:
+            empty = {'count': 0, 'avg_score': 0, 'std_dev': 0, 'percentile_25': None, 'median_score': None,
+                     'percentile_75': None, 'min_score': None, 'max_received_score': None,
+                     'min_non_zero_score': None, 'success_rate': 0}
+            return [
+                dict(empty, question_number=i + 1, question_score=float(self.max_scores[i]))
+                for i in range(question_count)
+            ]
+
+        means = self.scores.mean(axis=0)
+        stds = self.scores.std(axis=0)
+        percentiles = np.percentile(self.scores, PERCENTILES, axis=0)
+        mins = self.scores.min(axis=0)
+        maxs = self.scores.max(axis=0)
+        # Sıfır puanlar sonsuz yapılarak en düşük sıfırdan farklı puan tek min ile bulunur
+        non_zero_mins = np.where(self.scores > 0, self.scores, np.inf).min(axis=0)
+        non_zero_mins[np.isinf(non_zero_mins)] = np.nan
+        success_rates = np.divide(
+            means * 100, self.max_scores, out=np.zeros_like(means), where=self.max_scores > 0
+        )
+
+        return [
+            {
+                'question_number': i + 1,
+                'question_score': float(self.max_scores[i]),
+                'count': self.student_count,
+                'avg_score': float(means[i]),
+                'std_dev': float(stds[i]),
+                'percentile_25': float(percentiles[0][i]),
+                'median_score': float(percentiles[1][i]),
+                'percentile_75': float(percentiles[2][i]),
+                'min_score': float(mins[i]),
+                'max_received_score': float(maxs[i]),
+                'min_non_zero_score': _none_if_nan(non_zero_mins[i]),
+                'success_rate': float(success_rates[i]),
+            }
+            for i in range(question_count)
+        ]
+
+    def exam_summary(self):
+        """Toplam puanların ortalaması, standart sapması ve yüzdelikleri"""
+        if self.student_count == 0:
+            return {'count': 0, 'avg_score': 0, 'std_dev': 0, 'median_score': 0,
+                    'percentile_25': 0, 'percentile_75': 0}
+
+        percentiles = np.percentile(self.total_scores, PERCENTILES)
+        return {
+            'count': self.student_count,
+            'avg_score': float(self.total_scores.mean()),
+            'std_dev': float(self.total_scores.std()),
+            'percentile_25': float(percentiles[0]),
+            'median_score': float(percentiles[1]),
+            'percentile_75': float(percentiles[2]),
+        }
+
+    def student_summary(self):
+        """
+        Öğrenci başına soru başarı oranları (öğrenci x soru), toplam puan ve yüzdelik sıra
+        (toplam puanı kendisinden düşük öğrencilerin yüzdesi).
+        """
+        success_rates = np.divide(
+            self.scores * 100, self.max_scores,
+            out=np.zeros_like(self.scores), where=self.max_scores > 0
+        )
+        sorted_totals = np.sort(self.total_scores)
+        lower_counts = np.searchsorted(sorted_totals, self.total_scores, side='left')
+        percentile_ranks = lower_counts * 100 / self.student_count if self.student_count else lower_counts
+        return {
+            'student_numbers': self.student_numbers,
+            'total_scores': self.total_scores,
+            'success_rates': success_rates,
+            'percentile_ranks': percentile_ranks,
+        }
+
+    def department_average(self, department):
+        """Bölümdeki öğrencilerin toplam puan ortalaması ve öğrenci sayısı"""
+        mask = self.departments == department
+        count = int(mask.sum())
+        return (float(self.total_scores[mask].mean()) if count else 0), count
+
+
+def _build_score_array(question_scores, question_count):
+    try:
+        return np.array(question_scores, dtype=float).reshape(len(question_scores), question_count)
+    except (ValueError, TypeError):
+        # Soru sayısı sınavla uyuşmayan eski kayıtlarda eksik sorular 0 sayılır
+        scores = np.zeros((len(question_scores), question_count))
+        for row, values in enumerate(question_scores):
+            values = [float(value) for value in (values or [])[:question_count]]
+            scores[row, :len(values)] = values
+        return scores
+
+
+def load_score_matrix(exam):
+    """Sınavın tüm sonuçlarını tek bir values_list sorgusuyla matrise yükler"""
+    rows = list(
+        ExamResult.objects.filter(exam=exam)
+        .values_list('student__student_number', 'student__department', 'total_score', 'question_scores')
+    )
+    max_scores = np.array(exam.question_scores or [0] * exam.question_count, dtype=float)
+    question_count = len(max_scores)
+
+    if not rows:
+        return ScoreMatrix(
+            student_numbers=np.array([], dtype=object),
+            departments=np.array([], dtype=object),
+            total_scores=np.zeros(0),
+            scores=np.zeros((0, question_count)),
+            max_scores=max_scores
+        )
+
+    student_numbers, departments, total_scores, question_scores = zip(*rows)
+    return ScoreMatrix(
+        student_numbers=np.array(student_numbers, dtype=object),
+        departments=np.array(departments, dtype=object),
+        total_scores=np.array(total_scores, dtype=float),
+        scores=_build_score_array(question_scores, question_count),
+        max_scores=max_scores
+    )
@@ -0,0 +1,159 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import List, Optional
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .exam_statistics import update_exam_statistics
+from .models import ExamResult, QuestionScore, Student
+
+
+@dataclass
+class ExamResultRow:
+    student_number: str
+    question_scores: list
+    total_score: Optional[float] = None  # Verilmezse soru puanlarının toplamı kullanılır
+
+
+@dataclass
+class ExamResultRowError:
+    index: int
+    student_number: str
+    message: str
+
+
+@dataclass
+class BulkWriteResult:
+    results: list = field(default_factory=list)  # Satır sırasıyla ExamResult, hatalı satırlar için None
+    errors: List[ExamResultRowError] = field(default_factory=list)
+
+    @property
+    def written_count(self):
+        return sum(1 for result in self.results if result is not None)
+
+
+def validate_exam_result(exam_result):
+    """
+    ExamResult.clean kurallarını ve alan doğrulamalarını veritabanına gitmeden çalıştırır.
+    Yabancı anahtarlar ve (sınav, öğrenci) tekilliği toplu yazıcı tarafından kontrol edilir.
+    """
+    exam_result.clean_fields(exclude=['exam', 'student'])
+    exam_result.clean()
+
+
+def build_question_scores(exam_result):
+    """Sonucun JSON soru puanlarından QuestionScore satırlarını oluşturur (kaydetmez)"""
+    return [
+        QuestionScore(
+            exam_result_id=exam_result.pk,
+            exam_id=exam_result.exam_id,
+            question_number=number,
+            score=Decimal(str(score)).quantize(Decimal('0.01'))
+        )
+        for number, score in enumerate(exam_result.question_scores or [], start=1)
+    ]
+
+
+def sync_question_scores(exam_results, batch_size=500):
+    """Kaydedilmiş sonuçların QuestionScore satırlarını JSON alanıyla eşitler"""
+    QuestionScore.objects.filter(exam_result_id__in=[r.pk for r in exam_results]).delete()
+    QuestionScore.objects.bulk_create(
+        [row for exam_result in exam_results for row in build_question_scores(exam_result)],
+        batch_size=batch_size
+    )
+
+
+def write_exam_results(exam, rows, update_conflicts=False, batch_size=500):
+    """
+    Bir sınavın sonuçlarını toplu olarak yazar.
+    Öğrenciler tek sorguda bulunur, doğrulama bellekte yapılır ve geçerli satırlar tek
+    bulk_create ile eklenir; soru puanı satırları ve sınav istatistikleri aynı transaction
+    içinde güncellenir.
+    update_conflicts seçiliyse öğrencinin bu sınavda mevcut sonucu güncellenir, seçili
+    değilse satır hatalı sayılır.
+    Hatalı satırlar yazılmaz ve satır numarasıyla birlikte errors listesinde döner.
+    """
+    result = BulkWriteResult(results=[None] * len(rows))
+    students = Student.objects.in_bulk(
+        {row.student_number for row in rows if row.student_number},
+        field_name='student_number'
+    )
+    existing_student_ids = set()
+    if not update_conflicts:
+        existing_student_ids = set(
+            ExamResult.objects.filter(exam=exam, student__in=students.values()).values_list('student_id', flat=True)
+        )
+
+    def add_error(index, row, message):
+        result.errors.append(ExamResultRowError(index, row.student_number, message))
+
+    pending = []
+    seen_numbers = set()
+    for index, row in enumerate(rows):
+        student = students.get(row.student_number)
+        if student is None:
+            add_error(index, row, f"Öğrenci bulunamadı: {row.student_number}")
+            continue
+        if row.student_number in seen_numbers:
+            add_error(index, row, f"Öğrenci listede birden fazla kez geçiyor: {row.student_number}")
+            continue
+        seen_numbers.add(row.student_number)
+        if student.id in existing_student_ids:
+            add_error(index, row, f"Öğrencinin bu sınavda zaten sonucu var: {row.student_number}")
+            continue
+
+        try:
+            exam_result = ExamResult(
+                exam=exam,
+                student=student,
+                total_score=row.total_score if row.total_score is not None else sum(row.question_scores or []),
+                question_scores=row.question_scores
+            )
+            validate_exam_result(exam_result)
+        except ValidationError as e:
+            add_error(index, row, '; '.join(e.messages))
+            continue
+        except TypeError:
+            add_error(index, row, "Her bir soru puanı sayısal bir değer olmalıdır.")
+            continue
+        pending.append((index, exam_result))
+
+    if not pending:
+        return result
+
+    exam_results = [exam_result for _, exam_result in pending]
+    options = {}
+    if update_conflicts:
+        options = {
+            'update_conflicts': True,
+            'unique_fields': ['exam', 'student'],
+            'update_fields': ['total_score', 'question_scores'],
+        }
+
+    with transaction.atomic():
+        # Güncellenecek sonuçların eski puanları istatistiklerden çıkarılır
+        previous = []
+        if update_conflicts:
+            previous = list(
+                ExamResult.objects.filter(exam=exam, student_id__in=[r.student_id for r in exam_results])
+                .only('total_score', 'question_scores')
+            )
+        ExamResult.objects.bulk_create(exam_results, batch_size=batch_size, **options)
+        update_exam_statistics(exam.id, added=exam_results, removed=previous)
+
+        # Veritabanı eklenen kayıtların id'lerini döndürmüyorsa tekrar sorgulanır
+        missing_ids = [exam_result.student_id for exam_result in exam_results if exam_result.pk is None]
+        if missing_ids:
+            ids = dict(
+                ExamResult.objects.filter(exam=exam, student_id__in=missing_ids).values_list('student_id', 'id')
+            )
+            for exam_result in exam_results:
+                if exam_result.pk is None:
+                    exam_result.pk = ids.get(exam_result.student_id)
+
+        sync_question_scores(exam_results, batch_size=batch_size)
+
+    for index, exam_result in pending:
+        result.results[index] = exam_result
+    return result
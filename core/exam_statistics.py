@@ -0,0 +1,135 @@
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min
+
+from .models import ExamResult, ExamStatistics, QuestionScore, QuestionStatistics
+
+# get_question_score_aggregates'in soru başına hesapladığı yüzdelikler
+PERCENTILES = (25, 50, 75)
+
+
+def _add_result(exam_stats, question_stats, exam_id, total_score, question_scores):
+    exam_stats.add_score(total_score)
+    for number, score in enumerate(question_scores or [], start=1):
+        if number not in question_stats:
+            question_stats[number] = QuestionStatistics(exam_id=exam_id, question_number=number)
+        question_stats[number].add_score(score)
+
+
+def rebuild_exam_statistics(exam_id):
+    """Sınavın istatistiklerini tüm sonuçlarından baştan hesaplar"""
+    with transaction.atomic():
+        exam_stats, _ = ExamStatistics.objects.select_for_update().get_or_create(exam_id=exam_id)
+        exam_stats.reset()
+        question_stats = {}
+        results = ExamResult.objects.filter(exam_id=exam_id).values_list('total_score', 'question_scores')
+        for total_score, question_scores in results.iterator():
+            _add_result(exam_stats, question_stats, exam_id, total_score, question_scores)
+
+        exam_stats.save()
+        QuestionStatistics.objects.filter(exam_id=exam_id).delete()
+        QuestionStatistics.objects.bulk_create(question_stats.values())
+    return exam_stats
+
+
+def update_exam_statistics(exam_id, added=(), removed=()):
+    """
+    Eklenen ve silinen sonuçları (total_score ve question_scores alanları olan nesneler)
+    sınav istatistiklerine işler. Sonuçlar veritabanına yazıldıktan sonra çağrılmalıdır.
+    İstatistik henüz hiç hesaplanmadıysa ya da en düşük/en yüksek puanlardan biri silindiyse
+    istatistikler baştan hesaplanır.
+    """
+    if not added and not removed:
+        return None
+
+    with transaction.atomic():
+        exam_stats = ExamStatistics.objects.select_for_update().filter(exam_id=exam_id).first()
+        if exam_stats is None:
+            return rebuild_exam_statistics(exam_id)
+
+        question_stats = {stat.question_number: stat for stat in QuestionStatistics.objects.filter(exam_id=exam_id)}
+        existing_numbers = set(question_stats)
+
+        for result in removed:
+            if not exam_stats.remove_score(result.total_score):
+                return rebuild_exam_statistics(exam_id)
+            for number, score in enumerate(result.question_scores or [], start=1):
+                if number not in question_stats or not question_stats[number].remove_score(score):
+                    return rebuild_exam_statistics(exam_id)
+
+        for result in added:
+            _add_result(exam_stats, question_stats, exam_id, result.total_score, result.question_scores)
+
+        exam_stats.save()
+        fields = ['count', 'score_sum', 'score_sum_sq', 'min_score', 'max_score', 'min_non_zero_score', 'histogram']
+        QuestionStatistics.objects.bulk_update(
+            [stat for number, stat in question_stats.items() if number in existing_numbers], fields
+        )
+        QuestionStatistics.objects.bulk_create(
+            [stat for number, stat in question_stats.items() if number not in existing_numbers]
+        )
+    return exam_stats
+
+
+def get_question_statistics(exams):
+    """
+    Sınav id -> soru numarasına göre sıralı QuestionStatistics listesi döndürür.
+    Yalnızca okur; istatistikler sonuçlar yazılırken güncellenir (eski kayıtlar 0019 göçüyle hesaplandı).
+    """
+    exam_ids = [exam.id for exam in exams]
+    statistics = {exam_id: [] for exam_id in exam_ids}
+    for stat in QuestionStatistics.objects.filter(exam_id__in=exam_ids).order_by('exam_id', 'question_number'):
+        statistics[stat.exam_id].append(stat)
+    return statistics
+
+
+def _score_percentile(exam, question_number, count, percentile):
+    """
+    Sorunun puanlarının yüzdeliği (numpy.percentile gibi doğrusal ara değer).
+    (exam, question_number, score) indeksi üzerinde sıralı OFFSET sorgusuyla yalnızca
+    gereken bir ya da iki puan okunur.
+    """
+    position = (count - 1) * percentile / 100
+    lower = int(position)
+    values = list(
+        QuestionScore.objects.filter(exam=exam, question_number=question_number)
+        .order_by('score').values_list('score', flat=True)[lower:lower + 2]
+    )
+    if len(values) == 1 or position == lower:
+        return float(values[0])
+    return float(values[0]) + (float(values[1]) - float(values[0])) * (position - lower)
+
+
+def get_question_score_aggregates(exam):
+    """
+    Soru bazlı öğrenci sayısı, ortalama, en düşük ve en yüksek puanı ve PERCENTILES yüzdeliklerini
+    (percentile_25, ...) QuestionScore üzerinden SQL ile hesaplar. Yüzdelikler soru ve yüzdelik
+    başına bir sorgudur.
+    """
+    rows = list(
+        QuestionScore.objects.filter(exam=exam)
+        .values('question_number')
+        .annotate(count=Count('id'), avg_score=Avg('score'), min_score=Min('score'), max_score=Max('score'))
+        .order_by('question_number')
+    )
+    for row in rows:
+        for percentile in PERCENTILES:
+            row[f'percentile_{percentile}'] = _score_percentile(
+                exam, row['question_number'], row['count'], percentile
+            )
+    return rows
+
+
+def get_question_success_rates(exam):
+    """
+    Soru numarası -> ortalama başarı yüzdesi. Ortalamalar get_question_score_aggregates ile SQL'de
+    hesaplanır; kazanım başarıları bu oranların katkı yüzdeleriyle toplanmasıyla bulunur.
+    """
+    max_scores = exam.question_scores or []
+    success_rates = {}
+    for row in get_question_score_aggregates(exam):
+        number = row['question_number']
+        if number > len(max_scores) or not row['count']:
+            continue
+        max_score = max_scores[number - 1]
+        success_rates[number] = float(row['avg_score']) / max_score * 100 if max_score > 0 else 0
+    return success_rates
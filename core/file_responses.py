@@ -0,0 +1,103 @@
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from .exports import STREAM_CHUNK_SIZE
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _iter_range(path, start, length, chunk_size=STREAM_CHUNK_SIZE):
+    """Dosyanın start baytından başlayan length baytını parça parça okur"""
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def parse_range(header, size):
+    """
+    Tek aralıklı "bytes=başlangıç-bitiş" başlığını (başlangıç, bitiş) olarak döndürür, bitiş dahildir.
+    Başlık yoksa, geçersizse ya da birden fazla aralık içeriyorsa None döner ve dosyanın tamamı gönderilir.
+    Aralık dosya boyutunun dışındaysa ValueError yükseltir (416).
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # "bytes=-500": son 500 bayt
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise ValueError(header)
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    """If-Range yoksa ya da dosya değişmemişse True; aksi halde aralık yok sayılıp dosyanın tamamı gönderilir"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def ranged_file_response(request, path, content_type, filename=None, as_attachment=False):
+    """
+    Dosyayı belleğe almadan gönderen yanıt. ETag ve Last-Modified başlıklarıyla koşullu GET (304/412),
+    Range başlığıyla kısmi içerik (206) ve geçersiz aralıklar için 416 döndürür.
+    ETag dosya boyutu ve değişiklik zamanından üretildiğinden dosya değişince önbellek geçersizleşir.
+    Dosya yoksa FileNotFoundError yükseltir.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+
+    def set_headers(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        # Sınav kağıtları kişisel veri: yalnızca tarayıcıda saklanır ve her kullanımda ETag ile doğrulanır
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        return set_headers(conditional)
+
+    byte_range = None
+    if request.method in ('GET', 'HEAD') and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return set_headers(response)
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type,
+                                as_attachment=as_attachment, filename=filename or '')
+        return set_headers(response)
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(_iter_range(path, start, length), status=206, content_type=content_type)
+    response['Content-Length'] = length
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    if filename:
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return set_headers(response)
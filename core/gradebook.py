@@ -0,0 +1,73 @@
+from itertools import groupby
+
+from .models import Exam, ExamResult
+
+GRADEBOOK_FORMATS = ('xlsx', 'csv')
+
+
+def get_gradebook_exams(course_code=None, semester=None):
+    exams = Exam.objects.all()
+    if course_code:
+        exams = exams.filter(course__code=course_code)
+    if semester:
+        exams = exams.filter(semester=semester)
+    return exams
+
+
+def get_gradebook_columns(exams):
+    """
+    Not defterinin sütunları ve her sınav türü için (ilk sütun, soru sayısı).
+    Her sınav türü (Vize, Final, ...) için toplam puan ve seçilen sınavlardaki en fazla soru
+    sayısı kadar soru sütunu bulunur; böylece tüm dersler aynı başlığı paylaşır.
+    """
+    question_counts = {}
+    for exam_type, question_count in exams.values_list('exam_type', 'question_count'):
+        question_counts[exam_type] = max(question_counts.get(exam_type, 0), question_count)
+
+    columns = ['Ders Kodu', 'Dönem', 'Öğrenci No', 'Ad Soyad']
+    offsets = {}
+    for exam_type, label in Exam.EXAM_TYPE_CHOICES:
+        if exam_type not in question_counts:
+            continue
+        offsets[exam_type] = (len(columns), question_counts[exam_type])
+        columns.append(f'{label} Toplam')
+        columns.extend(f'{label} S{number}' for number in range(1, question_counts[exam_type] + 1))
+    return columns, offsets
+
+
+def iter_gradebook_rows(exams, columns, offsets):
+    """
+    Her (ders, dönem, öğrenci) için tek bir geniş satır üretir. Tüm sonuçlar tek bir sıralı
+    sorguyla iterator() üzerinden okunur ve ardışık satırlar birleştirilir; bellekte yalnızca
+    o anki öğrencinin satırı tutulur.
+    """
+    semesters = dict(Exam.SEMESTER_CHOICES)
+    results = (
+        ExamResult.objects.filter(exam__in=exams)
+        .order_by('exam__course__code', 'exam__semester', 'student__student_number')
+        .values_list('exam__course__code', 'exam__semester', 'student__student_number', 'student__full_name',
+                     'exam__exam_type', 'total_score', 'question_scores')
+        .iterator(chunk_size=2000)
+    )
+    for (course_code, semester, student_number, full_name), student_results in groupby(
+            results, key=lambda result: result[:4]):
+        row = [course_code, semesters.get(semester, semester), student_number, full_name]
+        row.extend([None] * (len(columns) - len(row)))
+        for *_, exam_type, total_score, question_scores in student_results:
+            offset, question_count = offsets[exam_type]
+            row[offset] = total_score
+            for number, score in enumerate((question_scores or [])[:question_count], start=1):
+                row[offset + number] = score
+        yield row
+
+
+def get_gradebook(course_code=None, semester=None):
+    """Seçilen ders/dönem için (başlıklar, satır üreteci) döndürür; ikisi de verilmezse tüm fakülte"""
+    exams = get_gradebook_exams(course_code, semester)
+    columns, offsets = get_gradebook_columns(exams)
+    return columns, iter_gradebook_rows(exams, columns, offsets)
+
+
+def get_gradebook_filename(course_code=None, semester=None, file_format='xlsx'):
+    parts = ['not_defteri', course_code, semester]
+    return '_'.join(part for part in parts if part) + f'.{file_format}'
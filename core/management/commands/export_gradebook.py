@@ -0,0 +1,44 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import write_xlsx
+from core.gradebook import GRADEBOOK_FORMATS, get_gradebook
+from core.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Sınav sonuçlarını öğrenci x sınav x soru biçiminde geniş bir not defteri olarak (.xlsx veya .csv) dışa aktarır"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Çıktı dosyası (.xlsx veya .csv)')
+        parser.add_argument('--course', help='Yalnızca bu ders kodu')
+        parser.add_argument('--semester', choices=[value for value, _ in Exam.SEMESTER_CHOICES],
+                            help='Yalnızca bu dönem')
+        parser.add_argument('--format', choices=GRADEBOOK_FORMATS,
+                            help='Dosya biçimi (varsayılan: dosya uzantısından)')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        file_format = options['format'] or output.rsplit('.', 1)[-1].lower()
+        if file_format not in GRADEBOOK_FORMATS:
+            raise CommandError('Dosya biçimi .xlsx veya .csv olmalıdır.')
+
+        columns, rows = get_gradebook(options['course'], options['semester'])
+        row_count = 0
+
+        def counted(rows):
+            nonlocal row_count
+            for row in rows:
+                row_count += 1
+                yield row
+
+        if file_format == 'csv':
+            with open(output, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(counted(rows))
+        else:
+            write_xlsx(output, [('Not Defteri', columns, counted(rows))])
+
+        self.stdout.write(self.style.SUCCESS(f'{row_count} öğrenci satırı {output} dosyasına yazıldı.'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.snapshots import SNAPSHOT_FORMATS, SNAPSHOT_TABLES, SnapshotError, export_snapshot
+
+
+class Command(BaseCommand):
+    help = ("Öğrenci, sınav, sınav sonucu ve soru kazanımı tablolarını çevrimdışı analiz için "
+            "Parquet/Feather dosyalarına artımlı olarak aktarır (pyarrow gerekir)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Anlık görüntü klasörü; her tablo ayrı bir alt klasöre yazılır')
+        parser.add_argument('--format', choices=SNAPSHOT_FORMATS, default='parquet', help='Dosya biçimi')
+        parser.add_argument('--table', action='append', choices=list(SNAPSHOT_TABLES), dest='tables',
+                            help='Yalnızca bu tablo (birden fazla kez verilebilir)')
+        parser.add_argument('--full', action='store_true',
+                            help='Son aktarımdan bağımsız olarak tüm kayıtları yeniden aktar')
+
+    def handle(self, *args, **options):
+        try:
+            counts = export_snapshot(
+                options['output_dir'],
+                tables=options['tables'],
+                file_format=options['format'],
+                full=options['full']
+            )
+        except SnapshotError as e:
+            raise CommandError(str(e))
+
+        for table, row_count in counts.items():
+            self.stdout.write(f'{table}: {row_count} kayıt')
+        self.stdout.write(self.style.SUCCESS(f"Anlık görüntü {options['output_dir']} klasörüne yazıldı."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Course
+from core.rosters import RosterError, import_roster, read_roster
+
+
+class Command(BaseCommand):
+    help = "Öğrenci listesini ('Öğrenci No', 'Ad Soyad' sütunlu .xlsx veya .csv) toplu olarak içe aktarır"
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Öğrenci listesi (.xlsx veya .csv)')
+        parser.add_argument('--course', help='Öğrencilerin bağlanacağı ders kodu')
+
+    def handle(self, *args, **options):
+        course = None
+        if options['course']:
+            try:
+                course = Course.objects.get(code=options['course'])
+            except Course.DoesNotExist:
+                raise CommandError(f"Ders bulunamadı: {options['course']}")
+
+        try:
+            result = import_roster(read_roster(options['file']), course=course)
+        except (RosterError, OSError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(result.student_numbers)} öğrenci okundu: {result.created_count} yeni, '
+            f'{result.existing_count} mevcut.'
+        ))
+        if course:
+            self.stdout.write(f'{result.linked_count} öğrenci {course.code} dersine bağlandı.')
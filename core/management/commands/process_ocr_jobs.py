@@ -0,0 +1,62 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core.ocr_jobs import finalize_jobs, requeue_stale_tasks, run_pending_tasks
+
+logger = logging.getLogger('user_actions')
+
+
+class Command(BaseCommand):
+    help = 'Kuyruktaki OCR görevlerini işler (sınav yükleme sonrası arka plan worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Kuyruk boşaldığında beklemeden çık')
+        parser.add_argument('--batch-size', type=int, default=settings.OCR_MAX_WORKERS * settings.OCR_BATCH_SIZE,
+                            help='Tek seferde sahiplenilecek görev sayısı')
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help='Kuyruk boşken bekleme süresi (saniye)')
+        parser.add_argument('--stale-seconds', type=int, default=600,
+                            help='Bu süreden uzun RUNNING kalan görevler tekrar kuyruğa alınır')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('OCR worker başlatıldı.'))
+
+        try:
+            while True:
+                try:
+                    processed = self.run_once(options)
+                except Exception as e:
+                    # Tek bir turdaki hata (ör. veritabanı bağlantısı) worker'ı durdurmaz
+                    logger.exception(f"OCR worker hatası: {str(e)}")
+                    self.stderr.write(f'OCR worker hatası: {str(e)}')
+                    close_old_connections()
+                    if options['once']:
+                        raise CommandError(str(e))
+                    time.sleep(options['sleep'])
+                    continue
+
+                if processed:
+                    self.stdout.write(f'{processed} görev işlendi.')
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('OCR worker durduruldu.'))
+            return
+
+        self.stdout.write(self.style.SUCCESS('Kuyrukta bekleyen görev kalmadı.'))
+
+    def run_once(self, options):
+        requeued = requeue_stale_tasks(options['stale_seconds'])
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'{requeued} yarım kalan görev tekrar kuyruğa alındı.'))
+
+        processed = run_pending_tasks(options['batch_size'], max_workers=settings.OCR_MAX_WORKERS)
+        finalize_jobs()
+        return processed
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+import exam_parser
+from core.ocr_jobs import get_ocr_cache
+
+
+class Command(BaseCommand):
+    help = 'OCR önbelleğindeki metinleri Vision çağrısı yapmadan güncel ayrıştırıcıyla yeniden ayrıştırır'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Önbelleği güncellemeden yalnızca değişecek kayıtları say')
+
+    def handle(self, *args, **options):
+        cache = get_ocr_cache()
+        if not cache:
+            raise CommandError('OCR önbelleği kapalı (OCR_CACHE_ENABLED).')
+
+        started = time.monotonic()
+        total_count = 0
+        changed_count = 0
+
+        for key in cache.keys():
+            # Kayıtlar tahliye sırası değişmesin diye son kullanım zamanına dokunulmadan okunur ve yazılır
+            last_used = cache.last_used(key)
+            entry = cache.get(key, touch=False)
+            if not entry:
+                continue
+            total_count += 1
+
+            parsed = exam_parser.parse_exam_text(entry['text']).to_dict()
+            del parsed['course_code'], parsed['semester']
+            if parsed == entry.get('parsed') and entry.get('parser_version') == exam_parser.PARSER_VERSION:
+                continue
+
+            changed_count += 1
+            if not options['dry_run']:
+                cache.set(key, entry['text'], parsed, last_used=last_used)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_count} OCR metni {elapsed:.2f} saniyede ayrıştırıldı, {changed_count} kaydın sonucu değişti.'
+        ))
@@ -0,0 +1,62 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_student_department'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userlog',
+            name='action',
+            field=models.CharField(choices=[('LOGIN', 'Giriş Yapıldı'), ('LOGOUT', 'Çıkış Yapıldı'), ('EXAM_UPLOAD', 'Sınav Yüklendi'), ('STUDENT_ADD', 'Öğrenci Eklendi'), ('OUTCOME_ADD', 'Kazanım Eklendi'), ('VIEW_REPORT', 'Rapor Görüntülendi'), ('EXAM_RESULT_MANUAL', 'Manuel Sınav Sonucu Girildi')], max_length=50, verbose_name='Eylem'),
+        ),
+        migrations.CreateModel(
+            name='OcrJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Bekliyor'), ('RUNNING', 'İşleniyor'), ('DONE', 'Tamamlandı')], default='PENDING', max_length=10, verbose_name='Durum')),
+                ('roster_numbers', models.JSONField(blank=True, default=list, verbose_name='Listedeki Öğrenci Numaraları')),
+                ('total_files', models.PositiveIntegerField(default=0, verbose_name='Dosya Sayısı')),
+                ('success_count', models.PositiveIntegerField(default=0, verbose_name='Başarılı')),
+                ('failure_count', models.PositiveIntegerField(default=0, verbose_name='Başarısız')),
+                ('is_reported', models.BooleanField(default=False, verbose_name='Sonuç Bildirildi mi?')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Bitiş Zamanı')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.exam', verbose_name='Sınav')),
+                ('lecturer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.lecturer', verbose_name='Yükleyen')),
+            ],
+            options={
+                'verbose_name': 'OCR İşi',
+                'verbose_name_plural': 'OCR İşleri',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OcrTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_path', models.CharField(max_length=500, verbose_name='Dosya Yolu')),
+                ('status', models.CharField(choices=[('PENDING', 'Bekliyor'), ('RUNNING', 'İşleniyor'), ('DONE', 'Tamamlandı'), ('FAILED', 'Başarısız')], default='PENDING', max_length=10, verbose_name='Durum')),
+                ('student_number', models.CharField(blank=True, max_length=20, null=True, verbose_name='Okunan Öğrenci No')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='OCR Sonucu')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Hata')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Deneme Sayısı')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Kilitlenme Zamanı')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Bitiş Zamanı')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='core.ocrjob', verbose_name='OCR İşi')),
+            ],
+            options={
+                'verbose_name': 'OCR Görevi',
+                'verbose_name_plural': 'OCR Görevleri',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'locked_at'], name='core_ocrtas_status_a0f86b_idx')],
+            },
+        ),
+    ]
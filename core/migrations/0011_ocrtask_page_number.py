@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_ocrjob_ocrtask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrtask',
+            name='exam_result',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ocr_tasks', to='core.examresult', verbose_name='Sınav Sonucu'),
+        ),
+        migrations.AddField(
+            model_name='ocrtask',
+            name='page_number',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Sayfa No'),
+        ),
+    ]
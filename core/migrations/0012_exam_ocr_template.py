@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_ocrtask_page_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='ocr_template',
+            field=models.CharField(blank=True, choices=[('', 'Ön işleme yok'), ('standart', 'Eğiklik düzeltme + küçültme'), ('ust_bolum', 'Eğiklik düzeltme + üst bölüm (başlık ve puan tablosu)')], default='', max_length=20, verbose_name='OCR Ön İşleme Şablonu'),
+        ),
+    ]
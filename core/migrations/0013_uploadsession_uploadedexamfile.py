@@ -0,0 +1,63 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_exam_ocr_template'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadedExamFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255, verbose_name='Dosya Adı')),
+                ('file_path', models.CharField(max_length=500, verbose_name='Dosya Yolu')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Boyut')),
+                ('sha256', models.CharField(blank=True, default='', max_length=64, verbose_name='SHA-256')),
+                ('state', models.CharField(choices=[('PENDING', 'Yükleniyor'), ('STORED', 'Kaydedildi'), ('OCR_DONE', 'OCR Yapıldı'), ('PARSED', 'Ayrıştırıldı'), ('PERSISTED', 'Sonuç Kaydedildi')], default='PENDING', max_length=10, verbose_name='Durum')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Hata')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Yüklenen Dosya',
+                'verbose_name_plural': 'Yüklenen Dosyalar',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='ocrtask',
+            name='uploaded_file',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ocr_tasks', to='core.uploadedexamfile', verbose_name='Yüklenen Dosya'),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Oturum Anahtarı')),
+                ('upload_path', models.CharField(max_length=500, verbose_name='Yükleme Klasörü')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='core.exam', verbose_name='Sınav')),
+                ('lecturer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.lecturer', verbose_name='Yükleyen')),
+            ],
+            options={
+                'verbose_name': 'Yükleme Oturumu',
+                'verbose_name_plural': 'Yükleme Oturumları',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='uploadedexamfile',
+            name='session',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='core.uploadsession', verbose_name='Yükleme Oturumu'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='uploadedexamfile',
+            unique_together={('session', 'file_name')},
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_uploadsession_uploadedexamfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrjob',
+            name='is_open',
+            field=models.BooleanField(default=False, verbose_name='Yükleme Sürüyor mu?'),
+        ),
+        migrations.AddField(
+            model_name='ocrjob',
+            name='upload_session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ocr_jobs', to='core.uploadsession', verbose_name='Yükleme Oturumu'),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='split_pages',
+            field=models.BooleanField(default=False, verbose_name='Toplu Tarama'),
+        ),
+    ]
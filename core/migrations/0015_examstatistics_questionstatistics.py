@@ -0,0 +1,54 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_ocrjob_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Öğrenci Sayısı')),
+                ('score_sum', models.FloatField(default=0, verbose_name='Puan Toplamı')),
+                ('score_sum_sq', models.FloatField(default=0, verbose_name='Puan Kareleri Toplamı')),
+                ('min_score', models.FloatField(blank=True, null=True, verbose_name='En Düşük Puan')),
+                ('max_score', models.FloatField(blank=True, null=True, verbose_name='En Yüksek Puan')),
+                ('min_non_zero_score', models.FloatField(blank=True, null=True, verbose_name='Sıfırdan Farklı En Düşük Puan')),
+                ('histogram', models.JSONField(blank=True, default=dict, verbose_name='Puan Dağılımı')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='core.exam', verbose_name='Sınav')),
+            ],
+            options={
+                'verbose_name': 'Sınav İstatistiği',
+                'verbose_name_plural': 'Sınav İstatistikleri',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Öğrenci Sayısı')),
+                ('score_sum', models.FloatField(default=0, verbose_name='Puan Toplamı')),
+                ('score_sum_sq', models.FloatField(default=0, verbose_name='Puan Kareleri Toplamı')),
+                ('min_score', models.FloatField(blank=True, null=True, verbose_name='En Düşük Puan')),
+                ('max_score', models.FloatField(blank=True, null=True, verbose_name='En Yüksek Puan')),
+                ('min_non_zero_score', models.FloatField(blank=True, null=True, verbose_name='Sıfırdan Farklı En Düşük Puan')),
+                ('histogram', models.JSONField(blank=True, default=dict, verbose_name='Puan Dağılımı')),
+                ('question_number', models.PositiveIntegerField(verbose_name='Soru Numarası')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_statistics', to='core.exam', verbose_name='Sınav')),
+            ],
+            options={
+                'verbose_name': 'Soru İstatistiği',
+                'verbose_name_plural': 'Soru İstatistikleri',
+                'ordering': ['question_number'],
+                'unique_together': {('exam', 'question_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_examstatistics_questionstatistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_number', models.PositiveIntegerField(verbose_name='Soru Numarası')),
+                ('score', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Puan')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.exam', verbose_name='Sınav')),
+                ('exam_result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_score_rows', to='core.examresult', verbose_name='Sınav Sonucu')),
+            ],
+            options={
+                'verbose_name': 'Soru Puanı',
+                'verbose_name_plural': 'Soru Puanları',
+                'indexes': [models.Index(fields=['exam', 'question_number', 'score'], name='core_questi_exam_id_e8811f_idx')],
+                'unique_together': {('exam_result', 'question_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:16
+
+from decimal import Decimal
+
+from django.db import migrations
+
+
+def backfill_question_scores(apps, schema_editor):
+    """Mevcut sonuçların JSON soru puanlarından QuestionScore satırlarını oluşturur"""
+    ExamResult = apps.get_model('core', 'ExamResult')
+    QuestionScore = apps.get_model('core', 'QuestionScore')
+
+    rows = []
+    results = ExamResult.objects.values_list('id', 'exam_id', 'question_scores').order_by('id')
+    for result_id, exam_id, question_scores in results.iterator(chunk_size=2000):
+        if not isinstance(question_scores, list):
+            continue
+        for number, score in enumerate(question_scores, start=1):
+            if not isinstance(score, (int, float)):
+                continue
+            rows.append(QuestionScore(
+                exam_result_id=result_id,
+                exam_id=exam_id,
+                question_number=number,
+                score=Decimal(str(score)).quantize(Decimal('0.01'))
+            ))
+        if len(rows) >= 5000:
+            QuestionScore.objects.bulk_create(rows)
+            rows = []
+    QuestionScore.objects.bulk_create(rows)
+
+
+def clear_question_scores(apps, schema_editor):
+    apps.get_model('core', 'QuestionScore').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_questionscore'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_question_scores, clear_question_scores),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_backfill_questionscore'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['-created_at'], name='core_exam_created_3bb463_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['-exam_date'], name='core_exam_exam_da_9f1d6a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['semester', '-exam_date'], name='core_exam_semeste_092187_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exampaper',
+            index=models.Index(fields=['student', '-upload_date'], name='core_exampa_student_166ba4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['department'], name='core_studen_departm_036017_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userlog',
+            index=models.Index(fields=['-created_at'], name='core_userlo_created_17797d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userlog',
+            index=models.Index(fields=['user', 'action'], name='core_userlo_user_id_cbcc54_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:10
+
+from django.db import migrations
+
+
+def _add_score(stats, score):
+    """ScoreStatistics.add_score ile aynı; geçmiş modellerde model metotları bulunmaz"""
+    score = float(score)
+    stats.count += 1
+    stats.score_sum += score
+    stats.score_sum_sq += score * score
+    stats.min_score = score if stats.min_score is None else min(stats.min_score, score)
+    stats.max_score = score if stats.max_score is None else max(stats.max_score, score)
+    if score > 0:
+        stats.min_non_zero_score = score if stats.min_non_zero_score is None else min(stats.min_non_zero_score, score)
+    bucket = str(int(score))
+    stats.histogram[bucket] = stats.histogram.get(bucket, 0) + 1
+
+
+def backfill_exam_statistics(apps, schema_editor):
+    """İstatistikleri henüz hesaplanmamış sınavların istatistiklerini sonuçlarından hesaplar"""
+    Exam = apps.get_model('core', 'Exam')
+    ExamResult = apps.get_model('core', 'ExamResult')
+    ExamStatistics = apps.get_model('core', 'ExamStatistics')
+    QuestionStatistics = apps.get_model('core', 'QuestionStatistics')
+
+    for exam_id in Exam.objects.filter(statistics__isnull=True).values_list('id', flat=True).iterator():
+        exam_stats = ExamStatistics(exam_id=exam_id, histogram={})
+        question_stats = {}
+        results = ExamResult.objects.filter(exam_id=exam_id).values_list('total_score', 'question_scores')
+        for total_score, question_scores in results.iterator(chunk_size=2000):
+            _add_score(exam_stats, total_score)
+            for number, score in enumerate(question_scores or [], start=1):
+                if number not in question_stats:
+                    question_stats[number] = QuestionStatistics(exam_id=exam_id, question_number=number, histogram={})
+                _add_score(question_stats[number], score)
+        exam_stats.save()
+        QuestionStatistics.objects.bulk_create(question_stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_exam_statistics, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.db.models import Avg, Max, Min, StdDev
+from django.db.models import Avg, Count, Max, Min, StdDev
 from decimal import Decimal
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
@@ -102,16 +104,21 @@ class Student(models.Model):
     class Meta:
         verbose_name = "Öğrenci"
         verbose_name_plural = "Öğrenciler"
+        indexes = [
+            models.Index(fields=['department']),
+        ]
 
     def __str__(self):
         return f"{self.student_number} - {self.full_name}"
 
+    @staticmethod
+    def get_department(student_number):
+        """Öğrenci numarasından bölümü çıkarır (3-5. karakterler 253 ise Bilgisayar Mühendisliği)"""
+        return 'CENG' if student_number[2:5] == '253' else 'OTHER'
+
     def save(self, *args, **kwargs):
         if not self.pk:  # Yeni kayıt oluşturuluyorsa
-            # Öğrenci numarasından bölüm kodunu çıkar (3-6 arası karakterler)
-            department_code = self.student_number[2:5]
-            # Eğer bölüm kodu 253 ise Bilgisayar Mühendisliği
-            self.department = 'CENG' if department_code == '253' else 'OTHER'
+            self.department = self.get_department(self.student_number)
         super().save(*args, **kwargs)
 
     def get_course_average(self, course):
@@ -142,6 +149,13 @@ class Exam(models.Model):
         ('BAHAR', 'Bahar'),
     ]
 
+    # preprocessing.TEMPLATES şablonları; modeller cv2'ye bağımlı olmasın diye burada tanımlı
+    OCR_TEMPLATE_CHOICES = [
+        ('', 'Ön işleme yok'),
+        ('standart', 'Eğiklik düzeltme + küçültme'),
+        ('ust_bolum', 'Eğiklik düzeltme + üst bölüm (başlık ve puan tablosu)'),
+    ]
+
     course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name="Ders")
     semester = models.CharField(max_length=6, choices=SEMESTER_CHOICES, verbose_name="Dönem")
     exam_type = models.CharField(max_length=10, choices=EXAM_TYPE_CHOICES, verbose_name="Sınav Türü")
@@ -153,12 +167,24 @@ class Exam(models.Model):
         null=True,
         blank=True
     )
+    ocr_template = models.CharField(
+        max_length=20,
+        choices=OCR_TEMPLATE_CHOICES,
+        default='',
+        blank=True,
+        verbose_name="OCR Ön İşleme Şablonu"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "Sınav"
         verbose_name_plural = "Sınavlar"
         unique_together = ['course', 'semester', 'exam_type']
+        indexes = [
+            models.Index(fields=['-created_at']),  # Sınav listesi
+            models.Index(fields=['-exam_date']),
+            models.Index(fields=['semester', '-exam_date']),  # Raporlar sayfasındaki dönem filtresi
+        ]
 
     def __str__(self):
         return f"{self.course.code}_{self.semester} - {self.get_exam_type_display()}"
@@ -236,6 +262,30 @@ class ExamResult(models.Model):
         if len(self.question_scores) != self.exam.question_count:
             raise ValidationError("Soru sayısı, sınavdaki soru sayısı ile eşleşmiyor.")
 
+    def save(self, *args, **kwargs):
+        """Kaydederken soru puanı satırlarını ve sınav istatistiklerini eski ve yeni puanlara göre günceller"""
+        from .exam_results import sync_question_scores
+        from .exam_statistics import update_exam_statistics
+
+        previous = None
+        if self.pk:
+            previous = ExamResult.objects.filter(pk=self.pk).only('exam_id', 'total_score', 'question_scores').first()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            sync_question_scores([self])
+            if previous and previous.exam_id != self.exam_id:
+                update_exam_statistics(previous.exam_id, removed=[previous])
+                previous = None
+            update_exam_statistics(self.exam_id, added=[self], removed=[previous] if previous else [])
+
+    def delete(self, *args, **kwargs):
+        from .exam_statistics import update_exam_statistics
+
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            update_exam_statistics(self.exam_id, removed=[self])
+        return result
+
     def calculate_success_rate(self):
         """Her bir soru için başarı oranını hesaplar"""
         if not self.question_scores or not self.exam.question_scores:
@@ -248,6 +298,128 @@ class ExamResult(models.Model):
         return success_rates
 
 
+class QuestionScore(models.Model):
+    """ExamResult.question_scores'un soru başına satırları; soru bazlı toplamalar SQL'de yapılabilsin diye"""
+    exam_result = models.ForeignKey(ExamResult, on_delete=models.CASCADE, related_name='question_score_rows',
+                                    verbose_name="Sınav Sonucu")
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, verbose_name="Sınav")
+    question_number = models.PositiveIntegerField(verbose_name="Soru Numarası")
+    score = models.DecimalField(max_digits=5, decimal_places=2, verbose_name="Puan")
+
+    class Meta:
+        verbose_name = "Soru Puanı"
+        verbose_name_plural = "Soru Puanları"
+        unique_together = ['exam_result', 'question_number']
+        indexes = [
+            models.Index(fields=['exam', 'question_number', 'score']),
+        ]
+
+    def __str__(self):
+        return f"{self.exam_result} - Soru {self.question_number}: {self.score}"
+
+
+class ScoreStatistics(models.Model):
+    """
+    Bir puan dağılımının özet istatistikleri. Sonuç eklendikçe/silindikçe artımlı güncellenir;
+    histogram tam puana yuvarlanmış puan -> öğrenci sayısı eşlemesidir.
+    """
+    count = models.PositiveIntegerField(default=0, verbose_name="Öğrenci Sayısı")
+    score_sum = models.FloatField(default=0, verbose_name="Puan Toplamı")
+    score_sum_sq = models.FloatField(default=0, verbose_name="Puan Kareleri Toplamı")
+    min_score = models.FloatField(null=True, blank=True, verbose_name="En Düşük Puan")
+    max_score = models.FloatField(null=True, blank=True, verbose_name="En Yüksek Puan")
+    min_non_zero_score = models.FloatField(null=True, blank=True, verbose_name="Sıfırdan Farklı En Düşük Puan")
+    histogram = models.JSONField(default=dict, blank=True, verbose_name="Puan Dağılımı")
+
+    class Meta:
+        abstract = True
+
+    @property
+    def average(self):
+        return self.score_sum / self.count if self.count else 0
+
+    @property
+    def std_dev(self):
+        """Popülasyon standart sapması"""
+        if not self.count:
+            return 0
+        variance = self.score_sum_sq / self.count - self.average ** 2
+        return max(variance, 0) ** 0.5
+
+    def reset(self):
+        self.count = 0
+        self.score_sum = 0
+        self.score_sum_sq = 0
+        self.min_score = None
+        self.max_score = None
+        self.min_non_zero_score = None
+        self.histogram = {}
+
+    def add_score(self, score):
+        score = float(score)
+        self.count += 1
+        self.score_sum += score
+        self.score_sum_sq += score * score
+        self.min_score = score if self.min_score is None else min(self.min_score, score)
+        self.max_score = score if self.max_score is None else max(self.max_score, score)
+        if score > 0:
+            self.min_non_zero_score = score if self.min_non_zero_score is None else min(self.min_non_zero_score, score)
+        bucket = str(int(score))
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def remove_score(self, score):
+        """
+        Puanı dağılımdan çıkarır. Çıkarılan puan en düşük/en yüksek değerlerden biriyse yeni değer
+        özetten bulunamayacağı için False döner; bu durumda istatistikler baştan hesaplanmalıdır.
+        """
+        score = float(score)
+        if self.count <= 1:
+            self.reset()
+            return True
+        if score <= self.min_score or score >= self.max_score or (
+                score > 0 and score <= self.min_non_zero_score):
+            return False
+
+        self.count -= 1
+        self.score_sum -= score
+        self.score_sum_sq -= score * score
+        bucket = str(int(score))
+        if self.histogram.get(bucket, 0) > 1:
+            self.histogram[bucket] -= 1
+        else:
+            self.histogram.pop(bucket, None)
+        return True
+
+
+class ExamStatistics(ScoreStatistics):
+    """Sınavın toplam puan istatistikleri"""
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, related_name='statistics', verbose_name="Sınav")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Sınav İstatistiği"
+        verbose_name_plural = "Sınav İstatistikleri"
+
+    def __str__(self):
+        return f"{self.exam} - {self.count} öğrenci"
+
+
+class QuestionStatistics(ScoreStatistics):
+    """Sınavdaki bir sorunun puan istatistikleri"""
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='question_statistics',
+                             verbose_name="Sınav")
+    question_number = models.PositiveIntegerField(verbose_name="Soru Numarası")
+
+    class Meta:
+        verbose_name = "Soru İstatistiği"
+        verbose_name_plural = "Soru İstatistikleri"
+        unique_together = ['exam', 'question_number']
+        ordering = ['question_number']
+
+    def __str__(self):
+        return f"{self.exam} - Soru {self.question_number}"
+
+
 class CourseOutcome(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name="Ders")
     description = models.CharField(max_length=500, verbose_name="Kazanım Açıklaması")
@@ -306,6 +478,9 @@ class ExamPaper(models.Model):
     class Meta:
         verbose_name = "Sınav Kağıdı"
         verbose_name_plural = "Sınav Kağıtları"
+        indexes = [
+            models.Index(fields=['student', '-upload_date']),  # Öğrencinin en son kağıdı
+        ]
 
     def __str__(self):
         return f"{self.student.student_number} - {self.file.name}"
@@ -335,6 +510,230 @@ class UserLog(models.Model):
         verbose_name = "Kullanıcı Logu"
         verbose_name_plural = "Kullanıcı Logları"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['user', 'action']),  # Admin filtreleri
+        ]
 
     def __str__(self):
         return f"{self.user.full_name} - {self.get_action_display()} - {self.created_at}"
+
+
+class OcrJob(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Bekliyor'),
+        ('RUNNING', 'İşleniyor'),
+        ('DONE', 'Tamamlandı'),
+    ]
+
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, verbose_name="Sınav")
+    lecturer = models.ForeignKey(Lecturer, on_delete=models.SET_NULL, null=True, blank=True,
+                                 verbose_name="Yükleyen")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING', verbose_name="Durum")
+    roster_numbers = models.JSONField(default=list, blank=True, verbose_name="Listedeki Öğrenci Numaraları")
+    total_files = models.PositiveIntegerField(default=0, verbose_name="Dosya Sayısı")
+    success_count = models.PositiveIntegerField(default=0, verbose_name="Başarılı")
+    failure_count = models.PositiveIntegerField(default=0, verbose_name="Başarısız")
+    is_reported = models.BooleanField(default=False, verbose_name="Sonuç Bildirildi mi?")
+    upload_session = models.ForeignKey('UploadSession', on_delete=models.SET_NULL, null=True, blank=True,
+                                       related_name='ocr_jobs', verbose_name="Yükleme Oturumu")
+    # Parçalı yüklemede dosyalar tamamlandıkça göreve eklenir; yükleme bitene kadar iş tamamlanmış sayılmaz
+    is_open = models.BooleanField(default=False, verbose_name="Yükleme Sürüyor mu?")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Bitiş Zamanı")
+
+    class Meta:
+        verbose_name = "OCR İşi"
+        verbose_name_plural = "OCR İşleri"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.exam} - {self.get_status_display()}"
+
+    @property
+    def processed_count(self):
+        return self.success_count + self.failure_count
+
+    def get_failed_students(self):
+        """Listede olup OCR ile numarası okunamayan öğrencileri döndürür"""
+        processed_students = set(
+            self.tasks.exclude(student_number__isnull=True).values_list('student_number', flat=True)
+        )
+        return sorted(set(self.roster_numbers) - processed_students)
+
+    def get_progress(self):
+        """İlerleme durumunu JSON'a uygun sözlük olarak döndürür"""
+        percentage = round(self.processed_count / self.total_files * 100) if self.total_files else 100
+        return {
+            'id': self.id,
+            'status': self.status,
+            'status_display': self.get_status_display(),
+            'total_files': self.total_files,
+            'processed_count': self.processed_count,
+            'success_count': self.success_count,
+            'failure_count': self.failure_count,
+            'percentage': percentage,
+        }
+
+
+class OcrTask(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Bekliyor'),
+        ('RUNNING', 'İşleniyor'),
+        ('DONE', 'Tamamlandı'),
+        ('FAILED', 'Başarısız'),
+    ]
+
+    job = models.ForeignKey(OcrJob, on_delete=models.CASCADE, related_name='tasks', verbose_name="OCR İşi")
+    file_path = models.CharField(max_length=500, verbose_name="Dosya Yolu")
+    page_number = models.PositiveIntegerField(null=True, blank=True, verbose_name="Sayfa No")  # Toplu taramalar için
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING', verbose_name="Durum")
+    student_number = models.CharField(max_length=20, null=True, blank=True, verbose_name="Okunan Öğrenci No")
+    result = models.JSONField(null=True, blank=True, verbose_name="OCR Sonucu")
+    exam_result = models.ForeignKey(ExamResult, on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='ocr_tasks', verbose_name="Sınav Sonucu")
+    uploaded_file = models.ForeignKey('UploadedExamFile', on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name='ocr_tasks', verbose_name="Yüklenen Dosya")
+    error = models.TextField(blank=True, default='', verbose_name="Hata")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Deneme Sayısı")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Kilitlenme Zamanı")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Bitiş Zamanı")
+
+    class Meta:
+        verbose_name = "OCR Görevi"
+        verbose_name_plural = "OCR Görevleri"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'locked_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_source_display()} - {self.get_status_display()}"
+
+    def get_source(self):
+        """OCR kaynağını utils.process_exam_files'ın beklediği biçimde döndürür"""
+        return (self.file_path, self.page_number) if self.page_number else self.file_path
+
+    def get_source_display(self):
+        name = os.path.basename(self.file_path)
+        return f"{name} (sayfa {self.page_number})" if self.page_number else name
+
+    def get_upload_state(self):
+        """Görevin, yüklenen dosyanın hangi adımına kadar tamamlandığını döndürür"""
+        if self.status == 'DONE':
+            return 'PERSISTED'
+        if not self.result:
+            return 'STORED'
+        if not self.result.get('student_number'):
+            return 'OCR_DONE'
+        return 'PARSED'
+
+
+class UploadSession(models.Model):
+    """
+    Bir sınav yükleme formunun gönderimi. Aynı anahtarla tekrar gönderildiğinde
+    sınav yeniden oluşturulmaz ve yalnızca eksik kalan dosyalar işlenir.
+    """
+    key = models.CharField(max_length=64, unique=True, verbose_name="Oturum Anahtarı")
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='upload_sessions', verbose_name="Sınav")
+    lecturer = models.ForeignKey(Lecturer, on_delete=models.SET_NULL, null=True, blank=True,
+                                 verbose_name="Yükleyen")
+    upload_path = models.CharField(max_length=500, verbose_name="Yükleme Klasörü")
+    split_pages = models.BooleanField(default=False, verbose_name="Toplu Tarama")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Yükleme Oturumu"
+        verbose_name_plural = "Yükleme Oturumları"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.exam} - {self.key[:8]}"
+
+    def get_state_counts(self):
+        """Dosya durumlarına göre dosya sayılarını döndürür"""
+        counts = dict(self.files.values_list('state').annotate(count=Count('id')))
+        return {state: counts.get(state, 0) for state, _ in UploadedExamFile.STATE_CHOICES}
+
+
+class UploadedExamFile(models.Model):
+    """Yükleme oturumundaki bir dosya; state tamamlanan son adımı gösterir"""
+    STATE_CHOICES = [
+        ('PENDING', 'Yükleniyor'),
+        ('STORED', 'Kaydedildi'),
+        ('OCR_DONE', 'OCR Yapıldı'),
+        ('PARSED', 'Ayrıştırıldı'),
+        ('PERSISTED', 'Sonuç Kaydedildi'),
+    ]
+    STATE_ORDER = [state for state, _ in STATE_CHOICES]
+
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='files',
+                                verbose_name="Yükleme Oturumu")
+    file_name = models.CharField(max_length=255, verbose_name="Dosya Adı")
+    file_path = models.CharField(max_length=500, verbose_name="Dosya Yolu")
+    size = models.BigIntegerField(default=0, verbose_name="Boyut")
+    sha256 = models.CharField(max_length=64, blank=True, default='', verbose_name="SHA-256")
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default='PENDING', verbose_name="Durum")
+    error = models.TextField(blank=True, default='', verbose_name="Hata")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Yüklenen Dosya"
+        verbose_name_plural = "Yüklenen Dosyalar"
+        ordering = ['id']
+        unique_together = ['session', 'file_name']
+
+    def __str__(self):
+        return f"{self.file_name} - {self.get_state_display()}"
+
+    @property
+    def is_stored(self):
+        return self.state != 'PENDING'
+
+    @classmethod
+    def earliest_state(cls, states):
+        """Birden fazla görevi olan dosyalarda (sayfalara bölünen PDF) en geride kalan adımı döndürür"""
+        return min(states, key=cls.STATE_ORDER.index)
+
+
+@receiver(pre_delete, sender=Student)
+def rebuild_statistics_after_student_delete(sender, instance, **kwargs):
+    """
+    Öğrenci silinince sonuçları toplu (ExamResult.delete çağrılmadan) silindiğinden
+    öğrencinin girdiği sınavların istatistikleri silme tamamlandıktan sonra baştan hesaplanır.
+    """
+    from .exam_statistics import rebuild_exam_statistics
+    exam_ids = set(ExamResult.objects.filter(student=instance).values_list('exam_id', flat=True))
+
+    def rebuild():
+        # Aynı işlemde silinen sınavlar atlanır
+        for exam_id in Exam.objects.filter(id__in=exam_ids).values_list('id', flat=True):
+            rebuild_exam_statistics(exam_id)
+
+    transaction.on_commit(rebuild)
+
+
+@receiver(post_delete, sender=ExamPaper)
+@receiver(post_delete, sender=OcrTask)
+def delete_source_renditions(sender, instance, **kwargs):
+    """Kağıt ya da OCR görevi silinince önbellekteki küçük resim ve önizlemeleri de siler"""
+    from .renditions import delete_renditions
+    # Silme geri alınırsa görüntüler boşuna silinmesin; gerekirse ilk istekte yeniden oluşturulur
+    if sender is ExamPaper:
+        file_path = instance.get_file_path()
+        transaction.on_commit(lambda: delete_renditions(file_path))
+        return
+
+    file_path, page_number = instance.file_path, instance.page_number
+
+    def delete():
+        # Toplu taramanın sayfaları aynı dosyayı paylaşır; başka görevin kullandığı sayfalar korunur
+        other_tasks = OcrTask.objects.filter(file_path=file_path)
+        if not other_tasks.exists():
+            delete_renditions(file_path)
+        elif not other_tasks.filter(page_number=page_number).exists():
+            delete_renditions(file_path, page_number)
+
+    transaction.on_commit(delete)
@@ -0,0 +1,328 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ocr_backends import get_backend
+from preprocessing import get_template
+from utils import OcrResultCache, get_pdf_page_count, process_exam_files
+from .exam_results import ExamResultRow, write_exam_results
+from .models import Exam, OcrJob, OcrTask, UploadedExamFile, UserLog
+
+logger = logging.getLogger('user_actions')
+
+# Parçalı yüklemede bu süreden sonra hâlâ açık olan işler kapatılır
+OPEN_JOB_TIMEOUT = timedelta(hours=6)
+# Worker'ı her seferinde çökerten görevler bu kadar denemeden sonra FAILED olur
+MAX_TASK_ATTEMPTS = 3
+
+
+def get_ocr_cache():
+    """Ayarlara göre OCR sonuç önbelleğini döndürür, kapalıysa None"""
+    if not settings.OCR_CACHE_ENABLED:
+        return None
+    return OcrResultCache(
+        settings.OCR_CACHE_DIR,
+        max_bytes=settings.OCR_CACHE_MAX_BYTES,
+        max_age_seconds=settings.OCR_CACHE_MAX_AGE
+    )
+
+
+def get_ocr_backend():
+    """Ayarlarda seçilen OCR motorunu döndürür"""
+    if settings.OCR_BACKEND == 'tesseract':
+        return get_backend(
+            'tesseract',
+            lang=settings.OCR_TESSERACT_LANG,
+            tesseract_cmd=settings.OCR_TESSERACT_CMD
+        )
+    return get_backend(settings.OCR_BACKEND, batch_size=settings.OCR_BATCH_SIZE)
+
+
+def build_ocr_tasks(file_path, split_pages=False):
+    """
+    Bir dosya için kaydedilmemiş OCR görevlerini döndürür.
+    split_pages seçiliyse her PDF sayfası ayrı bir öğrencinin kağıdı olarak ayrı görev olur.
+    """
+    page_count = 0
+    if split_pages and file_path.lower().endswith('.pdf'):
+        try:
+            page_count = get_pdf_page_count(file_path)
+        except Exception as e:
+            logger.error(f"PDF sayfa sayısı okunamadı ({file_path}): {str(e)}")
+
+    if page_count > 1:
+        return [OcrTask(file_path=file_path, page_number=page) for page in range(1, page_count + 1)]
+    return [OcrTask(file_path=file_path)]
+
+
+def save_ocr_job(exam, lecturer, tasks, roster_numbers=None, upload_session=None, is_open=False):
+    """
+    Görevleri yeni bir OCR işi olarak kuyruğa ekler.
+    is_open seçiliyse iş, close_ocr_job çağrılana kadar yeni görev kabul eder ve tamamlanmış sayılmaz.
+    """
+    with transaction.atomic():
+        job = OcrJob.objects.create(
+            exam=exam,
+            lecturer=lecturer,
+            roster_numbers=sorted(roster_numbers or []),
+            total_files=len(tasks),
+            upload_session=upload_session,
+            is_open=is_open
+        )
+        for task in tasks:
+            task.job = job
+        OcrTask.objects.bulk_create(tasks, batch_size=500)
+    return job
+
+
+def add_tasks_to_job(job, tasks):
+    """Açık bir OCR işine yeni görevler ekler; görevler hemen worker tarafından alınabilir"""
+    with transaction.atomic():
+        for task in tasks:
+            task.job = job
+        OcrTask.objects.bulk_create(tasks, batch_size=500)
+        OcrJob.objects.filter(pk=job.pk).update(total_files=F('total_files') + len(tasks))
+
+
+def close_ocr_job(job):
+    """
+    Açık işi kapatır; hiç görev eklenmediyse iş doğrudan tamamlanır.
+    Worker işi bu arada RUNNING yapmış olabileceğinden bellekteki durum geri yazılmaz,
+    yalnızca koşullu güncellemeler yapılır.
+    """
+    with transaction.atomic():
+        OcrJob.objects.filter(pk=job.pk).update(is_open=False)
+        OcrJob.objects.filter(pk=job.pk, tasks__isnull=True).update(status='DONE', finished_at=timezone.now())
+    job.refresh_from_db()
+    return job
+
+
+def create_ocr_job(exam, lecturer, file_paths, roster_numbers=None, split_pages=False):
+    """Kaydedilmiş sınav dosyaları için kuyruğa bir OCR işi ekler"""
+    tasks = [task for file_path in file_paths for task in build_ocr_tasks(file_path, split_pages)]
+    return save_ocr_job(exam, lecturer, tasks, roster_numbers)
+
+
+def requeue_stale_tasks(stale_seconds, max_attempts=MAX_TASK_ATTEMPTS):
+    """
+    Çöken bir worker'dan kalan, uzun süredir RUNNING durumundaki görevleri tekrar kuyruğa alır.
+    max_attempts kez sahiplenilmiş görevler tekrar denenmez, FAILED olarak işaretlenir.
+    Sonucu veritabanına yazılmış görevler DONE/FAILED olduğundan tekrar işlenmez.
+    Kuyruğa alınan görev sayısını döndürür.
+    """
+    threshold = timezone.now() - timedelta(seconds=stale_seconds)
+    stale_tasks = OcrTask.objects.filter(status='RUNNING', locked_at__lt=threshold)
+
+    with transaction.atomic():
+        exhausted = list(
+            stale_tasks.filter(attempts__gte=max_attempts).select_for_update()
+            .values_list('id', 'job_id', 'uploaded_file_id')
+        )
+        if exhausted:
+            OcrTask.objects.filter(id__in=[task_id for task_id, _, _ in exhausted]).update(
+                status='FAILED',
+                locked_at=None,
+                finished_at=timezone.now(),
+                error=f'OCR işlemi {max_attempts} denemede tamamlanamadı.'
+            )
+            for job_id, count in Counter(job_id for _, job_id, _ in exhausted).items():
+                OcrJob.objects.filter(pk=job_id).update(failure_count=F('failure_count') + count)
+            refresh_upload_file_states({file_id for _, _, file_id in exhausted if file_id})
+            logger.warning(f"{len(exhausted)} OCR görevi {max_attempts} denemede tamamlanamadı, FAILED yapıldı")
+
+        return stale_tasks.filter(attempts__lt=max_attempts).update(status='PENDING', locked_at=None)
+
+
+def claim_tasks(limit):
+    """
+    Bekleyen görevleri atomik olarak RUNNING durumuna alır.
+    Aynı görev birden fazla worker tarafından sahiplenilemez.
+    """
+    claimed = []
+    candidate_ids = OcrTask.objects.filter(status='PENDING').values_list('id', flat=True)[:limit]
+    for task_id in list(candidate_ids):
+        updated = OcrTask.objects.filter(id=task_id, status='PENDING').update(
+            status='RUNNING',
+            locked_at=timezone.now(),
+            attempts=F('attempts') + 1
+        )
+        if updated:
+            claimed.append(task_id)
+
+    tasks = list(OcrTask.objects.filter(id__in=claimed).select_related('job__exam__course'))
+    OcrJob.objects.filter(id__in={task.job_id for task in tasks}, status='PENDING').update(status='RUNNING')
+    return tasks
+
+
+def _set_exam_question_scores(exam, question_scores):
+    """Sınavın soru puanlarını ilk okunan kağıttan alır; doğrulama başarısızsa değişikliği geri alır"""
+    previous = exam.question_count, exam.question_scores
+    exam.question_count = len(question_scores)
+    exam.question_scores = question_scores
+    try:
+        exam.full_clean()
+    except ValidationError:
+        exam.question_count, exam.question_scores = previous
+        raise
+    exam.save()
+
+
+def apply_ocr_results(tasks, results):
+    """
+    Aynı işe ait görevlerin OCR sonuçlarını sınav sonuçlarına dönüştürür.
+    Öğrenciler tek sorguda bulunur ve sonuçlar toplu yazılır; görev durumları, sınav
+    sonuçları ve iş sayaçları aynı transaction içinde yazıldığından worker yeniden
+    başlatıldığında tamamlanan görevler tekrarlanmaz.
+    """
+    if not tasks:
+        return []
+
+    with transaction.atomic():
+        locked_tasks = OcrTask.objects.select_for_update().in_bulk([task.pk for task in tasks])
+        pairs = [
+            (locked_tasks[task.pk], result)
+            for task, result in zip(tasks, results)
+            if task.pk in locked_tasks and locked_tasks[task.pk].status == 'RUNNING'
+        ]
+        if not pairs:
+            return []
+
+        exam = Exam.objects.select_for_update().get(pk=tasks[0].job.exam_id)
+        now = timezone.now()
+        rows = []
+        row_tasks = []
+        for task, result in pairs:
+            task.result = result
+            task.finished_at = now
+            task.status = 'FAILED'
+
+            if not result:
+                task.error = 'OCR işlemi başarısız oldu.'
+                continue
+
+            task.student_number = result['student_number']
+            # Soru puanları ilk okunan kağıttan alınır
+            if result['question_scores'] and not exam.question_scores:
+                try:
+                    _set_exam_question_scores(exam, result['question_scores'])
+                except ValidationError as e:
+                    task.error = str(e)
+                    continue
+
+            if not result['student_number']:
+                task.error = 'Öğrenci numarası okunamadı.'
+                continue
+
+            rows.append(ExamResultRow(result['student_number'], result['student_scores']))
+            row_tasks.append(task)
+
+        written = write_exam_results(exam, rows)
+        for task, exam_result in zip(row_tasks, written.results):
+            if exam_result is not None:
+                task.exam_result = exam_result
+                task.status = 'DONE'
+        for error in written.errors:
+            row_tasks[error.index].error = error.message
+
+        updated_tasks = [task for task, _ in pairs]
+        OcrTask.objects.bulk_update(
+            updated_tasks,
+            ['result', 'finished_at', 'status', 'error', 'student_number', 'exam_result']
+        )
+        success_count = sum(1 for task in updated_tasks if task.status == 'DONE')
+        OcrJob.objects.filter(pk=tasks[0].job_id).update(
+            success_count=F('success_count') + success_count,
+            failure_count=F('failure_count') + len(updated_tasks) - success_count
+        )
+        refresh_upload_file_states({task.uploaded_file_id for task in updated_tasks if task.uploaded_file_id})
+    return updated_tasks
+
+
+def refresh_upload_file_states(file_ids):
+    """
+    Yüklenen dosyaların durumunu görevlerinden hesaplar.
+    Her sayfa için yalnızca en son görev dikkate alınır; dosyanın durumu en geride kalan sayfanınkidir.
+    """
+    if not file_ids:
+        return
+
+    latest_tasks = {}
+    for task in OcrTask.objects.filter(uploaded_file_id__in=file_ids).exclude(status__in=['PENDING', 'RUNNING']):
+        latest_tasks[(task.uploaded_file_id, task.page_number)] = task
+
+    task_states = {}
+    errors = {}
+    for (file_id, _), task in latest_tasks.items():
+        task_states.setdefault(file_id, []).append(task.get_upload_state())
+        if task.error:
+            errors.setdefault(file_id, []).append(f"{task.get_source_display()}: {task.error}")
+
+    files = list(UploadedExamFile.objects.filter(id__in=task_states))
+    for uploaded_file in files:
+        uploaded_file.state = UploadedExamFile.earliest_state(task_states[uploaded_file.id])
+        uploaded_file.error = '\n'.join(errors.get(uploaded_file.id, []))
+        uploaded_file.updated_at = timezone.now()
+    UploadedExamFile.objects.bulk_update(files, ['state', 'error', 'updated_at'])
+
+
+def run_pending_tasks(limit, max_workers=4):
+    """Bekleyen görevleri sahiplenip paralel OCR ile işler, işlenen görev sayısını döndürür"""
+    tasks = claim_tasks(limit)
+    cache = get_ocr_cache()
+    backend = get_ocr_backend() if tasks else None
+
+    # Aynı işe ait dosyalar aynı ders/dönem bilgisiyle birlikte işlenir
+    tasks_by_job = {}
+    for task in tasks:
+        tasks_by_job.setdefault(task.job_id, []).append(task)
+
+    for job_tasks in tasks_by_job.values():
+        exam = job_tasks[0].job.exam
+        results = process_exam_files(
+            [task.get_source() for task in job_tasks],
+            exam.course.code,
+            exam.semester,
+            max_workers=max_workers,
+            cache=cache,
+            preprocess=get_template(exam.ocr_template),
+            backend=backend
+        )
+        apply_ocr_results(job_tasks, results)
+
+    if cache and tasks:
+        cache.evict_if_due(settings.OCR_CACHE_EVICT_INTERVAL)
+    return len(tasks)
+
+
+def finalize_jobs():
+    """Tüm görevleri biten işleri tamamlandı olarak işaretler ve loglar"""
+    # Tarayıcı kapandığı için hiç kapatılmayan parçalı yükleme işleri
+    for job in OcrJob.objects.filter(is_open=True, created_at__lt=timezone.now() - OPEN_JOB_TIMEOUT):
+        close_ocr_job(job)
+
+    finished_jobs = OcrJob.objects.filter(status='RUNNING', is_open=False).exclude(
+        tasks__status__in=['PENDING', 'RUNNING']
+    ).select_related('exam__course', 'lecturer')
+
+    for job in finished_jobs:
+        updated = OcrJob.objects.filter(pk=job.pk, status='RUNNING').update(
+            status='DONE',
+            finished_at=timezone.now()
+        )
+        if not updated:
+            continue
+
+        job.refresh_from_db()
+        details = f'{job.exam.course.code} dersi için {job.success_count} sınav kağıdı başarıyla işlendi'
+        if job.failure_count > 0:
+            details += f', {job.failure_count} sınav kağıdı işlenemedi'
+        if job.lecturer:
+            details = f'{job.lecturer.full_name} tarafından {details}'
+        UserLog.objects.create(user=job.lecturer, action='EXAM_PROCESS', details=details)
+        logger.info(f"OCR job {job.id}: {details}")
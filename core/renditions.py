@@ -0,0 +1,128 @@
+import hashlib
+import os
+import shutil
+import threading
+
+from django.conf import settings
+from PIL import Image, features
+
+from utils import render_pdf_page
+
+# Görüntü adı -> render çözünürlüğü ve en büyük boyut (genişlik, yükseklik)
+RENDITIONS = {
+    'thumbnail': {'dpi': 36, 'max_size': (240, 340), 'quality': 70},
+    'preview': {'dpi': 100, 'max_size': (1000, 1415), 'quality': 80},
+}
+RENDITION_FORMATS = {
+    'WEBP': ('webp', 'image/webp'),
+    'JPEG': ('jpg', 'image/jpeg'),
+}
+
+
+class RenditionError(Exception):
+    """Görüntü oluşturulamadığında (ör. bozuk dosya, poppler kurulu değil)"""
+
+
+def get_rendition_format():
+    """Ayarlardaki biçim; Pillow WebP desteği olmadan derlendiyse JPEG"""
+    image_format = settings.RENDITION_FORMAT.upper()
+    if image_format not in RENDITION_FORMATS or (image_format == 'WEBP' and not features.check('webp')):
+        return 'JPEG'
+    return image_format
+
+
+def _source_dir(file_path):
+    """Kaynak dosyanın tüm görüntülerinin tutulduğu klasör; dosya yolunun özetiyle anahtarlanır"""
+    key = hashlib.sha256(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+    return os.path.join(settings.RENDITION_CACHE_DIR, key[:2], key)
+
+
+def _rendition_prefix(name, page):
+    return f"{name}-p{page or 1}-"
+
+
+def get_rendition_path(file_path, name, page=None, image_format=None):
+    """
+    Görüntünün önbellekteki yolu. Dosya adı kaynak dosyanın boyutunu ve değişiklik zamanını
+    içerdiğinden kaynak değişince eski görüntü kullanılmaz.
+    """
+    stat = os.stat(file_path)
+    extension = RENDITION_FORMATS[image_format or get_rendition_format()][0]
+    return os.path.join(
+        _source_dir(file_path),
+        f"{_rendition_prefix(name, page)}{stat.st_size:x}-{stat.st_mtime_ns:x}.{extension}"
+    )
+
+
+def _open_source_image(file_path, dpi, page):
+    if file_path.lower().endswith('.pdf'):
+        return render_pdf_page(file_path, dpi=dpi, page=page)
+    image = Image.open(file_path)
+    image.load()
+    return image
+
+
+def render_rendition(file_path, name, page=None):
+    """
+    Kaynağın istenen sayfasını küçültüp önbelleğe yazar ve yolunu döndürür.
+    Aynı görüntünün kaynağın eski sürümünden kalan dosyaları silinir.
+    """
+    spec = RENDITIONS[name]
+    image_format = get_rendition_format()
+    path = get_rendition_path(file_path, name, page, image_format)
+
+    try:
+        image = _open_source_image(file_path, spec['dpi'], page)
+        image.thumbnail(spec['max_size'])
+        image = image.convert('RGB')
+    except Exception as e:
+        raise RenditionError(f"{os.path.basename(file_path)} için görüntü oluşturulamadı: {str(e)}") from e
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    image.save(temp_path, format=image_format, quality=spec['quality'])
+    os.replace(temp_path, path)
+
+    prefix = _rendition_prefix(name, page)
+    for other in os.listdir(directory):
+        other_path = os.path.join(directory, other)
+        if other.startswith(prefix) and other_path != path and not other.endswith('.tmp'):
+            os.remove(other_path)
+    return path
+
+
+def get_rendition(file_path, name, page=None):
+    """
+    Görüntünün yolunu ve içerik türünü döndürür; önbellekte yoksa ilk istekte oluşturulur.
+    Kaynak dosya yoksa FileNotFoundError yükseltir.
+    """
+    path = get_rendition_path(file_path, name, page)
+    if not os.path.exists(path):
+        path = render_rendition(file_path, name, page)
+    return path, RENDITION_FORMATS[get_rendition_format()][1]
+
+
+def build_renditions(file_path, page=None):
+    """Tüm görüntüleri (ör. yükleme sırasında) önceden oluşturur"""
+    return [render_rendition(file_path, name, page) for name in RENDITIONS]
+
+
+def delete_renditions(file_path, page=None):
+    """Kaynak dosyanın tüm sayfalarına ait görüntüleri siler; page verilirse yalnızca o sayfanınkileri"""
+    directory = _source_dir(file_path)
+    if page is None:
+        shutil.rmtree(directory, ignore_errors=True)
+        return
+
+    prefixes = tuple(_rendition_prefix(name, page) for name in RENDITIONS)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if name.startswith(prefixes):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
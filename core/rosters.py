@@ -0,0 +1,170 @@
+import codecs
+import csv
+import logging
+import zipfile
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from openpyxl import load_workbook
+
+from .models import Student
+
+logger = logging.getLogger('user_actions')
+
+STUDENT_NUMBER_COLUMN = 'Öğrenci No'
+FULL_NAME_COLUMN = 'Ad Soyad'
+ROSTER_COLUMNS = [STUDENT_NUMBER_COLUMN, FULL_NAME_COLUMN]
+
+
+class RosterError(Exception):
+    """Öğrenci listesi okunamadığında veya gerekli sütunlar eksik olduğunda"""
+
+
+@dataclass
+class RosterImportResult:
+    student_numbers: set = field(default_factory=set)  # Listedeki tüm öğrenci numaraları
+    created_count: int = 0
+    existing_count: int = 0
+    linked_count: int = 0  # Derse yeni bağlanan öğrenci sayısı
+
+
+def _cell_to_str(value):
+    """Hücre değerini metne çevirir; Excel'in sayı olarak sakladığı numaralar '20253001.0' olmaz"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _column_indexes(header):
+    """Başlık satırında 'Öğrenci No' ve 'Ad Soyad' sütunlarının yerini bulur"""
+    header = [_cell_to_str(cell) for cell in header or ()]
+    if not all(column in header for column in ROSTER_COLUMNS):
+        raise RosterError('Öğrenci listesi gerekli sütunları içermiyor (Öğrenci No, Ad Soyad).')
+    return header.index(STUDENT_NUMBER_COLUMN), header.index(FULL_NAME_COLUMN)
+
+
+def _iter_roster_rows(rows, number_index, name_index, on_close=None):
+    try:
+        for row in rows:
+            student_number = _cell_to_str(row[number_index]) if number_index < len(row) else ''
+            full_name = _cell_to_str(row[name_index]) if name_index < len(row) else ''
+            if student_number or full_name:
+                yield student_number, full_name
+    finally:
+        if on_close:
+            on_close()
+
+
+def _read_roster_xlsx(file):
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, ValueError, OSError):
+        raise RosterError('Excel dosyası okunamadı.')
+
+    rows = workbook.active.iter_rows(values_only=True)
+    try:
+        number_index, name_index = _column_indexes(next(rows, None))
+    except RosterError:
+        workbook.close()
+        raise
+    return _iter_roster_rows(rows, number_index, name_index, on_close=workbook.close)
+
+
+def _read_roster_csv(file, on_close=None):
+    # Satırlar ikili dosyadan tek tek çözülür; Excel'in eklediği BOM utf-8-sig ile atlanır
+    lines = codecs.iterdecode(file, 'utf-8-sig')
+    first_line = next(lines, '')
+    try:
+        dialect = csv.Sniffer().sniff(first_line, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+
+    try:
+        number_index, name_index = _column_indexes(next(csv.reader([first_line], dialect), None))
+    except RosterError:
+        if on_close:
+            on_close()
+        raise
+    return _iter_roster_rows(csv.reader(lines, dialect), number_index, name_index, on_close=on_close)
+
+
+def read_roster(file, filename=None):
+    """
+    Öğrenci listesini (.xlsx veya .csv) satır satır okuyan bir (öğrenci no, ad soyad) üreteci döndürür.
+    Başlıklar çağrı sırasında hemen doğrulanır; satırlar dosyadan tembel okunduğundan
+    bellek kullanımı dosya boyutuna bağlı değildir.
+    file bir dosya yolu ya da yüklenen dosya olabilir.
+    """
+    filename = (filename or getattr(file, 'name', None) or str(file)).lower()
+    if filename.endswith('.xls'):
+        raise RosterError('Eski .xls biçimi desteklenmiyor; dosyayı .xlsx veya .csv olarak kaydedin.')
+
+    if filename.endswith('.csv'):
+        if isinstance(file, str):
+            file = open(file, 'rb')
+            return _read_roster_csv(file, on_close=file.close)
+        return _read_roster_csv(file)
+    return _read_roster_xlsx(file)
+
+
+def import_roster(rows, course=None, batch_size=500):
+    """
+    (öğrenci no, ad soyad) satırlarından eksik öğrencileri toplu olarak oluşturur.
+    Mevcut öğrenciler tek bir IN sorgusuyla bulunur, yeniler tek bulk_create ile eklenir.
+    course verilirse listedeki tüm öğrenciler derse bağlanır (mevcut bağlantılar korunur).
+    Aynı numara birden fazla kez geçiyorsa ilk satırdaki ad kullanılır.
+    """
+    names = {}
+    for student_number, full_name in rows:
+        student_number = str(student_number).strip()
+        if student_number and student_number not in names:
+            names[student_number] = str(full_name).strip()
+
+    result = RosterImportResult(student_numbers=set(names))
+    if not names:
+        return result
+
+    with transaction.atomic():
+        student_ids = dict(
+            Student.objects.filter(student_number__in=names).values_list('student_number', 'id')
+        )
+        new_students = [
+            Student(
+                student_number=student_number,
+                full_name=full_name,
+                department=Student.get_department(student_number)
+            )
+            for student_number, full_name in names.items()
+            if student_number not in student_ids
+        ]
+        # bulk_create save()'i çağırmaz; bölüm yukarıda numaradan hesaplanır
+        Student.objects.bulk_create(new_students, batch_size=batch_size)
+
+        result.existing_count = len(student_ids)
+        result.created_count = len(new_students)
+
+        if course is not None:
+            # Veritabanı eklenen kayıtların id'lerini döndürmüyorsa tekrar sorgulanır
+            missing_ids = [student.student_number for student in new_students if student.pk is None]
+            student_ids.update((student.student_number, student.pk) for student in new_students if student.pk)
+            if missing_ids:
+                student_ids.update(
+                    Student.objects.filter(student_number__in=missing_ids).values_list('student_number', 'id')
+                )
+
+            through = Student.courses.through
+            linked_ids = set(
+                through.objects.filter(course=course, student_id__in=student_ids.values())
+                .values_list('student_id', flat=True)
+            )
+            links = [
+                through(student_id=student_id, course_id=course.id)
+                for student_id in student_ids.values()
+                if student_id not in linked_ids
+            ]
+            through.objects.bulk_create(links, batch_size=batch_size, ignore_conflicts=True)
+            result.linked_count = len(links)
+
+    return result
@@ -0,0 +1,203 @@
+import json
+import os
+from datetime import datetime
+
+from django.utils import timezone
+
+from .models import Exam, ExamQuestionOutcome, ExamResult, Student
+
+SNAPSHOT_FORMATS = ('parquet', 'feather')
+STATE_FILE = '_snapshot_state.json'
+BATCH_SIZE = 50000
+
+# Tablo adı -> (model, [(sütun, alan, tür)]). Türler pyarrow tiplerine _arrow_types ile eşlenir.
+SNAPSHOT_TABLES = {
+    'students': (Student, [
+        ('id', 'id', 'int64'),
+        ('student_number', 'student_number', 'string'),
+        ('full_name', 'full_name', 'string'),
+        ('department', 'department', 'string'),
+        ('created_at', 'created_at', 'timestamp'),
+    ]),
+    'exams': (Exam, [
+        ('id', 'id', 'int64'),
+        ('course_id', 'course_id', 'int64'),
+        ('course_code', 'course__code', 'string'),
+        ('semester', 'semester', 'string'),
+        ('exam_type', 'exam_type', 'string'),
+        ('exam_date', 'exam_date', 'date'),
+        ('question_count', 'question_count', 'int64'),
+        ('question_scores', 'question_scores', 'float_list'),
+        ('created_at', 'created_at', 'timestamp'),
+    ]),
+    'exam_results': (ExamResult, [
+        ('id', 'id', 'int64'),
+        ('exam_id', 'exam_id', 'int64'),
+        ('student_id', 'student_id', 'int64'),
+        ('total_score', 'total_score', 'float64'),
+        ('question_scores', 'question_scores', 'float_list'),
+        ('is_passed', 'is_passed', 'bool'),
+        ('created_at', 'created_at', 'timestamp'),
+    ]),
+    'exam_question_outcomes': (ExamQuestionOutcome, [
+        ('id', 'id', 'int64'),
+        ('exam_id', 'exam_id', 'int64'),
+        ('question_number', 'question_number', 'int64'),
+        ('outcome_id', 'outcome_id', 'int64'),
+        ('outcome', 'outcome__description', 'string'),
+        ('contribution_percentage', 'contribution_percentage', 'int64'),
+        ('created_at', 'created_at', 'timestamp'),
+    ]),
+}
+
+
+class SnapshotError(Exception):
+    """Anlık görüntü alınamadığında; mesaj komut çıktısında gösterilir"""
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise SnapshotError("Anlık görüntü için pyarrow gerekli: pip install pyarrow")
+    return pyarrow
+
+
+def _arrow_types(pa):
+    return {
+        'int64': pa.int64(),
+        'string': pa.string(),
+        'float64': pa.float64(),
+        'bool': pa.bool_(),
+        'date': pa.date32(),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+        'float_list': pa.list_(pa.float64()),
+    }
+
+
+def _convert(value, column_type):
+    """Decimal ve JSON değerlerini pyarrow'un beklediği Python tiplerine çevirir"""
+    if value is None:
+        return None
+    if column_type == 'float64':
+        return float(value)
+    if column_type == 'float_list':
+        return [float(item) for item in value] if isinstance(value, list) else None
+    return value
+
+
+def load_state(output_dir):
+    """Tablo adı -> en son aktarılan kaydın created_at değeri"""
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return {table: datetime.fromisoformat(value) for table, value in json.load(f).items()}
+
+
+def save_state(output_dir, state):
+    path = os.path.join(output_dir, STATE_FILE)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({table: value.isoformat() for table, value in state.items()}, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def _open_writer(pa, path, schema, file_format):
+    if file_format == 'parquet':
+        return pa.parquet.ParquetWriter(path, schema, compression='zstd')
+    return pa.ipc.new_file(path, schema)
+
+
+def export_table(table, output_dir, since=None, until=None, file_format='parquet'):
+    """
+    Tablonun since < created_at <= until aralığındaki kayıtlarını tek bir parça dosyasına yazar.
+    Kayıtlar BATCH_SIZE'lık gruplar halinde okunup yazıldığından bellek kullanımı sabittir.
+    Yazılan satır sayısını döndürür; aralıkta kayıt yoksa dosya oluşturulmaz.
+    """
+    pa = _import_pyarrow()
+    model, columns = SNAPSHOT_TABLES[table]
+    types = _arrow_types(pa)
+    schema = pa.schema([(name, types[column_type]) for name, _, column_type in columns])
+
+    queryset = model.objects.all()
+    if since:
+        queryset = queryset.filter(created_at__gt=since)
+    if until:
+        queryset = queryset.filter(created_at__lte=until)
+    rows = queryset.order_by('created_at', 'id').values_list(*[field for _, field, _ in columns]).iterator(
+        chunk_size=2000
+    )
+
+    table_dir = os.path.join(output_dir, table)
+    os.makedirs(table_dir, exist_ok=True)
+    stamp = (until or timezone.now()).strftime('%Y%m%dT%H%M%S%f')
+    path = os.path.join(table_dir, f'part-{stamp}.{file_format}')
+    temp_path = f'{path}.tmp'
+
+    writer = None
+    row_count = 0
+    batch = []
+
+    def flush():
+        nonlocal writer
+        arrays = [
+            pa.array([_convert(row[index], column_type) for row in batch], type=types[column_type])
+            for index, (_, _, column_type) in enumerate(columns)
+        ]
+        if writer is None:
+            writer = _open_writer(pa, temp_path, schema, file_format)
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        batch.clear()
+
+    try:
+        for row in rows:
+            batch.append(row)
+            row_count += 1
+            if len(batch) >= BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is not None:
+        # Yarım kalan dosya okuyucular tarafından görülmesin diye yazım bitince yeniden adlandırılır
+        os.replace(temp_path, path)
+    return row_count
+
+
+def export_snapshot(output_dir, tables=None, file_format='parquet', full=False):
+    """
+    Seçilen tabloların son anlık görüntüden sonra eklenen kayıtlarını yeni parça dosyalarına yazar.
+    full seçiliyse tüm kayıtlar yeniden aktarılır. created_at değişmediğinden güncellenen kayıtlar
+    artımlı aktarımda görünmez; bunlar için periyodik olarak full ile aktarım yapılmalıdır.
+    Tablo adı -> yazılan satır sayısı döndürür.
+    """
+    if file_format not in SNAPSHOT_FORMATS:
+        raise SnapshotError(f"Geçersiz biçim: {file_format}")
+    tables = tables or list(SNAPSHOT_TABLES)
+    unknown = set(tables) - set(SNAPSHOT_TABLES)
+    if unknown:
+        raise SnapshotError(f"Bilinmeyen tablo: {', '.join(sorted(unknown))}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    state = load_state(output_dir)
+    # Aktarım sırasında eklenen kayıtlar bir sonraki çalışmaya kalır
+    until = timezone.now()
+
+    counts = {}
+    for table in tables:
+        table_dir = os.path.join(output_dir, table)
+        old_parts = os.listdir(table_dir) if full and os.path.isdir(table_dir) else []
+        counts[table] = export_table(table, output_dir, None if full else state.get(table), until, file_format)
+        # Tam aktarımda eski parçalar silinir, aksi halde kayıtlar iki kez okunur
+        for name in old_parts:
+            if name.startswith('part-'):
+                os.remove(os.path.join(table_dir, name))
+        state[table] = until
+        save_state(output_dir, state)
+    return counts
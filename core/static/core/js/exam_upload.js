@@ -5,6 +5,149 @@ document.addEventListener('DOMContentLoaded', function() {
     const newExamFields = document.getElementById('new_exam_fields');
     const examFilesInput = document.getElementById('exam_files');
     const studentListInput = document.getElementById('student_list');
+    const ocrJobProgress = document.getElementById('ocrJobProgress');
+
+    // Arka planda işlenen OCR işinin durumunu takip et
+    function pollOcrJob() {
+        fetch(ocrJobProgress.dataset.progressUrl)
+            .then(response => response.json())
+            .then(data => {
+                if (data.error) {
+                    document.getElementById('ocrJobStatus').textContent = data.error;
+                    return;
+                }
+
+                const progressBar = ocrJobProgress.querySelector('.progress-bar');
+                progressBar.style.width = `${data.percentage}%`;
+                progressBar.textContent = `${data.percentage}%`;
+                document.getElementById('ocrJobStatus').textContent =
+                    `${data.processed_count} / ${data.total_files} dosya işlendi (${data.status_display})`;
+
+                if (data.redirect_url) {
+                    window.location.href = data.redirect_url;
+                } else {
+                    setTimeout(pollOcrJob, 2000);
+                }
+            })
+            .catch(() => setTimeout(pollOcrJob, 5000));
+    }
+
+    if (ocrJobProgress) {
+        pollOcrJob();
+    }
+
+    // Parçalı yükleme: dosyalar paralel olarak parça parça gönderilir, her dosya
+    // tamamlanır tamamlanmaz sunucuda OCR kuyruğuna alınır
+    const CHUNK_SIZE = 1024 * 1024;
+    const PARALLEL_UPLOADS = 3;
+    const CHUNK_RETRIES = 3;
+    const chunkUploadProgress = document.getElementById('chunkUploadProgress');
+    const csrfToken = form.querySelector('input[name="csrfmiddlewaretoken"]').value;
+
+    async function sha256Hex(blob) {
+        // Yalnızca parça belleğe alınır; dosyanın tamamı okunmaz
+        const digest = await window.crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+        return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    async function postUpload(url, body, contentType, extraHeaders) {
+        const headers = Object.assign({'X-CSRFToken': csrfToken}, extraHeaders);
+        if (contentType) {
+            headers['Content-Type'] = contentType;
+        }
+        const response = await fetch(url, {method: 'POST', headers: headers, body: body});
+        const data = await response.json().catch(() => ({}));
+        if (!response.ok && response.status !== 409) {
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
+        return {status: response.status, data: data};
+    }
+
+    async function uploadFileInChunks(filesUrl, file, onProgress) {
+        const start = await postUpload(filesUrl, JSON.stringify({
+            file_name: file.name,
+            size: file.size
+        }), 'application/json');
+        const fileUrl = `${filesUrl}${start.data.file_id}/`;
+
+        // Yarım kalan yükleme sunucunun aldığı son bayttan devam eder
+        let received = start.data.received;
+        onProgress(received);
+        let retries = 0;
+        while (received < file.size) {
+            try {
+                // Sunucu her parçayı SHA-256 ile doğrular; bozuk parça yazılmadan reddedilir
+                const chunk = file.slice(received, received + CHUNK_SIZE);
+                const result = await postUpload(`${fileUrl}chunk/?offset=${received}`, chunk,
+                    'application/octet-stream', {'X-Chunk-SHA256': await sha256Hex(chunk)});
+                onProgress(result.data.received - received);
+                received = result.data.received;
+                retries = 0;
+            } catch (error) {
+                if (++retries > CHUNK_RETRIES) {
+                    throw error;
+                }
+                await new Promise(resolve => setTimeout(resolve, 1000 * retries));
+            }
+        }
+
+        await postUpload(`${fileUrl}complete/`);
+    }
+
+    async function submitChunked() {
+        const formData = new FormData(form);
+        formData.delete('exam_files');
+        formData.append('chunked_upload', '1');
+
+        const response = await fetch(window.location.pathname, {method: 'POST', body: formData});
+        if (!(response.headers.get('Content-Type') || '').includes('application/json')) {
+            // Form hatası: sunucunun yönlendirdiği sayfada mesajlar gösterilir
+            window.location.href = response.url;
+            return;
+        }
+        const session = await response.json();
+
+        const files = Array.from(examFilesInput.files);
+        const totalBytes = files.reduce((sum, file) => sum + file.size, 0) || 1;
+        const progressBar = chunkUploadProgress.querySelector('.progress-bar');
+        const statusText = document.getElementById('chunkUploadStatus');
+        let uploadedBytes = 0;
+        let completedFiles = 0;
+        const failedFiles = [];
+
+        form.closest('.card').classList.add('d-none');
+        chunkUploadProgress.classList.remove('d-none');
+
+        function updateProgress(bytes) {
+            uploadedBytes += bytes;
+            const percentage = Math.min(100, Math.round(uploadedBytes / totalBytes * 100));
+            progressBar.style.width = `${percentage}%`;
+            progressBar.textContent = `${percentage}%`;
+            statusText.textContent = `${completedFiles} / ${files.length} dosya yüklendi`;
+        }
+
+        let nextIndex = 0;
+        async function uploadWorker() {
+            while (nextIndex < files.length) {
+                const file = files[nextIndex++];
+                try {
+                    await uploadFileInChunks(session.files_url, file, updateProgress);
+                    completedFiles++;
+                } catch (error) {
+                    failedFiles.push(`${file.name}: ${error.message}`);
+                }
+                updateProgress(0);
+            }
+        }
+
+        await Promise.all(Array.from({length: Math.min(PARALLEL_UPLOADS, files.length)}, uploadWorker));
+        if (failedFiles.length > 0) {
+            console.error('Yüklenemeyen dosyalar:', failedFiles);
+        }
+
+        const finish = await postUpload(session.finish_url);
+        window.location.href = finish.data.redirect_url;
+    }
 
     // Form alanlarını toggle et
     function toggleFormFields() {
@@ -139,7 +282,7 @@ document.addEventListener('DOMContentLoaded', function() {
         }
 
         // Excel dosyası kontrolü
-        const studentListErrors = validateFiles(studentListInput, ['xls', 'xlsx'], 5);
+        const studentListErrors = validateFiles(studentListInput, ['xlsx', 'csv'], 5);
         if (studentListErrors.length > 0) {
             isValid = false;
             showError(studentListInput, studentListErrors.join('\n'));
@@ -161,6 +304,20 @@ document.addEventListener('DOMContentLoaded', function() {
         if (!isValid) {
             event.preventDefault();
             event.stopPropagation();
+            return;
+        }
+
+        // Tarayıcı destekliyorsa dosyalar tek bir multipart istek yerine parça parça gönderilir.
+        // Parçaların sağlama toplamı için gereken crypto.subtle yalnızca güvenli bağlamda (https/localhost)
+        // bulunur; yoksa form normal şekilde gönderilir.
+        if (window.fetch && window.FormData && window.Blob && Blob.prototype.slice &&
+                window.crypto && window.crypto.subtle) {
+            event.preventDefault();
+            form.querySelector('button[type="submit"]').disabled = true;
+            submitChunked().catch(error => {
+                alert(`Yükleme sırasında hata oluştu: ${error.message}`);
+                window.location.reload();
+            });
         }
     });
 
@@ -1,3 +1,1221 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+from PIL import Image
+
+import exam_parser
+import ocr_backends
+import preprocessing
+import utils
+from ocr_backends import OcrBackend, OcrPage, TesseractBackend, VisionBackend, get_backend, normalize_lines
+from utils import OcrResultCache
+
+from .analytics import load_score_matrix
+from .exam_results import ExamResultRow, write_exam_results
+from .exam_statistics import get_question_score_aggregates, get_question_success_rates, rebuild_exam_statistics
+from .exports import XLSX_CONTENT_TYPE
+from .file_responses import parse_range
+from .gradebook import get_gradebook
+from .models import (Course, Exam, ExamPaper, ExamResult, ExamStatistics, Lecturer, OcrJob, OcrTask,
+                     QuestionScore, QuestionStatistics, Student, UploadSession, UserLog)
+from .ocr_jobs import (MAX_TASK_ATTEMPTS, build_ocr_tasks, claim_tasks, close_ocr_job, finalize_jobs, get_ocr_backend,
+                       refresh_upload_file_states, requeue_stale_tasks, run_pending_tasks, save_ocr_job)
+from .renditions import get_rendition, render_rendition
+from .rosters import RosterError, import_roster, read_roster
+from .snapshots import export_snapshot
+from .upload_sessions import (ChunkOffsetError, UploadError, complete_chunked_file, queue_upload_session,
+                              start_chunked_file, store_uploaded_file, write_chunk)
+
+
+def xlsx_file(rows, name='liste.xlsx'):
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+    file.name = name
+    return file
+
+
+def log_in(client, username='hoca'):
+    """Görünümlerin beklediği öğretim üyesi oturumunu açar"""
+    session = client.session
+    session['lecturer_username'] = username
+    session.save()
+    return client
+
+
+def create_exam(code='BM101', question_scores=(40, 60), exam_type='VIZE', semester='GUZ',
+                exam_date=date(2025, 1, 1)):
+    lecturer, _ = Lecturer.objects.get_or_create(username='hoca', defaults={'full_name': 'Test Hoca'})
+    course, _ = Course.objects.get_or_create(code=code, defaults={'name': 'Ders', 'lecturer': lecturer})
+    return Exam.objects.create(course=course, semester=semester, exam_type=exam_type, exam_date=exam_date,
+                               question_count=len(question_scores), question_scores=list(question_scores))
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Sorgu planı kontrolleri SQLite EXPLAIN QUERY PLAN çıktısına göre yazıldı')
+class QueryPlanTests(TestCase):
+    """
+    Görünümlerin kullandığı sorguların indeks kullandığını doğrular.
+    Bir indeks silinir ya da sorgu indekssiz bir alana kayarsa plan tam tablo taramasına
+    (SCAN tablo) veya geçici sıralamaya döner ve test başarısız olur.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        lecturer = Lecturer.objects.create(username='hoca', full_name='Test Hoca')
+        courses = Course.objects.bulk_create([
+            Course(code=f'BM{i:03d}', name=f'Ders {i}', lecturer=lecturer) for i in range(20)
+        ])
+        students = Student.objects.bulk_create([
+            Student(student_number=f'2025{i:05d}', full_name=f'Öğrenci {i}',
+                    department=Student.get_department(f'2025{i:05d}'))
+            for i in range(200)
+        ])
+        exams = Exam.objects.bulk_create([
+            Exam(course=course, semester=semester, exam_type='VIZE', question_count=2,
+                 question_scores=[50, 50], exam_date=date(2025, 1, 1) + timedelta(days=i))
+            for i, (course, semester) in enumerate((c, s) for c in courses for s in ('GUZ', 'BAHAR'))
+        ])
+        results = ExamResult.objects.bulk_create([
+            ExamResult(exam=exam, student=student, total_score=60, question_scores=[30, 30])
+            for exam in exams[:10] for student in students
+        ])
+        QuestionScore.objects.bulk_create([
+            QuestionScore(exam_result=result, exam_id=result.exam_id, question_number=number, score=30)
+            for result in results for number in (1, 2)
+        ])
+        ExamPaper.objects.bulk_create([
+            ExamPaper(student=student, file=f'exam_papers/{student.student_number}.pdf') for student in students
+        ])
+        UserLog.objects.bulk_create([
+            UserLog(user=lecturer, action='LOGIN', details='giriş') for _ in range(300)
+        ])
+
+        cls.student = students[0]
+        cls.exam = exams[0]
+        cls.lecturer = lecturer
+
+    def assertUsesIndexes(self, queryset, allow_temp_sort=False):
+        plan = queryset.explain()
+        # "SCAN tablo" indeks olmadan tüm tabloyu okur; "SCAN tablo USING INDEX" indeks sırasıyla okur
+        full_scans = [line for line in plan.splitlines()
+                      if re.search(r'\bSCAN \w+$', line.strip()) or re.search(r'\bSCAN \w+ \(', line)]
+        self.assertEqual(full_scans, [], f'Tam tablo taraması:\n{plan}')
+        if not allow_temp_sort:
+            self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan, f'İndekssiz sıralama:\n{plan}')
+
+    def test_exam_list_ordered_by_created_at(self):
+        self.assertUsesIndexes(Exam.objects.order_by('-created_at'))
+
+    def test_exams_ordered_by_exam_date(self):
+        self.assertUsesIndexes(Exam.objects.order_by('-exam_date'))
+
+    def test_reports_semester_filter(self):
+        self.assertUsesIndexes(Exam.objects.filter(semester='GUZ').order_by('-exam_date'))
+
+    def test_exams_by_course_code(self):
+        self.assertUsesIndexes(Exam.objects.filter(course__code='BM001'))
+
+    def test_student_results_ordered_by_exam_date(self):
+        # Sıralama başka tablodaki alana göre olduğundan geçici sıralama kaçınılmaz; sonuçlar indeksle bulunmalı
+        self.assertUsesIndexes(
+            ExamResult.objects.filter(student=self.student).order_by('-exam__exam_date'),
+            allow_temp_sort=True
+        )
+
+    def test_results_by_department(self):
+        self.assertUsesIndexes(ExamResult.objects.filter(exam=self.exam, student__department='CENG'))
+
+    def test_students_by_department(self):
+        self.assertUsesIndexes(Student.objects.filter(department='CENG'))
+
+    def test_latest_exam_paper(self):
+        self.assertUsesIndexes(ExamPaper.objects.filter(student=self.student).order_by('-upload_date'))
+
+    def test_question_score_aggregates(self):
+        from django.db.models import Avg
+        self.assertUsesIndexes(
+            QuestionScore.objects.filter(exam=self.exam).values('question_number').annotate(avg=Avg('score'))
+            .order_by('question_number')
+        )
+
+    def test_user_log_admin(self):
+        self.assertUsesIndexes(UserLog.objects.order_by('-created_at'))
+        self.assertUsesIndexes(UserLog.objects.filter(user=self.lecturer, action='LOGIN').order_by('-created_at'),
+                               allow_temp_sort=True)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_single_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=500-5000', 1000), (500, 999))
+
+    def test_ignored_ranges(self):
+        # Geçersiz ya da çok aralıklı istekler için dosyanın tamamı gönderilir
+        for header in (None, '', 'bytes=-', 'items=0-1', 'bytes=0-1,5-6'):
+            self.assertIsNone(parse_range(header, 1000))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1000-', 'bytes=10-5', 'bytes=-0'):
+            with self.assertRaises(ValueError):
+                parse_range(header, 1000)
+
+
+class RenditionTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, RENDITION_CACHE_DIR=os.path.join(self.media_root, 'renditions'),
+            RENDITION_FORMAT='JPEG'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        os.makedirs(os.path.join(self.media_root, 'exam_papers'))
+        self.paper = ExamPaper.objects.create(
+            student=Student.objects.create(student_number='202500001', full_name='Öğrenci'),
+            file='exam_papers/kagit.png'
+        )
+        self.source = self.paper.get_file_path()
+        Image.new('RGB', (1240, 1754), 'white').save(self.source)
+
+    def test_rendition_is_cached_and_resized(self):
+        path, content_type = get_rendition(self.source, 'thumbnail')
+        self.assertEqual(content_type, 'image/jpeg')
+        with Image.open(path) as image:
+            self.assertLessEqual(image.width, 240)
+            self.assertLessEqual(image.height, 340)
+        self.assertEqual(get_rendition(self.source, 'thumbnail')[0], path)
+
+    def test_stale_rendition_is_replaced(self):
+        old_path, _ = get_rendition(self.source, 'preview')
+        Image.new('RGB', (600, 800), 'black').save(self.source)
+        os.utime(self.source, ns=(0, os.stat(self.source).st_mtime_ns + 1))
+        new_path = render_rendition(self.source, 'preview')
+        self.assertNotEqual(new_path, old_path)
+        self.assertFalse(os.path.exists(old_path))
+
+    def test_task_delete_keeps_other_pages(self):
+        job = OcrJob.objects.create(exam=create_exam())
+        first, second = [OcrTask.objects.create(job=job, file_path=self.source, page_number=page) for page in (1, 2)]
+        first_path, _ = get_rendition(self.source, 'thumbnail', 1)
+        second_path, _ = get_rendition(self.source, 'thumbnail', 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertTrue(os.path.exists(first_path))
+        self.assertFalse(os.path.exists(second_path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertFalse(os.path.exists(first_path))
+
+    def test_renditions_deleted_with_paper(self):
+        path, _ = get_rendition(self.source, 'thumbnail')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.paper.delete()
+        self.assertFalse(os.path.exists(os.path.dirname(path)))
+
+
+class ChunkedUploadTests(TestCase):
+    CHUNK = 4
+
+    def setUp(self):
+        upload_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_path)
+        session = UploadSession.objects.create(key='oturum', exam=create_exam(), upload_path=upload_path)
+        self.data = b'0123456789ab'
+        self.record, received = start_chunked_file(session, 'kagit.pdf', len(self.data),
+                                                   hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(received, 0)
+
+    def write(self, index):
+        chunk = self.data[index * self.CHUNK:(index + 1) * self.CHUNK]
+        return write_chunk(self.record, index * self.CHUNK, io.BytesIO(chunk), len(chunk),
+                           hashlib.sha256(chunk).hexdigest())
+
+    def post_chunk(self, offset, chunk, **headers):
+        session = self.client.session
+        session['lecturer_username'] = 'hoca'
+        session.save()
+        return self.client.post(
+            reverse('upload_file_chunk', args=['oturum', self.record.id]) + f'?offset={offset}',
+            data=chunk, content_type='application/octet-stream', **headers
+        )
+
+    def test_duplicate_chunk(self):
+        self.assertEqual(self.write(0), 4)
+        self.assertEqual(self.write(0), 4)
+        self.write(1)
+        self.write(2)
+        self.assertEqual(complete_chunked_file(self.record).state, 'STORED')
+
+    def test_gap_is_rejected(self):
+        self.write(0)
+        with self.assertRaises(ChunkOffsetError) as context:
+            self.write(2)
+        self.assertEqual(context.exception.received, 4)
+
+    def test_gap_returns_conflict(self):
+        self.write(0)
+        response = self.post_chunk(8, self.data[8:], HTTP_X_CHUNK_SHA256=hashlib.sha256(self.data[8:]).hexdigest())
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['received'], 4)
+
+    def test_chunk_without_digest_is_rejected(self):
+        response = self.post_chunk(0, self.data[:4])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.write(0), 4)
+        with self.assertRaises(UploadError):
+            write_chunk(self.record, 4, io.BytesIO(self.data[4:8]), 4, '')
+        self.assertEqual(self.write(1), 8)
+
+    def test_corrupted_chunk_is_not_written(self):
+        self.write(0)
+        self.write(1)
+        response = self.post_chunk(0, b'XXXX', HTTP_X_CHUNK_SHA256=hashlib.sha256(self.data[:4]).hexdigest())
+        self.assertEqual(response.status_code, 400)
+        self.write(2)
+        record = complete_chunked_file(self.record)
+        with open(record.file_path, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(os.listdir(os.path.dirname(record.file_path)), ['kagit.pdf'])
+
+    def test_resent_earlier_chunk_keeps_later_bytes(self):
+        self.write(0)
+        self.write(1)
+        self.write(2)
+        # Zaman aşımına uğrayan ilk parçanın tekrarı sonraki parçaları silmemeli
+        self.assertEqual(self.write(0), len(self.data))
+        record = complete_chunked_file(self.record)
+        with open(record.file_path, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+
+class UploadSessionResumeTests(TestCase):
+    def setUp(self):
+        upload_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_path)
+        self.session = UploadSession.objects.create(key='oturum', exam=create_exam(), upload_path=upload_path)
+        self.lecturer = Lecturer.objects.get(username='hoca')
+
+    def store(self, name, content):
+        return store_uploaded_file(self.session, SimpleUploadedFile(name, content))
+
+    def finish_tasks(self, tasks, status):
+        """Görevleri worker işlemiş gibi sonuçlandırır; FAILED görevlerin OCR sonucu yoktur"""
+        OcrTask.objects.filter(pk__in=[task.pk for task in tasks]).update(status=status)
+        refresh_upload_file_states({task.uploaded_file_id for task in tasks})
+
+    def test_resubmit_skips_queued_and_persisted_files(self):
+        first = self.store('a.png', b'a')
+        second = self.store('b.png', b'b')
+        job = queue_upload_session(self.session, self.lecturer)
+        self.assertEqual(job.total_files, 2)
+
+        # Görevleri kuyrukta bekleyen oturum tekrar gönderildiğinde yeni iş oluşmaz
+        self.assertIsNone(queue_upload_session(self.session, self.lecturer))
+        self.assertEqual(OcrJob.objects.count(), 1)
+
+        self.finish_tasks(job.tasks.filter(uploaded_file=first), 'DONE')
+        self.finish_tasks(job.tasks.filter(uploaded_file=second), 'FAILED')
+        retry = queue_upload_session(self.session, self.lecturer)
+        self.assertEqual(list(retry.tasks.values_list('uploaded_file_id', flat=True)), [second.id])
+
+    def test_resubmit_skips_done_pages(self):
+        with mock.patch('core.ocr_jobs.get_pdf_page_count', return_value=3):
+            self.store('toplu.pdf', b'%PDF-')
+            job = queue_upload_session(self.session, self.lecturer, split_pages=True)
+            self.assertEqual(sorted(job.tasks.values_list('page_number', flat=True)), [1, 2, 3])
+
+            self.finish_tasks(job.tasks.filter(page_number__in=[1, 2]), 'DONE')
+            self.finish_tasks(job.tasks.filter(page_number=3), 'FAILED')
+            retry = queue_upload_session(self.session, self.lecturer, split_pages=True)
+
+        self.assertEqual(list(retry.tasks.values_list('page_number', flat=True)), [3])
+
+    def test_changed_content_drops_old_tasks(self):
+        record = self.store('a.png', b'eski')
+        job = queue_upload_session(self.session, self.lecturer)
+        self.finish_tasks(job.tasks.all(), 'DONE')
+
+        # Aynı içerik tekrar gönderilirse dosya baştan işlenmez
+        self.assertEqual(self.store('a.png', b'eski').state, 'PERSISTED')
+        self.assertIsNone(queue_upload_session(self.session, self.lecturer))
+
+        self.assertEqual(self.store('a.png', b'yeni').state, 'STORED')
+        self.assertFalse(record.ocr_tasks.exists())
+        retry = queue_upload_session(self.session, self.lecturer)
+        self.assertEqual(list(retry.tasks.values_list('uploaded_file_id', flat=True)), [record.id])
+        with open(record.file_path, 'rb') as f:
+            self.assertEqual(f.read(), b'yeni')
+
+
+class OcrTemplateChoicesTests(SimpleTestCase):
+    def test_choices_match_preprocessing_templates(self):
+        from preprocessing import TEMPLATES
+        self.assertEqual({value for value, _ in Exam.OCR_TEMPLATE_CHOICES if value}, set(TEMPLATES))
+        self.assertEqual(Exam._meta.get_field('ocr_template').default, '')
+
+
+STATISTIC_FIELDS = ('count', 'score_sum', 'score_sum_sq', 'min_score', 'max_score', 'min_non_zero_score', 'histogram')
+
+
+class PreprocessingTests(SimpleTestCase):
+    def page(self, angle=0):
+        """Yatay metin satırları çizilmiş, angle derece döndürülmüş beyaz sayfa"""
+        image = np.full((800, 600), 255, np.uint8)
+        for top in range(100, 700, 60):
+            cv2.rectangle(image, (80, top), (520, top + 20), 0, -1)
+        matrix = cv2.getRotationMatrix2D((300, 400), angle, 1.0)
+        return cv2.warpAffine(image, matrix, (600, 800), borderValue=255)
+
+    def test_deskew_straightens_rotated_page(self):
+        for angle in (5, -5):
+            rotated = self.page(angle)
+            self.assertAlmostEqual(abs(preprocessing.estimate_skew_angle(rotated)), 5, places=1)
+            self.assertAlmostEqual(preprocessing.estimate_skew_angle(preprocessing.deskew(rotated)), 0, places=1)
+
+        straight = self.page()
+        self.assertIs(preprocessing.deskew(straight), straight)
+        # Sınırı aşan eğiklik düzeltilmez
+        self.assertEqual(preprocessing.estimate_skew_angle(self.page(20), max_angle=10), 0)
+
+    def test_crop_regions(self):
+        image = self.page()
+        header = preprocessing.crop_regions(image, ((0.0, 0.25, 0.0, 1.0),))
+        self.assertEqual(header.shape, (200, 600))
+        np.testing.assert_array_equal(header, image[:200])
+
+        # Farklı genişlikteki bölgeler alt alta birleştirilir, dar olan beyazla doldurulur
+        combined = preprocessing.crop_regions(image, ((0.0, 0.25, 0.0, 1.0), (0.5, 0.75, 0.0, 0.5)))
+        self.assertEqual(combined.shape, (400, 600))
+        self.assertTrue((combined[200:, 300:] == 255).all())
+        self.assertIs(preprocessing.crop_regions(image, ((0.5, 0.5, 0.0, 1.0),)), image)
+
+    def test_preprocess_image_with_template(self):
+        content = cv2.imencode('.png', self.page(5))[1].tobytes()
+        template = preprocessing.PreprocessTemplate(name='deneme', max_width=300, regions=((0.0, 0.5, 0.0, 1.0),))
+
+        result = preprocessing.decode_image(preprocessing.preprocess_image(content, template))
+
+        self.assertEqual(result.shape, (200, 300))
+        self.assertIs(preprocessing.preprocess_image(content, None), content)
+
+
+class ExamStatisticsTests(TestCase):
+    """Artımlı güncellenen istatistikler her adımda baştan hesaplananlarla aynı olmalı"""
+
+    def setUp(self):
+        self.exam = create_exam(question_scores=(40, 60))
+        self.students = [
+            Student.objects.create(student_number=f'2025{i:05d}', full_name=f'Öğrenci {i}') for i in range(4)
+        ]
+
+    def snapshot(self):
+        exam_stats = ExamStatistics.objects.get(exam=self.exam)
+        question_stats = QuestionStatistics.objects.filter(exam=self.exam).order_by('question_number')
+        return [
+            {name: getattr(stats, name) for name in STATISTIC_FIELDS}
+            for stats in [exam_stats, *question_stats]
+        ]
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_exam_statistics(self.exam.id)
+        rebuilt = self.snapshot()
+        self.assertEqual(len(incremental), len(rebuilt))
+        for before, after in zip(incremental, rebuilt):
+            for name in STATISTIC_FIELDS:
+                if isinstance(after[name], float):
+                    self.assertAlmostEqual(before[name], after[name], msg=name)
+                else:
+                    self.assertEqual(before[name], after[name], msg=name)
+
+    def write(self, scores, update_conflicts=False):
+        rows = [ExamResultRow(student.student_number, question_scores)
+                for student, question_scores in zip(self.students, scores)]
+        written = write_exam_results(self.exam, rows, update_conflicts=update_conflicts)
+        self.assertEqual(written.errors, [])
+        return written.results
+
+    def test_bulk_write(self):
+        self.write([[10, 20], [40, 60], [0, 35]])
+        self.assertEqual(ExamStatistics.objects.get(exam=self.exam).count, 3)
+        self.assertMatchesRebuild()
+
+    def test_bulk_upsert(self):
+        self.write([[10, 20], [40, 60], [0, 35]])
+        # En düşük ve en yüksek puanlar değişir
+        self.write([[30, 30], [20, 20]], update_conflicts=True)
+        self.assertEqual(ExamStatistics.objects.get(exam=self.exam).count, 3)
+        self.assertMatchesRebuild()
+
+    def test_save(self):
+        results = self.write([[10, 20], [40, 60], [0, 35], [25, 25]])
+        result = results[3]
+        result.question_scores = [26, 24]
+        result.save()
+        self.assertMatchesRebuild()
+
+        result = ExamResult.objects.create(exam=create_exam('BM102'), student=self.students[0],
+                                           total_score=0, question_scores=[0, 0])
+        result.exam = self.exam
+        result.student = self.students[3]
+        results[3].delete()
+        # Başka sınavdan taşınan sonuç eski sınavdan çıkarılıp bu sınava eklenir
+        result.save()
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        results = self.write([[10, 20], [40, 60], [0, 35], [25, 25]])
+        results[3].delete()
+        self.assertMatchesRebuild()
+        results[1].delete()
+        self.assertEqual(ExamStatistics.objects.get(exam=self.exam).max_score, 35)
+        self.assertMatchesRebuild()
+
+    def test_student_delete(self):
+        self.write([[10, 20], [40, 60], [0, 35]])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[1].delete()
+        self.assertEqual(ExamStatistics.objects.get(exam=self.exam).count, 2)
+        self.assertMatchesRebuild()
+
+
+class QuestionScoreAggregateTests(TestCase):
+    def test_aggregates_match_json_scores(self):
+        exam = create_exam(question_scores=(40, 60))
+        scores = [[10, 20.5], [40, 60], [0, 35.25], [12.5, 0]]
+        write_exam_results(exam, [
+            ExamResultRow(Student.objects.create(student_number=f'2025{i:05d}', full_name='Öğrenci').student_number,
+                          question_scores)
+            for i, question_scores in enumerate(scores)
+        ])
+        # Düzenlenen sonuç QuestionScore satırlarına da yansımalı
+        result = ExamResult.objects.get(student__student_number='202500003')
+        result.question_scores = [15, 0]
+        result.total_score = 15
+        result.save()
+        scores[3] = [15, 0]
+
+        aggregates = get_question_score_aggregates(exam)
+        self.assertEqual([row['question_number'] for row in aggregates], [1, 2])
+        for row, column in zip(aggregates, zip(*scores)):
+            self.assertEqual(row['count'], len(column))
+            self.assertAlmostEqual(float(row['avg_score']), sum(column) / len(column))
+            self.assertAlmostEqual(float(row['min_score']), min(column))
+            self.assertAlmostEqual(float(row['max_score']), max(column))
+            for percentile in (25, 50, 75):
+                self.assertAlmostEqual(row[f'percentile_{percentile}'], np.percentile(column, percentile))
+
+        success_rates = get_question_success_rates(exam)
+        for number, (column, max_score) in enumerate(zip(zip(*scores), exam.question_scores), start=1):
+            self.assertAlmostEqual(success_rates[number], sum(column) / len(column) / max_score * 100)
+
+
+def exam_paper_text(student_number, scores, name='Ali Veli'):
+    """exam_parser'ın okuduğu düzende sınav kağıdı OCR metni (soru puanları 40/60)"""
+    lines = [f'Ad Soyad: {name}', f'Öğrenci No: {student_number}', '12.01.2025',
+             'Soru1', 'Soru2', 'Toplam', '40', '60', '100', *map(str, scores), str(sum(scores))]
+    return '\n'.join(lines)
+
+
+class FakeOcrBackend(OcrBackend):
+    """Görüntü baytlarını OCR metni olarak döndürür; 'okunamaz' içerikli dosyalar için None"""
+
+    name = 'fake'
+    batch_size = 16
+
+    def recognize(self, contents):
+        return [
+            None if content is None or content == b'okunamaz' else OcrPage(text=content.decode('utf-8'))
+            for content in contents
+        ]
+
+
+@override_settings(OCR_CACHE_ENABLED=False)
+class OcrJobQueueTests(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        patcher = mock.patch('core.ocr_jobs.get_ocr_backend', return_value=FakeOcrBackend())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.exam = create_exam(question_scores=(40, 60))
+        self.lecturer = Lecturer.objects.get(username='hoca')
+        for number in ('20250001', '20250002'):
+            Student.objects.create(student_number=number, full_name='Öğrenci')
+
+    def create_file(self, name, content):
+        path = os.path.join(self.folder, name)
+        with open(path, 'wb') as f:
+            f.write(content.encode('utf-8') if isinstance(content, str) else content)
+        return path
+
+    def create_job(self, files, **kwargs):
+        tasks = [OcrTask(file_path=self.create_file(name, content)) for name, content in files]
+        return save_ocr_job(self.exam, self.lecturer, tasks, **kwargs)
+
+    def test_claim_and_apply_results(self):
+        job = self.create_job([
+            ('a.png', exam_paper_text('20250001', [30, 50])),
+            ('b.png', exam_paper_text('20250002', [40, 45])),
+            ('c.png', b'okunamaz'),
+            ('d.png', exam_paper_text('20259999', [10, 10])),  # Listede olmayan öğrenci
+        ])
+        self.assertEqual(run_pending_tasks(limit=10), 4)
+        self.assertEqual(claim_tasks(10), [])
+
+        tasks = list(job.tasks.order_by('id'))
+        self.assertEqual([task.status for task in tasks], ['DONE', 'DONE', 'FAILED', 'FAILED'])
+        self.assertEqual(tasks[2].error, 'OCR işlemi başarısız oldu.')
+        self.assertIn('20259999', tasks[3].error)
+        self.assertEqual(tasks[0].exam_result.question_scores, [30, 50])
+        self.assertEqual(
+            dict(ExamResult.objects.filter(exam=self.exam).values_list('student__student_number', 'total_score')),
+            {'20250001': 80, '20250002': 85}
+        )
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.success_count, job.failure_count), ('RUNNING', 2, 2))
+
+    def test_requeue_stale_tasks(self):
+        job = self.create_job([('a.png', 'x'), ('b.png', 'y')])
+        stale, fresh = claim_tasks(2)
+        OcrTask.objects.filter(pk=stale.pk).update(locked_at=timezone.now() - timedelta(minutes=30))
+
+        self.assertEqual(requeue_stale_tasks(600), 1)
+        states = dict(job.tasks.values_list('id', 'status'))
+        self.assertEqual(states, {stale.pk: 'PENDING', fresh.pk: 'RUNNING'})
+        self.assertEqual([task.pk for task in claim_tasks(2)], [stale.pk])
+        self.assertEqual(OcrTask.objects.get(pk=stale.pk).attempts, 2)
+
+    def test_stale_task_fails_after_max_attempts(self):
+        job = self.create_job([('a.png', 'x'), ('b.png', 'y')])
+        poison, retry = claim_tasks(2)
+        OcrTask.objects.filter(pk=poison.pk).update(attempts=MAX_TASK_ATTEMPTS)
+        OcrTask.objects.filter(job=job).update(locked_at=timezone.now() - timedelta(minutes=30))
+
+        self.assertEqual(requeue_stale_tasks(600), 1)
+        poison.refresh_from_db()
+        self.assertEqual(poison.status, 'FAILED')
+        self.assertIn(str(MAX_TASK_ATTEMPTS), poison.error)
+        self.assertEqual(OcrTask.objects.get(pk=retry.pk).status, 'PENDING')
+        job.refresh_from_db()
+        self.assertEqual(job.failure_count, 1)
+        self.assertEqual([task.pk for task in claim_tasks(2)], [retry.pk])
+
+    def test_worker_survives_iteration_error(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with mock.patch('core.management.commands.process_ocr_jobs.run_pending_tasks',
+                        side_effect=[DatabaseError('bağlantı koptu'), 1, KeyboardInterrupt]) as run, \
+                mock.patch('core.management.commands.process_ocr_jobs.finalize_jobs') as finalize, \
+                mock.patch('core.management.commands.process_ocr_jobs.time.sleep'):
+            call_command('process_ocr_jobs', stdout=stdout, stderr=stderr)
+
+        self.assertEqual(run.call_count, 3)
+        self.assertEqual(finalize.call_count, 1)
+        self.assertIn('bağlantı koptu', stderr.getvalue())
+        self.assertIn('1 görev işlendi.', stdout.getvalue())
+
+        with mock.patch('core.management.commands.process_ocr_jobs.run_pending_tasks',
+                        side_effect=DatabaseError('bağlantı koptu')):
+            with self.assertRaises(CommandError):
+                call_command('process_ocr_jobs', '--once', stdout=stdout, stderr=stderr)
+
+    def test_finalize_jobs(self):
+        job = self.create_job([
+            ('a.png', exam_paper_text('20250001', [30, 50])),
+            ('b.png', b'okunamaz'),
+        ])
+        open_job = self.create_job([('c.png', exam_paper_text('20250002', [40, 45]))], is_open=True)
+
+        run_pending_tasks(limit=1)
+        finalize_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'RUNNING')  # Bekleyen görev var
+
+        run_pending_tasks(limit=10)
+        finalize_jobs()
+        job.refresh_from_db()
+        open_job.refresh_from_db()
+        self.assertEqual((job.status, job.success_count, job.failure_count), ('DONE', 1, 1))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(open_job.status, 'RUNNING')  # Açık iş yeni görev bekliyor
+        log = UserLog.objects.get(action='EXAM_PROCESS')
+        self.assertIn('1 sınav kağıdı başarıyla işlendi, 1 sınav kağıdı işlenemedi', log.details)
+
+        close_ocr_job(open_job)
+        finalize_jobs()
+        open_job.refresh_from_db()
+        self.assertEqual((open_job.status, open_job.success_count), ('DONE', 1))
+
+    def test_close_does_not_overwrite_running_status(self):
+        job = self.create_job([('a.png', exam_paper_text('20250001', [30, 50]))], is_open=True)
+        stale_job = OcrJob.objects.get(pk=job.pk)  # Worker işi sahiplenmeden önce okunmuş
+        claim_tasks(1)
+        self.assertEqual(close_ocr_job(stale_job).status, 'RUNNING')
+        self.assertEqual(close_ocr_job(self.create_job([], is_open=True)).status, 'DONE')
+
+
+class WriteExamResultsTests(TestCase):
+    def setUp(self):
+        self.exam = create_exam(question_scores=(40, 60))
+        for number in ('20250001', '20250002', '20250003'):
+            Student.objects.create(student_number=number, full_name='Öğrenci')
+
+    def test_unknown_and_invalid_rows(self):
+        written = write_exam_results(self.exam, [
+            ExamResultRow('20250001', [30, 50]),
+            ExamResultRow('20259999', [10, 10]),
+            ExamResultRow('20250002', [30]),  # Eksik soru
+            ExamResultRow('20250003', [30, 50], total_score=90),  # Toplam uyuşmuyor
+        ])
+        self.assertEqual(written.written_count, 1)
+        self.assertEqual(written.results[0].total_score, 80)
+        self.assertEqual(written.results[1:], [None, None, None])
+        self.assertEqual([(error.index, error.student_number) for error in written.errors],
+                         [(1, '20259999'), (2, '20250002'), (3, '20250003')])
+        self.assertEqual(written.errors[0].message, 'Öğrenci bulunamadı: 20259999')
+        self.assertEqual(ExamResult.objects.filter(exam=self.exam).count(), 1)
+
+    def test_duplicates_in_batch(self):
+        written = write_exam_results(self.exam, [
+            ExamResultRow('20250001', [30, 50]),
+            ExamResultRow('20250001', [40, 60]),
+        ])
+        self.assertEqual(written.written_count, 1)
+        self.assertEqual([error.index for error in written.errors], [1])
+        self.assertEqual(ExamResult.objects.get(exam=self.exam).question_scores, [30, 50])
+
+    def test_existing_result_without_update_conflicts(self):
+        write_exam_results(self.exam, [ExamResultRow('20250001', [30, 50])])
+        written = write_exam_results(self.exam, [
+            ExamResultRow('20250001', [40, 60]),
+            ExamResultRow('20250002', [10, 20]),
+        ])
+        self.assertEqual([error.index for error in written.errors], [0])
+        self.assertIn('zaten sonucu var', written.errors[0].message)
+        self.assertEqual(ExamResult.objects.get(exam=self.exam, student__student_number='20250001').total_score, 80)
+
+    def test_update_conflicts(self):
+        first = write_exam_results(self.exam, [ExamResultRow('20250001', [30, 50])]).results[0]
+        written = write_exam_results(self.exam, [
+            ExamResultRow('20250001', [40, 60]),
+            ExamResultRow('20250002', [10, 20]),
+        ], update_conflicts=True)
+        self.assertEqual(written.errors, [])
+        self.assertEqual(written.results[0].pk, first.pk)
+        self.assertEqual(ExamResult.objects.filter(exam=self.exam).count(), 2)
+
+        updated = ExamResult.objects.get(pk=first.pk)
+        self.assertEqual((updated.total_score, updated.question_scores), (100, [40, 60]))
+        self.assertEqual(
+            list(QuestionScore.objects.filter(exam_result=updated).order_by('question_number')
+                 .values_list('score', flat=True)),
+            [40, 60]
+        )
+
+
+class OcrBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.pytesseract = mock.MagicMock()
+        patcher = mock.patch.dict(sys.modules, {'pytesseract': self.pytesseract})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        image = io.BytesIO()
+        Image.new('L', (20, 20), 255).save(image, format='PNG')
+        self.image = image.getvalue()
+
+    def test_normalize_lines(self):
+        lines = ['Ad Soyad:  Ali   Veli', '', '   ', 'Soru1 Soru2 Toplam', '20 30 50', 'Not: 20 puan', '85']
+        self.assertEqual(normalize_lines(lines),
+                         'Ad Soyad: Ali Veli\nSoru1\nSoru2\nToplam\n20\n30\n50\nNot: 20 puan\n85')
+
+    def test_tesseract_groups_words_into_lines(self):
+        self.pytesseract.image_to_data.return_value = {
+            'text': ['Öğrenci', 'No:', '20250001', '', 'Soru1', 'Soru2', '40', '60', 'gürültü'],
+            'conf': ['96', '95', '91', '-1', '90', '90', '88', '87', '-1'],
+            'left': [10, 80, 120, 0, 10, 60, 10, 60, 0],
+            'top': [5, 5, 5, 0, 40, 40, 70, 70, 0],
+            'width': [60, 30, 70, 0, 40, 40, 20, 20, 0],
+            'height': [12, 12, 12, 0, 12, 12, 12, 12, 0],
+            'page_num': [1] * 9,
+            'block_num': [1, 1, 1, 1, 2, 2, 2, 2, 3],
+            'par_num': [1] * 9,
+            'line_num': [1, 1, 1, 1, 1, 1, 2, 2, 1],
+        }
+
+        backend = TesseractBackend(lang='tur', tesseract_cmd='/opt/tesseract')
+        page, missing = backend.recognize([self.image, None])
+
+        self.assertIsNone(missing)
+        self.assertEqual(self.pytesseract.pytesseract.tesseract_cmd, '/opt/tesseract')
+        self.assertEqual(self.pytesseract.image_to_data.call_args.kwargs['lang'], 'tur')
+        self.assertEqual(page.engine, 'tesseract')
+        self.assertEqual(page.text, 'Öğrenci No: 20250001\nSoru1\nSoru2\n40\n60')
+        self.assertEqual([word.text for word in page.words],
+                         ['Öğrenci', 'No:', '20250001', 'Soru1', 'Soru2', '40', '60'])
+        self.assertAlmostEqual(page.words[2].confidence, 0.91)
+        self.assertEqual((page.words[2].left, page.words[2].width), (120, 70))
+
+    def test_tesseract_error_returns_none(self):
+        self.pytesseract.image_to_data.side_effect = RuntimeError('tesseract çalıştırılamadı')
+        self.assertEqual(TesseractBackend().recognize([self.image]), [None])
+
+    def test_get_backend(self):
+        backend = get_backend('tesseract', lang='eng')
+        self.assertIsInstance(backend, TesseractBackend)
+        self.assertEqual(backend.cache_settings()['lang'], 'eng')
+        self.assertEqual(get_backend('vision', batch_size=4).batch_size, 4)
+        with self.assertRaises(ValueError):
+            get_backend('abbyy')
+
+        with override_settings(OCR_BACKEND='tesseract', OCR_TESSERACT_LANG='tur', OCR_TESSERACT_CMD=None):
+            self.assertIsInstance(get_ocr_backend(), TesseractBackend)
+        with override_settings(OCR_BACKEND='vision', OCR_BATCH_SIZE=8):
+            backend = get_ocr_backend()
+            self.assertIsInstance(backend, VisionBackend)
+            self.assertEqual(backend.batch_size, 8)
+
+
+class PdfRenderingTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('utils.convert_from_path', return_value=[Image.new('RGB', (50, 70), 'white')])
+        self.convert = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(OCR_PDF_DPI=150)
+    def test_renders_only_requested_page_in_memory(self):
+        content = utils.load_image_content('/yok/toplu.pdf', page=2)
+
+        self.convert.assert_called_once_with('/yok/toplu.pdf', dpi=150, first_page=2, last_page=2,
+                                             poppler_path=mock.ANY)
+        with Image.open(io.BytesIO(content)) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (50, 70)))
+        # Çözünürlük OCR sonucunu etkilediğinden önbellek anahtarına girer
+        self.assertEqual(utils.get_ocr_settings()['pdf_dpi'], 150)
+
+    def test_defaults_to_first_page(self):
+        utils.load_image_content('/yok/kagit.pdf')
+        self.assertEqual(self.convert.call_args.kwargs['first_page'], 1)
+        self.assertEqual(self.convert.call_args.kwargs['last_page'], 1)
+
+        utils.load_image_content('/yok/kagit.pdf', dpi=72)
+        self.assertEqual(self.convert.call_args.kwargs['dpi'], 72)
+
+
+class PageSplittingTests(SimpleTestCase):
+    @mock.patch('utils.pdfinfo_from_path', return_value={'Pages': 3})
+    @mock.patch('utils.convert_from_path', side_effect=lambda *args, **kwargs: [Image.new('RGB', (10, 10))])
+    def test_one_task_per_page(self, convert, pdfinfo):
+        tasks = build_ocr_tasks('/yok/toplu.pdf', split_pages=True)
+
+        self.assertEqual([task.get_source() for task in tasks],
+                         [('/yok/toplu.pdf', 1), ('/yok/toplu.pdf', 2), ('/yok/toplu.pdf', 3)])
+        self.assertEqual([task.file_path for task in build_ocr_tasks('/yok/toplu.pdf')], ['/yok/toplu.pdf'])
+        self.assertIsNone(build_ocr_tasks('/yok/kagit.png', split_pages=True)[0].page_number)
+
+        # Her görev yalnızca kendi sayfasını render eder
+        backend = FakeOcrBackend()
+        backend.recognize = mock.Mock(side_effect=lambda contents: [None] * len(contents))
+        utils.process_exam_files([task.get_source() for task in tasks], 'BM101', 'GUZ', backend=backend)
+        rendered_pages = sorted((kwargs['first_page'], kwargs['last_page']) for _, kwargs in convert.call_args_list)
+        self.assertEqual(rendered_pages, [(1, 1), (2, 2), (3, 3)])
+        self.assertEqual(len(backend.recognize.call_args.args[0]), 3)
+
+    @mock.patch('utils.pdfinfo_from_path', side_effect=Exception('poppler yok'))
+    def test_unreadable_page_count_keeps_single_task(self, pdfinfo):
+        tasks = build_ocr_tasks('/yok/toplu.pdf', split_pages=True)
+        self.assertEqual([(task.file_path, task.page_number) for task in tasks], [('/yok/toplu.pdf', None)])
+
+
+class FakeVisionClientTests(SimpleTestCase):
+    def setUp(self):
+        ocr_backends.reset_vision_client()
+        self.addCleanup(ocr_backends.reset_vision_client)
+
+    @mock.patch.dict(os.environ, {'VISION_CLIENT_FACTORY': 'fake_vision.FakeVisionClient'})
+    def test_batch_path_uses_client_factory(self):
+        backend = VisionBackend(batch_size=2)
+        contents = [exam_paper_text(f'2025000{i}', [30, 50]).encode('utf-8') for i in range(1, 4)]
+        pages = backend.recognize(contents + [None])
+
+        client = ocr_backends.get_vision_client()
+        self.assertEqual(type(client).__name__, 'FakeVisionClient')
+        self.assertEqual((client.calls, client.images, backend.round_trips), (2, 3, 2))
+        self.assertIsNone(pages[3])
+        for i, page in enumerate(pages[:3], start=1):
+            self.assertIn(f'Öğrenci No: 2025000{i}', page.text)
+            self.assertEqual(page.engine, 'vision')
+
+
+class ExamParserTests(SimpleTestCase):
+    """Ayrıştırıcının eski satır içi ayrıştırıcıyla aynı sonucu verdiği örnekler"""
+
+    HEADER = 'Ad Soyad: Ali Veli\nÖğrenci No: 20250001\n12.01.2025\n'
+    CASES = [
+        ('tam kağıt', HEADER + 'Soru1\nSoru2\nToplam\n40\n60\n100\n30\n45\n75',
+         {'student_number': '20250001', 'student_name': 'Ali Veli', 'exam_date': '2025-01-12',
+          'question_scores': [40, 60], 'student_scores': [30, 45]}),
+        ("'Sorul' okuması ve tablo arasındaki metin", HEADER + 'Sorul\nSoru2\nSoru3\nToplam\nPuan\n'
+         '30\n30\n40\n100\nAlınan\n10\n20\n30\n60',
+         {'question_scores': [30, 30, 40], 'student_scores': [10, 20, 30], 'header_labels': ['Soru1', 'Soru2', 'Soru3']}),
+        ('toplam sütunu yok', HEADER + 'Soru1\nSoru2\n40\n60\n30\n45',
+         {'question_scores': [], 'student_scores': [], 'score_rows': []}),
+        ('yalnızca soru puanı satırı', HEADER + 'Soru1\nSoru2\nToplam\n40\n60\n100',
+         {'question_scores': [], 'student_scores': [], 'score_rows': [[40, 60, 100]]}),
+        ('başlıksız toplam', HEADER + 'Toplam\n40\n60\n100', {'score_rows': [], 'header_labels': []}),
+        ('boşluklu öğrenci numarası', 'Ad Soyad: Ayşe Yılmaz\nOgrenci No: 2025 00 01\n',
+         {'student_number': '20250001', 'student_name': 'Ayşe Yılmaz'}),
+        ('8 basamaktan uzun numara', 'Ad Soyad: Ali\nÖğrenci No: 2025000199\n', {'student_number': '20250001'}),
+        ('öğrenci bilgisi yok', 'Soru1\nToplam\n100\n100\n50\n50',
+         {'student_number': None, 'student_name': exam_parser.UNKNOWN_NAME, 'exam_date': None,
+          'question_scores': [100], 'student_scores': [50]}),
+        ('OCR karakter düzeltmesi', 'Ad Soyad: Do§an\nÖğrenci No: 20250001', {'student_name': 'Dogan'}),
+    ]
+
+    def test_cases(self):
+        for description, text, expected in self.CASES:
+            with self.subTest(description):
+                result = exam_parser.parse_exam_text(text).as_json()
+                self.assertEqual({key: result[key] for key in expected}, expected)
+
+    def test_warnings(self):
+        result = exam_parser.parse_exam_text('Soru1\nSoru2\nToplam\n40\n50\n90\n40\n50\n90')
+        self.assertEqual(result.warnings, ['Soru puanlarının toplamı 100 değil, 90', 'Öğrenci numarası bulunamadı'])
+        self.assertEqual(exam_parser.parse_exam_text(self.HEADER).warnings, [])
+
+    def test_reparse_command_keeps_eviction_order(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        with override_settings(OCR_CACHE_ENABLED=True, OCR_CACHE_DIR=cache_dir):
+            from .ocr_jobs import get_ocr_cache
+            cache = get_ocr_cache()
+            cache.set('a' * 64, exam_paper_text('20250001', [30, 50]), {'student_number': 'eski'})
+            cache.set('b' * 64, exam_paper_text('20250002', [30, 50]), {'student_number': 'eski'})
+            last_used = time.time() - 3600
+            cache.set('a' * 64, exam_paper_text('20250001', [30, 50]), {'student_number': 'eski'},
+                      last_used=last_used)
+
+            call_command('reparse_ocr_cache', stdout=io.StringIO())
+
+            self.assertEqual(cache.get('a' * 64, touch=False)['parsed']['student_number'], '20250001')
+            self.assertEqual(cache.last_used('a' * 64), last_used)
+
+
+class OcrResultCacheEvictionTests(SimpleTestCase):
+    def test_evict_runs_at_most_once_per_interval(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = OcrResultCache(directory, max_bytes=0)
+        cache.set('a' * 64, 'metin', {})
+
+        with mock.patch.object(cache, 'evict', wraps=cache.evict) as evict:
+            self.assertEqual(cache.evict_if_due(600), 1)
+            cache.set('b' * 64, 'metin', {})
+            self.assertEqual(cache.evict_if_due(600), 0)
+            self.assertEqual(evict.call_count, 1)
+            self.assertEqual(list(cache.keys()), ['b' * 64])
+
+            os.utime(os.path.join(directory, OcrResultCache.EVICT_MARKER), (0, 0))
+            self.assertEqual(cache.evict_if_due(600), 1)
+            self.assertEqual(evict.call_count, 2)
+            # İşaret dosyası tahliye edilmez
+            self.assertTrue(os.path.exists(os.path.join(directory, OcrResultCache.EVICT_MARKER)))
+
+
+class RosterTests(TestCase):
+    def test_header_mismatch(self):
+        with self.assertRaises(RosterError):
+            read_roster(io.BytesIO('Numara;İsim\n20253001;Ali Veli\n'.encode('utf-8')), 'liste.csv')
+        with self.assertRaises(RosterError):
+            read_roster(xlsx_file([['Numara', 'İsim'], [20253001, 'Ali Veli']]))
+
+    def test_csv_skips_blank_rows(self):
+        content = '\ufeffÖğrenci No;Ad Soyad\n20253001;Ali Veli\n;\n\n 20253002 ; Ayşe Kaya \n'
+        rows = list(read_roster(io.BytesIO(content.encode('utf-8')), 'liste.csv'))
+        self.assertEqual(rows, [('20253001', 'Ali Veli'), ('20253002', 'Ayşe Kaya')])
+
+    def test_xlsx_numeric_student_numbers(self):
+        file = xlsx_file([
+            ['Ad Soyad', 'Öğrenci No'],
+            ['Ali Veli', 20253001.0],
+            [None, None],
+            ['Ayşe Kaya', 20253002],
+        ])
+        self.assertEqual(list(read_roster(file)), [('20253001', 'Ali Veli'), ('20253002', 'Ayşe Kaya')])
+
+    def test_import_links_course_once(self):
+        course = create_exam().course
+        existing = Student.objects.create(student_number='20253001', full_name='Ali Veli')
+        existing.courses.add(course)
+
+        result = import_roster([('20253001', 'Başka Ad'), ('20253002', 'Ayşe Kaya'), ('20253002', 'Tekrar')],
+                               course=course)
+
+        self.assertEqual((result.existing_count, result.created_count, result.linked_count), (1, 1, 1))
+        self.assertEqual(Student.objects.get(student_number='20253002').full_name, 'Ayşe Kaya')
+        self.assertEqual(Student.objects.get(student_number='20253001').full_name, 'Ali Veli')
+        self.assertEqual(course.student_set.count(), 2)
+
+
+class GradebookTests(TestCase):
+    def test_columns_and_rows(self):
+        vize = create_exam('BM101', (40, 60))
+        final = create_exam('BM101', (20, 30, 50), exam_type='FINAL')
+        other_vize = create_exam('BM102', (30, 30, 40))
+        ali = Student.objects.create(student_number='20253001', full_name='Ali Veli')
+        ayse = Student.objects.create(student_number='20253002', full_name='Ayşe Kaya')
+        ExamResult.objects.bulk_create([
+            ExamResult(exam=final, student=ali, total_score=70, question_scores=[20, 20, 30]),
+            ExamResult(exam=vize, student=ali, total_score=80, question_scores=[30, 50]),
+            ExamResult(exam=vize, student=ayse, total_score=40, question_scores=[10, 30]),
+            ExamResult(exam=other_vize, student=ali, total_score=90, question_scores=[30, 30, 30]),
+        ])
+
+        columns, rows = get_gradebook()
+
+        self.assertEqual(columns, ['Ders Kodu', 'Dönem', 'Öğrenci No', 'Ad Soyad',
+                                   'Vize Toplam', 'Vize S1', 'Vize S2', 'Vize S3',
+                                   'Final Toplam', 'Final S1', 'Final S2', 'Final S3'])
+        self.assertEqual(list(rows), [
+            ['BM101', 'Güz', '20253001', 'Ali Veli', 80, 30, 50, None, 70, 20, 20, 30],
+            ['BM101', 'Güz', '20253002', 'Ayşe Kaya', 40, 10, 30, None, None, None, None, None],
+            ['BM102', 'Güz', '20253001', 'Ali Veli', 90, 30, 30, 30, None, None, None, None],
+        ])
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@unittest.skipUnless(_has_pyarrow(), 'Anlık görüntü testleri pyarrow gerektirir')
+class SnapshotTests(TestCase):
+    def read_ids(self, directory):
+        import pyarrow.parquet
+        return {
+            name: pyarrow.parquet.read_table(os.path.join(directory, name), columns=['id']).column('id').to_pylist()
+            for name in os.listdir(directory) if name.endswith('.parquet')
+        }
+
+    def test_second_run_exports_only_new_results(self):
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        exam = create_exam()
+        students = [Student.objects.create(student_number=f'2025300{i}', full_name='Öğrenci') for i in range(3)]
+        first = ExamResult.objects.create(exam=exam, student=students[0], total_score=50, question_scores=[20, 30])
+
+        self.assertEqual(export_snapshot(output_dir, tables=['exam_results'])['exam_results'], 1)
+        self.assertEqual(export_snapshot(output_dir, tables=['exam_results'])['exam_results'], 0)
+
+        second = ExamResult.objects.create(exam=exam, student=students[1], total_score=70, question_scores=[30, 40])
+        third = ExamResult.objects.create(exam=exam, student=students[2], total_score=90, question_scores=[40, 50])
+        self.assertEqual(export_snapshot(output_dir, tables=['exam_results'])['exam_results'], 2)
+
+        parts = self.read_ids(os.path.join(output_dir, 'exam_results'))
+        self.assertEqual(sorted(parts.values()), [[first.id], [second.id, third.id]])
+
+        # Tam aktarım eski parçaların yerine tek parça yazar
+        self.assertEqual(export_snapshot(output_dir, tables=['exam_results'], full=True)['exam_results'], 3)
+        parts = self.read_ids(os.path.join(output_dir, 'exam_results'))
+        self.assertEqual(list(parts.values()), [[first.id, second.id, third.id]])
+
+
+class ScoreMatrixTests(TestCase):
+    SCORES = [[10, 30, 0], [20, 0, 0], [30, 15, 0], [0, 25, 0]]
+
+    def create_results(self, exam, question_scores):
+        students = [
+            Student.objects.create(student_number=f'2025{index:05d}' if index % 2 else f'25253{index:04d}',
+                                   full_name='Öğrenci')
+            for index in range(len(question_scores))
+        ]
+        ExamResult.objects.bulk_create([
+            ExamResult(exam=exam, student=student, total_score=sum(scores or []), question_scores=scores)
+            for student, scores in zip(students, question_scores)
+        ])
+
+    def test_question_summary(self):
+        exam = create_exam(question_scores=(30, 30, 40))
+        self.create_results(exam, self.SCORES)
+
+        summary = load_score_matrix(exam).question_summary()
+
+        self.assertEqual([row['question_number'] for row in summary], [1, 2, 3])
+        for row, column, max_score in zip(summary, zip(*self.SCORES), exam.question_scores):
+            self.assertEqual(row['count'], 4)
+            self.assertEqual(row['question_score'], max_score)
+            self.assertAlmostEqual(row['avg_score'], np.mean(column))
+            self.assertAlmostEqual(row['std_dev'], np.std(column))
+            self.assertAlmostEqual(row['median_score'], np.median(column))
+            self.assertAlmostEqual(row['percentile_25'], np.percentile(column, 25))
+            self.assertAlmostEqual(row['percentile_75'], np.percentile(column, 75))
+            self.assertEqual(row['min_score'], min(column))
+            self.assertEqual(row['max_received_score'], max(column))
+            self.assertAlmostEqual(row['success_rate'], np.mean(column) / max_score * 100)
+        self.assertEqual([row['min_non_zero_score'] for row in summary], [10, 15, None])
+
+    def test_exam_and_department_summary(self):
+        exam = create_exam(question_scores=(30, 30, 40))
+        self.create_results(exam, self.SCORES)
+        matrix = load_score_matrix(exam)
+
+        totals = [sum(scores) for scores in self.SCORES]
+        summary = matrix.exam_summary()
+        self.assertEqual(summary['count'], 4)
+        self.assertAlmostEqual(summary['avg_score'], np.mean(totals))
+        self.assertAlmostEqual(summary['median_score'], np.median(totals))
+        self.assertEqual(matrix.department_average('CENG'), (np.mean(totals[0::2]), 2))
+        self.assertEqual(list(matrix.student_summary()['percentile_ranks']), [50, 0, 75, 25])
+
+    def test_ragged_question_scores(self):
+        exam = create_exam(question_scores=(40, 60))
+        # Soru sayısı sınavla uyuşmayan eski kayıtlar: eksik sorular 0, fazlalar yok sayılır
+        self.create_results(exam, [[10, 20], [5], [30, 40, 50]])
+
+        matrix = load_score_matrix(exam)
+
+        self.assertEqual(matrix.scores.tolist(), [[10, 20], [5, 0], [30, 40]])
+        self.assertEqual([row['min_non_zero_score'] for row in matrix.question_summary()], [5, 20])
+
+    def test_exam_without_results(self):
+        exam = create_exam(question_scores=(40, 60))
+
+        matrix = load_score_matrix(exam)
+
+        self.assertEqual(matrix.student_count, 0)
+        self.assertEqual(matrix.scores.shape, (0, 2))
+        summary = matrix.question_summary()
+        self.assertEqual([(row['question_number'], row['question_score'], row['count']) for row in summary],
+                         [(1, 40, 0), (2, 60, 0)])
+        self.assertIsNone(summary[0]['median_score'])
+        self.assertEqual(matrix.exam_summary()['count'], 0)
+        self.assertEqual(matrix.department_average('CENG'), (0, 0))
+        response = log_in(self.client).get(reverse('exam_analysis', args=[exam.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['num_students'], 0)
+
+
+class ReportsViewTests(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(student_number='202500001', full_name='Öğrenci')
+        log_in(self.client)
+
+    def create_exam_with_result(self, code, exam_type='VIZE', semester='GUZ', day=0):
+        exam = create_exam(code, (40, 60), exam_type=exam_type, semester=semester,
+                           exam_date=date(2025, 1, 1) + timedelta(days=day))
+        write_exam_results(exam, [ExamResultRow(self.student.student_number, [20, 30])])
+        return exam
+
+    def create_exams(self, count, start=0):
+        return [self.create_exam_with_result(f'BM{index:03d}', day=index) for index in range(start, start + count)]
+
+    def test_query_count_does_not_grow_with_exams(self):
+        self.create_exams(3)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('reports'))
+        self.assertEqual(len(response.context['report_data']), 3)
+
+        self.create_exams(6, start=3)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('reports'))
+        self.assertEqual(len(response.context['report_data']), 9)
+        self.assertEqual(response.context['report_data'][0]['success_rates'], [50.0, 50.0])
+
+    def test_pagination(self):
+        exams = self.create_exams(12)
+        create_exam('BM999')  # Sonucu olmayan sınav listelenmez
+
+        first_page = self.client.get(reverse('reports'))
+        second_page = self.client.get(reverse('reports'), {'page': 2})
+
+        self.assertEqual(first_page.context['page_obj'].paginator.count, 12)
+        self.assertEqual([row['exam_id'] for row in first_page.context['report_data']],
+                         [exam.id for exam in reversed(exams[2:])])
+        self.assertEqual([row['exam_id'] for row in second_page.context['report_data']],
+                         [exams[1].id, exams[0].id])
+
+    def test_course_and_semester_filters(self):
+        midterm = self.create_exam_with_result('BM101')
+        final = self.create_exam_with_result('BM101', exam_type='FINAL')
+        spring = self.create_exam_with_result('BM101', semester='BAHAR')
+        other_course = self.create_exam_with_result('BM102')
+
+        def exam_ids(**params):
+            response = self.client.get(reverse('reports'), params)
+            return {row['exam_id'] for row in response.context['report_data']}
+
+        self.assertEqual(exam_ids(course='BM101'), {midterm.id, final.id, spring.id})
+        self.assertEqual(exam_ids(semester='BAHAR'), {spring.id})
+        self.assertEqual(exam_ids(course='BM101', semester='GUZ'), {midterm.id, final.id})
+        self.assertEqual(exam_ids(course='BM102', semester='GUZ'), {other_course.id})
+        response = self.client.get(reverse('reports'), {'course': 'BM101', 'semester': 'GUZ'})
+        self.assertEqual(response.context['filter_query'], '&course=BM101&semester=GUZ')
+
+
+class ExcelExportTests(TestCase):
+    def setUp(self):
+        log_in(self.client)
+
+    def load_response(self, response):
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+        content = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(content))
+        return load_workbook(io.BytesIO(content), read_only=True).active
+
+    def test_student_list_export(self):
+        # Sayfalama (10 öğrenci) dışa aktarımı sınırlamamalı
+        for index in range(12):
+            Student.objects.create(student_number=f'2025{index:05d}', full_name=f'Öğrenci {index}')
+
+        sheet = self.load_response(self.client.get(reverse('student_list'), {'export': 'excel'}))
+
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(rows[0], ('Öğrenci No', 'Ad Soyad', 'Bölüm'))
+        self.assertEqual(len(rows), 13)
+        self.assertEqual(rows[1], ('202500000', 'Öğrenci 0', 'Diğer'))
+
+    def test_exam_analysis_export(self):
+        exam = create_exam(question_scores=(30, 30, 40))
+        for index, scores in enumerate([[10, 30, 0], [20, 0, 40]]):
+            student = Student.objects.create(student_number=f'2025{index:05d}', full_name='Öğrenci')
+            write_exam_results(exam, [ExamResultRow(student.student_number, scores)])
+
+        sheet = self.load_response(self.client.get(reverse('exam_analysis', args=[exam.id]), {'export': 'excel'}))
+
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(rows[0], ('Soru No', 'Soru Puanı', 'Maks Puan', 'Min Puan', 'Min Sıfırdan Farklı Puan',
+                                   'Ort Puan', 'Medyan', 'Std Sapma', 'Başarı Oranı'))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][:6], ('Soru 1', 30, 20, 10, 10, 15))
+        self.assertEqual(rows[3][4], 40)
@@ -0,0 +1,306 @@
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+
+from django.db import transaction
+
+from .models import OcrTask, UploadedExamFile, UploadSession
+from .ocr_jobs import add_tasks_to_job, build_ocr_tasks, close_ocr_job, save_ocr_job
+
+logger = logging.getLogger('user_actions')
+
+# Sonucu henüz veritabanına yazılmamış, OCR kuyruğuna tekrar alınabilecek dosyalar
+RESUMABLE_STATES = ['STORED', 'OCR_DONE', 'PARSED']
+
+ALLOWED_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png')
+MAX_CHUNK_SIZE = 8 * 1024 * 1024  # Tek istekte kabul edilen en büyük parça
+
+
+class UploadError(Exception):
+    """Parçalı yükleme isteği geçersiz olduğunda; mesaj kullanıcıya gösterilir"""
+
+
+class ChunkOffsetError(UploadError):
+    """Parça, sunucudaki dosyanın devamı değil; istemci received'dan devam etmelidir"""
+
+    def __init__(self, received):
+        super().__init__(f"Yükleme {received}. bayttan devam etmeli.")
+        self.received = received
+
+
+def get_session_key(key=None):
+    """Formdan gelen oturum anahtarını doğrular; geçersiz ya da boşsa yeni anahtar üretir"""
+    try:
+        return uuid.UUID(key).hex
+    except (TypeError, ValueError):
+        return uuid.uuid4().hex
+
+
+def get_upload_session(key):
+    """Anahtara ait yükleme oturumunu döndürür, yoksa None"""
+    if not key:
+        return None
+    return UploadSession.objects.select_related('exam__course').filter(key=key).first()
+
+
+def start_upload_session(key, exam, lecturer, upload_path):
+    session, _ = UploadSession.objects.get_or_create(
+        key=key,
+        defaults={'exam': exam, 'lecturer': lecturer, 'upload_path': upload_path}
+    )
+    return session
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _mark_stored(record, size, sha256):
+    """Dosyayı kaydedildi olarak işaretler; içerik değiştiyse eski OCR görevleriyle bağı koparılır"""
+    with transaction.atomic():
+        if record.sha256 and record.sha256 != sha256:
+            record.ocr_tasks.update(uploaded_file=None)
+        record.size = size
+        record.sha256 = sha256
+        record.state = 'STORED'
+        record.error = ''
+        record.save()
+    return record
+
+
+def store_uploaded_file(session, uploaded_file):
+    """
+    Yüklenen dosyayı oturum klasörüne yazar ve STORED olarak işaretler.
+    Aynı ad ve içerikle daha önce kaydedilmiş dosya tekrar yazılmaz ve durumu korunur;
+    içerik değiştiyse eski OCR görevleriyle bağı koparılıp dosya baştan işlenir.
+    """
+    file_name = os.path.basename(uploaded_file.name)
+    record, _ = UploadedExamFile.objects.get_or_create(
+        session=session,
+        file_name=file_name,
+        defaults={'file_path': os.path.join(session.upload_path, file_name)}
+    )
+
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    sha256 = digest.hexdigest()
+    if record.is_stored and record.sha256 == sha256 and os.path.exists(record.file_path):
+        return record
+
+    os.makedirs(session.upload_path, exist_ok=True)
+    temp_path = f"{record.file_path}.part"
+    with open(temp_path, 'wb+') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    os.replace(temp_path, record.file_path)
+    return _mark_stored(record, uploaded_file.size, sha256)
+
+
+def _part_path(record):
+    return f"{record.file_path}.part"
+
+
+def get_received_bytes(record):
+    """Parçalı yüklemede sunucuya ulaşmış bayt sayısı"""
+    if record.is_stored:
+        return record.size
+    try:
+        return os.path.getsize(_part_path(record))
+    except OSError:
+        return 0
+
+
+def start_chunked_file(session, file_name, size, sha256=''):
+    """
+    Parçalı yüklenecek dosyayı oturuma kaydeder ve (kayıt, alınmış bayt sayısı) döndürür.
+    Aynı dosyanın yarım kalan yüklemesi varsa kaldığı yerden devam edilir; aynı içerik
+    daha önce kaydedildiyse hiç parça gönderilmesi gerekmez.
+    """
+    file_name = os.path.basename(file_name)
+    if not file_name.lower().endswith(ALLOWED_EXTENSIONS):
+        raise UploadError(f"Desteklenmeyen dosya türü: {file_name}")
+
+    record, _ = UploadedExamFile.objects.get_or_create(
+        session=session,
+        file_name=file_name,
+        defaults={'file_path': os.path.join(session.upload_path, file_name), 'size': size, 'sha256': sha256}
+    )
+    same_file = record.size == size and (not sha256 or record.sha256 == sha256)
+    if record.is_stored and same_file and os.path.exists(record.file_path):
+        return record, size
+
+    if not same_file or record.is_stored:
+        # Farklı bir dosya yükleniyor: yarım kalan parça silinir, eski OCR sonuçlarıyla bağ koparılır
+        with transaction.atomic():
+            record.ocr_tasks.update(uploaded_file=None)
+            record.size = size
+            record.sha256 = sha256
+            record.state = 'PENDING'
+            record.error = ''
+            record.save()
+        if os.path.exists(_part_path(record)):
+            os.remove(_part_path(record))
+    return record, get_received_bytes(record)
+
+
+def write_chunk(record, offset, stream, length, sha256):
+    """
+    Parçanın SHA-256'sını doğrulayıp dosyanın offset konumuna yazar ve alınmış toplam bayt sayısını döndürür.
+    Parça önce geçici dosyaya alınır; sağlama toplamı gönderilmediyse ya da uyuşmuyorsa dosyaya
+    hiç yazılmadan UploadError oluşur. Daha önce alınmış bir parça tekrar gönderilirse yerinde
+    üzerine yazılır, sonraki baytlar korunur; aradaki bir parça eksikse ChunkOffsetError oluşur.
+    """
+    if record.is_stored:
+        return record.size
+    if not sha256:
+        raise UploadError("Parçanın sağlama toplamı (SHA-256) gönderilmedi.")
+    if length > MAX_CHUNK_SIZE:
+        raise UploadError(f"Parça en fazla {MAX_CHUNK_SIZE // (1024 * 1024)} MB olabilir.")
+    if offset + length > record.size:
+        raise UploadError("Parça dosya boyutunu aşıyor.")
+
+    received = get_received_bytes(record)
+    if offset > received:
+        raise ChunkOffsetError(received)
+
+    os.makedirs(os.path.dirname(record.file_path), exist_ok=True)
+    part_path = _part_path(record)
+    chunk_path = f"{part_path}.{uuid.uuid4().hex}.chunk"
+    digest = hashlib.sha256()
+    try:
+        with open(chunk_path, 'w+b') as chunk:
+            remaining = length
+            while remaining > 0:
+                block = stream.read(min(remaining, 64 * 1024))
+                if not block:
+                    break
+                digest.update(block)
+                chunk.write(block)
+                remaining -= len(block)
+            if digest.hexdigest() != sha256.lower():
+                raise UploadError("Parçanın sağlama toplamı (SHA-256) uyuşmuyor, parça tekrar gönderilmeli.")
+
+            chunk.seek(0)
+            with open(part_path, 'r+b' if os.path.exists(part_path) else 'wb') as f:
+                f.seek(offset)
+                shutil.copyfileobj(chunk, f)
+    finally:
+        os.remove(chunk_path)
+    return get_received_bytes(record)
+
+
+def complete_chunked_file(record):
+    """
+    Tüm parçalar alındıysa dosyayı kalıcı yerine taşır. Her parça yazılırken doğrulandığından
+    dosyanın SHA-256'sı yalnızca başlangıçta gönderildiyse ayrıca karşılaştırılır.
+    """
+    if record.is_stored:
+        return record
+
+    received = get_received_bytes(record)
+    if received != record.size:
+        raise UploadError(f"{record.file_name} eksik yüklendi ({received}/{record.size} bayt).")
+
+    part_path = _part_path(record)
+    sha256 = _file_sha256(part_path)
+    if record.sha256 and sha256 != record.sha256:
+        os.remove(part_path)
+        record.error = 'Sağlama toplamı (SHA-256) uyuşmuyor, dosya tekrar yüklenmeli.'
+        record.save(update_fields=['error', 'updated_at'])
+        raise UploadError(f"{record.file_name}: {record.error}")
+
+    os.replace(part_path, record.file_path)
+    return _mark_stored(record, received, sha256)
+
+
+def mark_upload_failed(session, file_name, error):
+    """Kaydedilemeyen dosyayı hatasıyla birlikte oturuma ekler; tekrar gönderildiğinde yazılır"""
+    UploadedExamFile.objects.update_or_create(
+        session=session,
+        file_name=os.path.basename(file_name),
+        defaults={
+            'file_path': os.path.join(session.upload_path, os.path.basename(file_name)),
+            'state': 'PENDING',
+            'error': error,
+        }
+    )
+
+
+def _build_session_tasks(session, files, split_pages):
+    """Sonucu kaydedilmemiş dosya/sayfalar için görevler; kuyrukta bekleyen dosyalar atlanır"""
+    session_tasks = OcrTask.objects.filter(uploaded_file__session=session)
+    queued_file_ids = set(
+        session_tasks.filter(status__in=['PENDING', 'RUNNING']).values_list('uploaded_file_id', flat=True)
+    )
+    done_pages = set(session_tasks.filter(status='DONE').values_list('uploaded_file_id', 'page_number'))
+
+    tasks = []
+    for uploaded_file in files:
+        if uploaded_file.id in queued_file_ids:
+            continue
+        for task in build_ocr_tasks(uploaded_file.file_path, split_pages):
+            if (uploaded_file.id, task.page_number) not in done_pages:
+                task.uploaded_file = uploaded_file
+                tasks.append(task)
+    return tasks
+
+
+def _pending_roster_numbers(session, roster_numbers):
+    """Önceki denemelerde sonucu kaydedilen öğrenciler eksik listesinde gösterilmez"""
+    persisted_numbers = set(
+        OcrTask.objects.filter(uploaded_file__session=session, status='DONE').values_list('student_number', flat=True)
+    )
+    return set(roster_numbers or []) - persisted_numbers
+
+
+def queue_upload_session(session, lecturer, roster_numbers=None, split_pages=False):
+    """
+    Kaydedilmiş ama sonucu veritabanına yazılmamış dosyalar için yeni bir OCR işi oluşturur.
+    Kuyrukta bekleyen dosyalar ve sonucu kaydedilmiş sayfalar atlanır; daha önce OCR'ı
+    yapılmış dosyalar OCR önbelleğinden okunduğundan Vision'a tekrar gönderilmez.
+    Kuyruğa alınacak dosya yoksa None döndürür.
+    """
+    files = list(session.files.filter(state__in=RESUMABLE_STATES))
+    tasks = _build_session_tasks(session, files, split_pages) if files else []
+    if not tasks:
+        return None
+    return save_ocr_job(session.exam, lecturer, tasks, _pending_roster_numbers(session, roster_numbers),
+                        upload_session=session)
+
+
+def open_upload_job(session, lecturer, roster_numbers=None):
+    """Parçalı yükleme için, dosyalar tamamlandıkça görev eklenecek açık bir OCR işi oluşturur"""
+    for job in session.ocr_jobs.filter(is_open=True):
+        close_ocr_job(job)
+    return save_ocr_job(session.exam, lecturer, [], _pending_roster_numbers(session, roster_numbers),
+                        upload_session=session, is_open=True)
+
+
+def queue_uploaded_file(session, record):
+    """
+    Yüklemesi tamamlanan dosyayı diğer dosyaları beklemeden oturumun açık OCR işine ekler.
+    Açık iş yoksa dosya için yeni bir iş oluşturulur. Eklenen görev sayısını döndürür.
+    """
+    tasks = _build_session_tasks(session, [record], session.split_pages)
+    if not tasks:
+        return 0
+
+    job = session.ocr_jobs.filter(is_open=True).order_by('-id').first()
+    if job:
+        add_tasks_to_job(job, tasks)
+    else:
+        save_ocr_job(session.exam, session.lecturer, tasks, upload_session=session)
+    return len(tasks)
+
+
+def finish_upload_session(session):
+    """Oturumun açık OCR işini kapatır ve döndürür; açık iş yoksa None"""
+    job = session.ocr_jobs.filter(is_open=True).order_by('-id').first()
+    return close_ocr_job(job) if job else None
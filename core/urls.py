@@ -23,6 +23,8 @@ urlpatterns = [
     path('ogrenci-analiz/<str:student_number>/sinav-kagidi-goruntule/', views.view_exam_paper, name='view_exam_paper'),
     path('ogrenci-analiz/<str:student_number>/sinav-kagidi-indir/', views.download_exam_paper,
          name='download_exam_paper'),
+    path('ogrenci-analiz/<str:student_number>/sinav-kagidi-gorsel/<str:name>/', views.exam_paper_rendition,
+         name='exam_paper_rendition'),
     # urls.py'a eklenecek
     path('manuel-sinav-girisi/', views.manual_exam_result, name='manual_exam_result'),
 
@@ -35,9 +37,18 @@ urlpatterns = [
 
     # Raporlama ve grafikler
     path('raporlar/', views.reports, name='reports'),
+    path('raporlar/not-defteri/', views.gradebook_export, name='gradebook_export'),
     path('grafikler/', views.graphs, name='graphs'),
 
     # API endpoints
     path('api/graph-data/', views.get_graph_data, name='graph_data'),
     path('api/graph-metadata/', views.get_graph_metadata, name='graph_metadata'),
+    path('api/ocr-job/<int:job_id>/', views.get_ocr_job_progress, name='ocr_job_progress'),
+    path('api/ocr-task/<int:task_id>/gorsel/<str:name>/', views.ocr_task_rendition, name='ocr_task_rendition'),
+    path('api/upload/<str:session_key>/files/', views.upload_file_start, name='upload_file_start'),
+    path('api/upload/<str:session_key>/files/<int:file_id>/chunk/', views.upload_file_chunk,
+         name='upload_file_chunk'),
+    path('api/upload/<str:session_key>/files/<int:file_id>/complete/', views.upload_file_complete,
+         name='upload_file_complete'),
+    path('api/upload/<str:session_key>/finish/', views.upload_session_finish, name='upload_session_finish'),
 ]
@@ -4,7 +4,6 @@ from django.contrib import messages
 from django.conf import settings
 from datetime import timedelta
 from django.core.exceptions import ValidationError
-from utils import process_exam_file
 from .forms import OutcomeAddForm, ManualExamResultForm
 from .models import Lecturer, Course, ExamQuestionOutcome
 import os
@@ -12,14 +11,14 @@ from datetime import datetime
 from django.db.models import Q
 from django.core.paginator import Paginator
 from django.http import HttpResponse
-import xlwt
+import numpy as np
 from openpyxl import Workbook
 from django.http import JsonResponse
 from django.db.models import Count, Avg, Max, Min
 from django.views.decorators.http import require_http_methods
 from django.db.models.functions import ExtractYear, ExtractMonth
 import json
-from django.http import FileResponse, Http404
+from django.http import Http404
 from .forms import ExamPaperUploadForm
 from .models import ExamPaper
 from django.core.files.storage import default_storage
@@ -27,9 +26,21 @@ from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from .forms import LoginForm, FirstPasswordForm, CustomSetPasswordForm
 import logging
-from .models import UserLog
+from .models import UserLog, OcrJob, OcrTask
+from .analytics import load_score_matrix
+from .exam_statistics import get_question_statistics, get_question_success_rates
+from .exports import csv_response, xlsx_response
+from .file_responses import ranged_file_response
+from .renditions import RENDITIONS, RenditionError, build_renditions, get_rendition
+from .gradebook import GRADEBOOK_FORMATS, get_gradebook, get_gradebook_filename
+from .rosters import RosterError, import_roster, read_roster
+from .upload_sessions import (ChunkOffsetError, UploadError, complete_chunked_file, finish_upload_session,
+                              get_session_key, get_upload_session, mark_upload_failed, open_upload_job,
+                              queue_upload_session, queue_uploaded_file, start_chunked_file,
+                              start_upload_session, store_uploaded_file, write_chunk)
+from django.urls import reverse
+from urllib.parse import urlencode
 from django.utils import timezone
-import pandas as pd
 from core.models import Student, Exam, ExamResult
 from django.db import transaction
 
@@ -223,15 +234,22 @@ def exam_upload(request):
     lecturer = Lecturer.objects.get(username=request.session.get('lecturer_username'))
 
     if request.method == 'POST':
+        upload_key = get_session_key(request.POST.get('upload_session'))
+        retry_url = f"{reverse('exam_upload')}?upload_session={upload_key}"
         try:
             upload_type = request.POST.get('upload_type')
             upload_path = None
             semester = None
             exam = None
             excel_students = set()  # Excel'deki tüm öğrenciler
-            processed_students = set()  # OCR ile başarıyla işlenen öğrenciler
+            # Aynı form tekrar gönderildiğinde sınav yeniden oluşturulmaz, yalnızca eksik dosyalar işlenir
+            upload_session = get_upload_session(upload_key)
 
-            if upload_type == 'existing':
+            if upload_session:
+                exam = upload_session.exam
+                upload_path = upload_session.upload_path
+
+            elif upload_type == 'existing':
                 exam_id = request.POST.get('existing_exam_id')
                 try:
                     exam = Exam.objects.get(id=exam_id)
@@ -255,6 +273,7 @@ def exam_upload(request):
                 semester = request.POST.get('semester')
                 exam_type = request.POST.get('exam_type')
                 exam_date = request.POST.get('exam_date')
+                ocr_template = request.POST.get('ocr_template', '')
 
                 if not course_code:
                     messages.error(request, 'Yeni bir sınav oluşturmak için ders seçmelisiniz.')
@@ -278,6 +297,7 @@ def exam_upload(request):
                     exam_type=exam_type,
                     exam_date=exam_date,
                     question_count=0,
+                    ocr_template=ocr_template,
                     created_at=timezone.now()
                 )
                 log_user_action(
@@ -287,116 +307,87 @@ def exam_upload(request):
                     f'{lecturer.full_name} tarafından {course.code} dersi için yeni {exam.get_exam_type_display()} sınavı oluşturuldu'
                 )
 
+            if exam and upload_path and not upload_session:
+                upload_session = start_upload_session(upload_key, exam, lecturer, upload_path)
+
             # Excel dosyasından öğrenci bilgilerini kaydet
             student_list = request.FILES.get('student_list')
             if student_list:
                 try:
-                    df = pd.read_excel(student_list)
-                    required_columns = ['Öğrenci No', 'Ad Soyad']
-                    if not all(col in df.columns for col in required_columns):
-                        messages.error(request, 'Excel dosyası gerekli sütunları içermiyor.')
-                        return redirect('exam_upload')
-
-                    student_count = 0
+                    roster = import_roster(read_roster(student_list), course=exam.course if exam else None)
                     # Excel'deki tüm öğrenci numaralarını kaydet
-                    excel_students = set(str(num).strip() for num in df['Öğrenci No'])
-
-                    for _, row in df.iterrows():
-                        student_number = str(row['Öğrenci No']).strip()
-                        full_name = row['Ad Soyad'].strip()
-                        student, created = Student.objects.get_or_create(
-                            student_number=student_number,
-                            defaults={'full_name': full_name}
-                        )
-                        if created:
-                            student_count += 1
+                    excel_students = roster.student_numbers
 
-                    if student_count > 0:
+                    if roster.created_count > 0:
                         log_user_action(
                             request,
                             lecturer,
                             'STUDENT_ADD',
-                            f'{lecturer.full_name} tarafından {student_count} yeni öğrenci eklendi'
+                            f'{lecturer.full_name} tarafından {roster.created_count} yeni öğrenci eklendi'
                         )
 
+                except RosterError as e:
+                    messages.error(request, str(e))
+                    return redirect(retry_url)
                 except Exception as e:
                     messages.error(request, f'Excel dosyası okunurken hata oluştu: {str(e)}')
-                    return redirect('exam_upload')
+                    return redirect(retry_url)
 
             # Sınav dosyalarını kaydet ve işle
             if upload_path:
                 os.makedirs(upload_path, exist_ok=True)
+                split_pages = request.POST.get('split_pages') == 'on'
+
+                # Parçalı yüklemede dosyalar ayrı isteklerle gönderilir (exam_upload.js)
+                if request.POST.get('chunked_upload') == '1':
+                    upload_session.split_pages = split_pages
+                    upload_session.save(update_fields=['split_pages', 'updated_at'])
+                    job = open_upload_job(upload_session, lecturer, excel_students)
+                    return JsonResponse({
+                        'upload_session': upload_key,
+                        'job_id': job.id,
+                        'files_url': reverse('upload_file_start', args=[upload_key]),
+                        'finish_url': reverse('upload_session_finish', args=[upload_key]),
+                    })
 
                 exam_files = request.FILES.getlist('exam_files')
                 if not exam_files:
                     messages.error(request, 'Lütfen sınav dosyalarını yükleyin.')
-                    return redirect('exam_upload')
-
-                success_count = 0
-                failure_count = 0
-                first_file = True
+                    return redirect(retry_url)
 
+                failed_files = []
                 for file in exam_files:
-                    file_path = os.path.join(upload_path, file.name)
-                    with open(file_path, 'wb+') as destination:
-                        for chunk in file.chunks():
-                            destination.write(chunk)
-
-                    result = process_exam_file(file_path, exam.course.code, semester)
-
-                    if first_file and result['question_scores']:
-                        exam.question_count = len(result['question_scores'])
-                        exam.question_scores = result['question_scores']
-                        try:
-                            exam.full_clean()
-                            exam.save()
-                        except ValidationError as e:
-                            messages.error(request, f"Sınav puanları geçersiz: {str(e)}")
-                            return redirect('exam_upload')
-                        first_file = False
-
-                    if not result['student_number']:
-                        failure_count += 1
-                        continue
-                    else:
-                        processed_students.add(result['student_number'])
-
                     try:
-                        student = Student.objects.get(student_number=result['student_number'])
-                        exam_result = ExamResult(
-                            exam=exam,
-                            student=student,
-                            total_score=sum(result['student_scores']),
-                            question_scores=result['student_scores']
-                        )
-                        exam_result.full_clean()
-                        exam_result.save()
-                        success_count += 1
-                    except (Student.DoesNotExist, ValidationError) as e:
-                        failure_count += 1
-                        continue
-
-                # OCR ile okunamayan öğrencileri tespit et
-                failed_ocr_students = list(excel_students - processed_students)
-
-                if failed_ocr_students:
-                    # Session'a başarısız öğrenci listesini ve sınav ID'sini kaydet
-                    request.session['failed_ocr_students'] = failed_ocr_students
-                    request.session['current_exam_id'] = exam.id
-                    failed_msg = "Aşağıdaki öğrenci numaralarına ait sınav kağıtları okunamadı:\n"
-                    failed_msg += ", ".join(failed_ocr_students)
-                    messages.warning(request, failed_msg)
-
-                log_details = f'{lecturer.full_name} tarafından {exam.course.code} dersi için '
-                log_details += f'{success_count} sınav kağıdı başarıyla işlendi'
-                if failure_count > 0:
-                    log_details += f', {failure_count} sınav kağıdı işlenemedi'
-                log_user_action(request, lecturer, 'EXAM_PROCESS', log_details)
-
-                if success_count > 0:
-                    messages.success(request, f"{success_count} dosya başarıyla işlendi.")
-                if failure_count > 0:
-                    messages.error(request, f"{failure_count} dosya işlenemedi.")
+                        store_uploaded_file(upload_session, file)
+                    except OSError as e:
+                        logger.error(f"Sınav dosyası kaydedilemedi ({file.name}): {str(e)}")
+                        mark_upload_failed(upload_session, file.name, str(e))
+                        failed_files.append(file.name)
+
+                # OCR işlemi arka plandaki worker tarafından yapılır (process_ocr_jobs komutu)
+                job = queue_upload_session(upload_session, lecturer, excel_students, split_pages=split_pages)
+
+                if failed_files:
+                    messages.warning(
+                        request,
+                        f"{len(failed_files)} dosya kaydedilemedi: {', '.join(failed_files)}. "
+                        "Formu aynı dosyalarla tekrar gönderdiğinizde yalnızca eksik dosyalar işlenir."
+                    )
+                if not job:
+                    if not failed_files:
+                        messages.info(request, 'Tüm sınav kağıtları daha önce işlendi.')
+                    return redirect(retry_url if failed_files else 'exam_list')
+
+                log_user_action(
+                    request,
+                    lecturer,
+                    'EXAM_UPLOAD',
+                    f'{lecturer.full_name} tarafından {exam.course.code} dersi için '
+                    f'{job.total_files} sınav kağıdı işlenmek üzere kuyruğa alındı'
+                )
+                messages.info(request, f"{job.total_files} sınav kağıdı yüklendi, arka planda işleniyor.")
+                job_url = f"{reverse('exam_upload')}?job={job.id}"
+                return redirect(f"{job_url}&upload_session={upload_key}" if failed_files else job_url)
 
             if upload_type == 'existing':
                 messages.success(request, 'Yeni veriler mevcut sınava başarıyla eklendi.')
@@ -413,15 +404,20 @@ def exam_upload(request):
                 f'{lecturer.full_name} kullanıcısının sınav yükleme işleminde hata: {str(e)}'
             )
             messages.error(request, f'Bir hata oluştu: {str(e)}')
-            return redirect('exam_upload')
+            return redirect(retry_url)
 
     recent_exams = Exam.objects.filter(
         created_at__gte=timezone.now() - timedelta(days=365)
     ).order_by('-created_at')
     courses = Course.objects.all().order_by('code')
+    job_id = request.GET.get('job', '')
+    ocr_job = OcrJob.objects.filter(id=job_id).first() if job_id.isdigit() else None
     return render(request, 'core/exam_upload.html', {
         'courses': courses,
-        'recent_exams': recent_exams
+        'recent_exams': recent_exams,
+        'ocr_job': ocr_job,
+        'upload_session_key': get_session_key(request.GET.get('upload_session')),
+        'ocr_template_choices': Exam._meta.get_field('ocr_template').choices
     })
 
 
@@ -464,33 +460,18 @@ def student_list(request):
     paginator = Paginator(students, 10)  # Her sayfada 10 öğrenci
     page_obj = paginator.get_page(page_number)
 
-    # Excel export
+    # Excel export: satırlar veritabanından tek tek okunup akış halinde yazılır
     if request.GET.get('export') == 'excel':
-        response = HttpResponse(content_type='application/ms-excel')
-        response[
-            'Content-Disposition'] = f'attachment; filename="ogrenci_listesi_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xls"'
-
-        wb = xlwt.Workbook(encoding='utf-8')
-        ws = wb.add_sheet('Öğrenciler')
-
-        # Başlıklar
-        row_num = 0
-        columns = ['Öğrenci No', 'Ad Soyad']
-        for col_num, column_title in enumerate(columns):
-            ws.write(row_num, col_num, column_title)
-
-        # Veriler
-        for student in students:
-            row_num += 1
-            row = [
-                student.student_number,
-                student.full_name,
-            ]
-            for col_num, cell_value in enumerate(row):
-                ws.write(row_num, col_num, cell_value)
-
-        wb.save(response)
-        return response
+        departments = dict(Student.DEPARTMENT_CHOICES)
+        rows = (
+            (student_number, full_name, departments.get(department, department))
+            for student_number, full_name, department
+            in students.values_list('student_number', 'full_name', 'department').iterator(chunk_size=2000)
+        )
+        return xlsx_response(
+            f'ogrenci_listesi_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx',
+            [('Öğrenciler', ['Öğrenci No', 'Ad Soyad', 'Bölüm'], rows)]
+        )
 
     context = {
         'page_obj': page_obj,
@@ -506,22 +487,34 @@ def reports(request):
     if not request.session.get('lecturer_username'):
         return redirect('user_select')
 
-    exams = Exam.objects.all()  # Tüm sınavları al
-    report_data = []  # Her sınav için analiz verisi
+    # Filtreler
+    selected_course = request.GET.get('course', '')
+    selected_semester = request.GET.get('semester', '')
+
+    # Yalnızca sonucu olan sınavlar; sonuç sayısı istatistik tablosundan okunur
+    exams = Exam.objects.select_related('course').filter(statistics__count__gt=0)
+    if selected_course:
+        exams = exams.filter(course__code=selected_course)
+    if selected_semester:
+        exams = exams.filter(semester=selected_semester)
+    exams = exams.order_by('-exam_date', 'course__code')
 
-    for exam in exams:
-        exam_results = ExamResult.objects.filter(exam=exam)
+    # Sayfalama
+    paginator = Paginator(exams, 10)  # Her sayfada 10 sınav
+    page_obj = paginator.get_page(request.GET.get('page', 1))
 
-        if not exam_results.exists():
-            continue  # Eğer sonuç yoksa bu sınavı atla
+    # Sayfadaki tüm sınavların soru istatistikleri tek sorguda alınır
+    question_statistics = get_question_statistics(page_obj.object_list)
+    report_data = []  # Her sınav için analiz verisi
 
-        question_scores_list = [result.question_scores for result in exam_results]
+    for exam in page_obj.object_list:
+        stats_by_number = {stat.question_number: stat for stat in question_statistics[exam.id]}
         question_stats = []
 
         # Her soru için analiz yap
-        for i, max_score in enumerate(exam.question_scores):
-            scores = [qs[i] for qs in question_scores_list if i < len(qs)]  # Soru puanları
-            avg_score = sum(scores) / len(scores) if scores else 0
+        for i, max_score in enumerate(exam.question_scores or []):
+            stat = stats_by_number.get(i + 1)
+            avg_score = stat.average if stat else 0  # Soru puanları
             success_rate = (avg_score / max_score) * 100 if max_score > 0 else 0
             question_stats.append({
                 'question_number': f"Soru {i + 1}",
@@ -539,128 +532,124 @@ def reports(request):
             'success_rates': [stat['success_rate'] for stat in question_stats],
         })
 
+    filters = {key: value for key, value in
+               [('course', selected_course), ('semester', selected_semester)] if value}
     context = {
         'report_data': report_data,
+        'page_obj': page_obj,
+        'courses': Course.objects.order_by('code'),
+        'semesters': Exam.SEMESTER_CHOICES,
+        'selected_course': selected_course,
+        'selected_semester': selected_semester,
+        'filter_query': f"&{urlencode(filters)}" if filters else '',
     }
     return render(request, 'core/reports.html', context)
 
 
+def gradebook_export(request):
+    """Seçilen ders/dönemin tüm sınav sonuçlarını soru bazında geniş bir not defteri olarak indirir"""
+    if not request.session.get('lecturer_username'):
+        return redirect('user_select')
+
+    course_code = request.GET.get('course', '')
+    semester = request.GET.get('semester', '')
+    file_format = request.GET.get('format', 'xlsx')
+    if file_format not in GRADEBOOK_FORMATS:
+        messages.error(request, 'Geçersiz dosya biçimi.')
+        return redirect('reports')
+
+    columns, rows = get_gradebook(course_code, semester)
+    filename = get_gradebook_filename(course_code, semester, file_format)
+
+    lecturer = Lecturer.objects.get(username=request.session.get('lecturer_username'))
+    log_user_action(
+        request,
+        lecturer,
+        'VIEW_REPORT',
+        f'{lecturer.full_name} tarafından not defteri indirildi ({course_code or "tüm dersler"}, '
+        f'{semester or "tüm dönemler"})'
+    )
+
+    if file_format == 'csv':
+        return csv_response(filename, columns, rows)
+    return xlsx_response(filename, [('Not Defteri', columns, rows)])
+
+
 def exam_analysis(request, exam_id):
     if not request.session.get('lecturer_username'):
         return redirect('user_select')
 
     try:
         exam = Exam.objects.get(id=exam_id)
-        exam_results = ExamResult.objects.filter(exam=exam)
+        matrix = load_score_matrix(exam)
 
-        # Soru bazlı analiz
+        # Soru bazlı analiz: tüm sorular tek seferde vektörel olarak hesaplanır
+        question_stats = []
         if exam.question_scores:
-            question_stats = []
-            for i, score in enumerate(exam.question_scores):
-                max_score = score
-                min_score = min(result.question_scores[i] for result in exam_results)
-                min_non_zero_score = min(
-                    score for score in (result.question_scores[i] for result in exam_results) if score > 0)
-                num_students = len(exam_results)
-                if num_students > 0:
-                    avg_score = sum(result.question_scores[i] for result in exam_results) / num_students
-                    success_rate = (avg_score / max_score) * 100
-                else:
-                    avg_score = 0
-                    success_rate = 0
-                max_received = max(result.question_scores[i] for result in exam_results)
-                question_stats.append({
-                    'question_number': i + 1,
-                    'question_score': max_score,  # Sorunun tam puanı
-                    'max_received_score': max_received,  # Alınan en yüksek puan
-                    'min_score': min_score,
-                    'min_non_zero_score': min_non_zero_score,
-                    'avg_score': avg_score,
-                    'success_rate': success_rate
-                })
-        else:
-            question_stats = []
+            for stat, max_score in zip(matrix.question_summary(), exam.question_scores):
+                stat['question_score'] = max_score  # Sorunun tam puanı
+                question_stats.append(stat)
 
-        # Excel export için
         # Excel export için
         if request.GET.get('export') == 'excel':
-            response = HttpResponse(content_type='application/ms-excel')
-            response[
-                'Content-Disposition'] = f'attachment; filename="{exam.course.code}_{exam.get_semester_display}_{exam.get_exam_type_display}_soru_analizi_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xls"'
-
-            wb = xlwt.Workbook(encoding='utf-8')
-            ws = wb.add_sheet('Soru Analizi')
-
-            # Başlıklar
-            row_num = 0
             columns = ['Soru No', 'Soru Puanı', 'Maks Puan', 'Min Puan', 'Min Sıfırdan Farklı Puan', 'Ort Puan',
-                       'Başarı Oranı']
-            for col_num, column_title in enumerate(columns):
-                ws.write(row_num, col_num, column_title)
-
-            # Veriler
-            for stat in question_stats:
-                row_num += 1
-                row = [
+                       'Medyan', 'Std Sapma', 'Başarı Oranı']
+            rows = (
+                [
                     f"Soru {stat['question_number']}",
                     stat['question_score'],
                     stat['max_received_score'],
                     stat['min_score'],
                     stat['min_non_zero_score'],
                     round(stat['avg_score'], 2),
+                    round(stat['median_score'], 2) if stat['median_score'] is not None else None,
+                    round(stat['std_dev'], 2),
                     f"{round(stat['success_rate'], 2)}%"
                 ]
-                for col_num, cell_value in enumerate(row):
-                    ws.write(row_num, col_num, cell_value)
-
-            wb.save(response)
-            return response
-
-        # Bölümlere göre ortalama hesaplama
-        ceng_results = exam_results.filter(student__department='CENG')
-        other_results = exam_results.filter(student__department='OTHER')
+                for stat in question_stats
+            )
+            return xlsx_response(
+                f'{exam.course.code}_{exam.get_semester_display()}_{exam.get_exam_type_display()}_soru_analizi_'
+                f'{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx',
+                [('Soru Analizi', columns, rows)]
+            )
 
         # Sınav geneli analiz
-        total_scores = [float(result.total_score) for result in exam_results]  # Decimal'i float'a çevir
-        num_students = len(total_scores)
+        exam_summary = matrix.exam_summary()
+        num_students = exam_summary['count']
+        highest_result = None
+        lowest_result = None
         if num_students > 0:
-            avg_score = sum(total_scores) / num_students
-            # Standart sapma hesaplaması
-            variance = sum((float(x - avg_score) ** 2) for x in total_scores) / num_students
-            std_dev = variance ** 0.5
-            median_score = sorted(total_scores)[num_students // 2]
-
-            highest_result = exam_results.order_by('-total_score').first()
-            lowest_result = exam_results.order_by('total_score').first()
-
-            # Bölümlere göre ortalamalar
-            ceng_scores = [float(result.total_score) for result in ceng_results]
-            ceng_avg = sum(ceng_scores) / len(ceng_scores) if ceng_scores else 0
+            # En yüksek/en düşük puanlı öğrenciler matristen bulunur
+            students = matrix.student_summary()
+            highest_index = int(np.argmax(students['total_scores']))
+            lowest_index = int(np.argmin(students['total_scores']))
+            highest_result = {
+                'total_score': students['total_scores'][highest_index],
+                'student': {'student_number': students['student_numbers'][highest_index]}
+            }
+            lowest_result = {
+                'total_score': students['total_scores'][lowest_index],
+                'student': {'student_number': students['student_numbers'][lowest_index]}
+            }
 
-            other_scores = [float(result.total_score) for result in other_results]
-            other_avg = sum(other_scores) / len(other_scores) if other_scores else 0
-        else:
-            avg_score = 0
-            std_dev = 0
-            median_score = 0
-            highest_result = None
-            lowest_result = None
-            ceng_avg = 0
-            other_avg = 0
+        # Bölümlere göre ortalamalar
+        ceng_avg, ceng_count = matrix.department_average('CENG')
+        other_avg, other_count = matrix.department_average('OTHER')
 
         context = {
             'exam': exam,
             'question_stats': question_stats,
-            'avg_score': round(avg_score, 2),
-            'std_dev': round(std_dev, 2),
-            'median_score': round(median_score, 2),
+            'avg_score': round(exam_summary['avg_score'], 2),
+            'std_dev': round(exam_summary['std_dev'], 2),
+            'median_score': round(exam_summary['median_score'], 2),
             'num_students': num_students,
             'highest_result': highest_result,
             'lowest_result': lowest_result,
             'ceng_avg': round(ceng_avg, 2),
             'other_avg': round(other_avg, 2),
-            'ceng_count': len(ceng_results),
-            'other_count': len(other_results)
+            'ceng_count': ceng_count,
+            'other_count': other_count
         }
         return render(request, 'core/exam_analysis.html', context)
 
@@ -679,6 +668,10 @@ def student_analysis(request, student_number):
 
         # Öğrencinin tüm sınav sonuçları
         exam_results = ExamResult.objects.filter(student=student).order_by('-exam__exam_date')
+        # OCR ile okunan sonuçların taranmış kağıt görüntüleri için görev id'leri (tek sorgu)
+        ocr_task_ids = dict(
+            OcrTask.objects.filter(exam_result__student=student, status='DONE').values_list('exam_result_id', 'id')
+        )
 
         # Her sınav için detaylı bilgi
         exam_details = []
@@ -699,12 +692,14 @@ def student_analysis(request, student_number):
                 'total_score': result.total_score,
                 'success_rates': success_rates,
                 'question_scores': result.question_scores,
-                'max_scores': exam.question_scores
+                'max_scores': exam.question_scores,
+                'ocr_task_id': ocr_task_ids.get(result.id)
             })
 
         context = {
             'student': student,
-            'exam_details': exam_details
+            'exam_details': exam_details,
+            'has_exam_paper': ExamPaper.objects.filter(student=student).exists()
         }
 
         return render(request, 'core/student_analysis.html', context)
@@ -789,17 +784,8 @@ def show_outcomes(request, exam_id):
     # Diğer kodlar aynı kalacak...
     grouped_outcomes = {}
 
-    # Soru bazlı başarı oranlarını hesapla
-    exam_results = ExamResult.objects.filter(exam=exam)
-    question_success_rates = {}
-
-    if exam_results.exists() and exam.question_scores:
-        for i in range(len(exam.question_scores)):
-            scores = [result.question_scores[i] for result in exam_results]
-            max_score = exam.question_scores[i]
-            avg_score = sum(scores) / len(scores) if scores else 0
-            success_rate = (avg_score / max_score * 100) if max_score > 0 else 0
-            question_success_rates[i + 1] = success_rate
+    # Soru bazlı başarı oranları QuestionScore üzerinden SQL ile hesaplanır
+    question_success_rates = get_question_success_rates(exam)
 
     # Kazanımları grupla ve her soru için başarı oranlarını hesapla
     for outcome in outcomes:
@@ -970,18 +956,18 @@ def get_question_analysis_data(dimensions, metrics, exam_id):
     except Exam.DoesNotExist:
         return []
 
-    query = ExamResult.objects.filter(exam=exam)
+    stats_by_number = {stat.question_number: stat for stat in get_question_statistics([exam])[exam.id]}
     results = []
 
-    if not query.exists():
+    if not stats_by_number:
         return []
 
     for i in range(exam.question_count):
-        scores = [result.question_scores[i] for result in query]
+        stat = stats_by_number.get(i + 1)
         max_possible_score = exam.question_scores[i] if exam.question_scores else 0
 
         # Ortalama puan hesaplama
-        avg_score = sum(scores) / len(scores) if scores else 0
+        avg_score = stat.average if stat else 0
 
         # Başarı oranı hesaplama
         success_rate = (avg_score / max_possible_score * 100) if max_possible_score > 0 else 0
@@ -1000,6 +986,155 @@ def get_question_analysis_data(dimensions, metrics, exam_id):
     return results
 
 
+@require_http_methods(["GET"])
+def get_ocr_job_progress(request, job_id):
+    if not request.session.get('lecturer_username'):
+        return JsonResponse({'error': 'Oturum gerekli'}, status=401)
+
+    try:
+        job = OcrJob.objects.select_related('exam__course').get(id=job_id)
+    except OcrJob.DoesNotExist:
+        return JsonResponse({'error': 'OCR işi bulunamadı'}, status=404)
+
+    data = job.get_progress()
+    if job.status == 'DONE':
+        if not job.is_reported:
+            # OCR ile okunamayan öğrencileri manuel giriş için session'a kaydet
+            failed_ocr_students = job.get_failed_students()
+            if failed_ocr_students:
+                request.session['failed_ocr_students'] = failed_ocr_students
+                request.session['current_exam_id'] = job.exam_id
+                failed_msg = "Aşağıdaki öğrenci numaralarına ait sınav kağıtları okunamadı:\n"
+                failed_msg += ", ".join(failed_ocr_students)
+                messages.warning(request, failed_msg)
+
+            if job.success_count > 0:
+                messages.success(request, f"{job.success_count} dosya başarıyla işlendi.")
+            if job.failure_count > 0:
+                messages.error(request, f"{job.failure_count} dosya işlenemedi.")
+
+            job.is_reported = True
+            job.save(update_fields=['is_reported'])
+
+        data['redirect_url'] = reverse('exam_list')
+
+    return JsonResponse(data)
+
+
+def _get_upload_session_or_error(request, session_key):
+    """Parçalı yükleme API'leri için oturum kontrolü; hata durumunda (None, JsonResponse) döndürür"""
+    if not request.session.get('lecturer_username'):
+        return None, JsonResponse({'error': 'Oturum gerekli'}, status=401)
+    upload_session = get_upload_session(session_key)
+    if not upload_session:
+        return None, JsonResponse({'error': 'Yükleme oturumu bulunamadı'}, status=404)
+    return upload_session, None
+
+
+@require_http_methods(["POST"])
+def upload_file_start(request, session_key):
+    """Parçalı yüklenecek dosyayı kaydeder; yarım kalan yüklemede alınmış bayt sayısını döndürür"""
+    upload_session, error = _get_upload_session_or_error(request, session_key)
+    if error:
+        return error
+
+    try:
+        data = json.loads(request.body)
+        file_name = str(data['file_name'])
+        size = int(data['size'])
+        sha256 = str(data.get('sha256') or '').lower()
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Geçersiz istek'}, status=400)
+
+    try:
+        record, received = start_chunked_file(upload_session, file_name, size, sha256)
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'file_id': record.id, 'received': received, 'state': record.state})
+
+
+@require_http_methods(["POST"])
+def upload_file_chunk(request, session_key, file_id):
+    """
+    İstek gövdesindeki parçayı ?offset= konumuna yazar; gövde belleğe alınmadan diske akıtılır.
+    Parçanın SHA-256'sı X-Chunk-SHA256 başlığında gönderilmelidir.
+    """
+    upload_session, error = _get_upload_session_or_error(request, session_key)
+    if error:
+        return error
+
+    record = upload_session.files.filter(id=file_id).first()
+    if not record:
+        return JsonResponse({'error': 'Dosya bulunamadı'}, status=404)
+
+    try:
+        offset = int(request.GET.get('offset', 0))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return JsonResponse({'error': 'Geçersiz istek'}, status=400)
+
+    try:
+        received = write_chunk(record, offset, request, length, request.META.get('HTTP_X_CHUNK_SHA256', ''))
+    except ChunkOffsetError as e:
+        return JsonResponse({'error': str(e), 'received': e.received}, status=409)
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'received': received})
+
+
+@require_http_methods(["POST"])
+def upload_file_complete(request, session_key, file_id):
+    """Dosyanın sağlama toplamını doğrular ve diğer dosyaları beklemeden OCR kuyruğuna ekler"""
+    upload_session, error = _get_upload_session_or_error(request, session_key)
+    if error:
+        return error
+
+    record = upload_session.files.filter(id=file_id).first()
+    if not record:
+        return JsonResponse({'error': 'Dosya bulunamadı'}, status=404)
+
+    try:
+        complete_chunked_file(record)
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'state': record.state, 'queued_tasks': queue_uploaded_file(upload_session, record)})
+
+
+@require_http_methods(["POST"])
+def upload_session_finish(request, session_key):
+    """Parçalı yüklemeyi bitirir; OCR işi yüklenen dosyalar işlendiğinde tamamlanır"""
+    upload_session, error = _get_upload_session_or_error(request, session_key)
+    if error:
+        return error
+
+    lecturer = Lecturer.objects.get(username=request.session.get('lecturer_username'))
+    job = finish_upload_session(upload_session)
+    failed_files = list(upload_session.files.filter(state='PENDING').values_list('file_name', flat=True))
+    if failed_files:
+        messages.warning(
+            request,
+            f"{len(failed_files)} dosya yüklenemedi: {', '.join(failed_files)}. "
+            "Formu aynı dosyalarla tekrar gönderdiğinizde yalnızca eksik dosyalar yüklenir."
+        )
+
+    query = {'upload_session': session_key} if failed_files else {}
+    if job and job.total_files:
+        log_user_action(
+            request,
+            lecturer,
+            'EXAM_UPLOAD',
+            f'{lecturer.full_name} tarafından {upload_session.exam.course.code} dersi için '
+            f'{job.total_files} sınav kağıdı işlenmek üzere kuyruğa alındı'
+        )
+        messages.info(request, f"{job.total_files} sınav kağıdı yüklendi, arka planda işleniyor.")
+        query['job'] = job.id
+    elif not failed_files:
+        messages.info(request, 'Tüm sınav kağıtları daha önce işlendi.')
+        return JsonResponse({'redirect_url': reverse('exam_list')})
+
+    return JsonResponse({'redirect_url': f"{reverse('exam_upload')}?{urlencode(query)}"})
+
+
 @require_http_methods(["GET"])
 def get_graph_metadata(request):
     if not request.session.get('lecturer_username'):
@@ -1065,6 +1200,12 @@ def upload_exam_paper(request, student_number):
             exam_paper.file.name = os.path.join(student_folder, filename)
             exam_paper.save()
 
+            # Küçük resim ve önizleme yükleme sırasında hazırlanır; olmazsa ilk istekte yeniden denenir
+            try:
+                build_renditions(exam_paper.get_file_path())
+            except RenditionError as e:
+                logger.warning(str(e))
+
             messages.success(request, 'Sınav kağıdı başarıyla yüklendi.')
             return redirect('student_analysis', student_number=student_number)
         else:
@@ -1081,35 +1222,15 @@ def view_exam_paper(request, student_number):
     exam_papers = ExamPaper.objects.filter(student=student).order_by('-upload_date')
 
     if not exam_papers.exists():
-        messages.warning(request, 'Bu öğrenciye ait sınav kağıdı bulunamadı.')
-        return redirect('student_analysis', student_number=student_number)
+        raise Http404('Bu öğrenciye ait sınav kağıdı bulunamadı.')
 
     latest_paper = exam_papers.first()
     try:
-        file_path = latest_paper.get_file_path()
-        if not os.path.exists(file_path):
-            messages.error(request, 'Sınav kağıdı dosyası bulunamadı.')
-            return redirect('student_analysis', student_number=student_number)
-
-        # PDF dosyasını binary olarak oku
-        with open(file_path, 'rb') as pdf_file:
-            # PDF içeriğini base64 formatına çevir
-            import base64
-            pdf_content = base64.b64encode(pdf_file.read()).decode('utf-8')
-
-        # PDF içeriğini context olarak template'e gönder
-        context = {
-            'student': student,
-            'pdf_content': pdf_content
-        }
-
-        return JsonResponse({
-            'pdf_content': pdf_content
-        })
-
-    except Exception as e:
-        messages.error(request, f'Sınav kağıdı görüntülenirken bir hata oluştu: {str(e)}')
-        return redirect('student_analysis', student_number=student_number)
+        # PDF.js dosyayı URL'den Range istekleriyle parça parça okur; dosya belleğe alınmaz
+        return ranged_file_response(request, latest_paper.get_file_path(), 'application/pdf',
+                                    filename=os.path.basename(latest_paper.file.name))
+    except FileNotFoundError:
+        raise Http404('Sınav kağıdı dosyası bulunamadı.')
 
 
 def download_exam_paper(request, student_number):
@@ -1125,17 +1246,47 @@ def download_exam_paper(request, student_number):
 
     latest_paper = exam_papers.first()
     try:
-        response = FileResponse(
-            open(latest_paper.get_file_path(), 'rb'),
-            content_type='application/pdf'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{os.path.basename(latest_paper.file.name)}"'
-        return response
+        return ranged_file_response(request, latest_paper.get_file_path(), 'application/pdf',
+                                    filename=os.path.basename(latest_paper.file.name), as_attachment=True)
     except FileNotFoundError:
         messages.error(request, 'Sınav kağıdı dosyası bulunamadı.')
         return redirect('student_analysis', student_number=student_number)
 
 
+def _rendition_response(request, file_path, name, page=None):
+    if name not in RENDITIONS:
+        raise Http404('Geçersiz görüntü türü.')
+    try:
+        path, content_type = get_rendition(file_path, name, page)
+        return ranged_file_response(request, path, content_type)
+    except FileNotFoundError:
+        raise Http404('Sınav kağıdı dosyası bulunamadı.')
+    except RenditionError as e:
+        logger.error(str(e))
+        raise Http404('Sınav kağıdı görüntüsü oluşturulamadı.')
+
+
+def exam_paper_rendition(request, student_number, name):
+    """Öğrencinin en son sınav kağıdının ilk sayfasının küçük resmi ya da önizlemesi"""
+    if not request.session.get('lecturer_username'):
+        return redirect('user_select')
+
+    student = get_object_or_404(Student, student_number=student_number)
+    latest_paper = ExamPaper.objects.filter(student=student).order_by('-upload_date').first()
+    if latest_paper is None:
+        raise Http404('Bu öğrenciye ait sınav kağıdı bulunamadı.')
+    return _rendition_response(request, latest_paper.get_file_path(), name)
+
+
+def ocr_task_rendition(request, task_id, name):
+    """OCR ile okunan dosyanın (toplu taramalarda ilgili sayfanın) küçük resmi ya da önizlemesi"""
+    if not request.session.get('lecturer_username'):
+        return redirect('user_select')
+
+    task = get_object_or_404(OcrTask, id=task_id)
+    return _rendition_response(request, task.file_path, name, task.page_number)
+
+
 @login_required
 def manual_exam_result(request):
     if not request.session.get('lecturer_username'):
@@ -0,0 +1,142 @@
+"""
+Sınav kağıdı OCR metni ayrıştırıcısı.
+Girdi olarak yalnızca OCR metnini alır; dosya, ağ veya veritabanı erişimi yapmaz.
+Bu sayede önbellekte ya da veritabanında saklanan metinler Vision'a tekrar
+gönderilmeden yeniden ayrıştırılabilir.
+"""
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+# Ayrıştırma kuralları değiştiğinde artırılır; önbellekteki metinler yeniden ayrıştırılır
+PARSER_VERSION = 1
+
+UNKNOWN_NAME = "Bilinmiyor"
+STUDENT_NUMBER_LENGTH = 8
+
+# OCR'nin sık yaptığı karakter hataları (sırası önemli)
+OCR_REPLACEMENTS = (
+    ("§", "g"),
+    ("O§", "Og"),
+    ("é", ""),
+)
+
+# Desenler modül yüklenirken bir kez derlenir
+STUDENT_INFO_PATTERN = re.compile(
+    r'Ad\s*Soyad:?\s*([\w\sçöşğüıÇÖŞĞÜİ-]+).*?(?:Ogrenci|Öğrenci|Ögrenci)\s*No:?\s*(\d+(?:\s*\d+)*)',
+    re.IGNORECASE | re.DOTALL
+)
+EXAM_DATE_PATTERN = re.compile(r'(\d{2}\.\d{2}\.\d{4})')
+NON_DIGIT_PATTERN = re.compile(r'\D')
+SORUL_PATTERN = re.compile(r'\bSorul\b', re.IGNORECASE)  # 'Sorul' → 'Soru1'
+
+
+@dataclass
+class ExamParseResult:
+    """Bir sınav kağıdının OCR metninden çıkarılan bilgiler"""
+    student_number: Optional[str] = None
+    student_name: str = UNKNOWN_NAME
+    exam_date: Optional[str] = None  # YYYY-MM-DD
+    question_scores: List[int] = field(default_factory=list)
+    student_scores: List[int] = field(default_factory=list)
+    header_labels: List[str] = field(default_factory=list)
+    score_rows: List[List[int]] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    def to_dict(self, course_code=None, semester=None):
+        """utils.process_exam_files'ın döndürdüğü sözlük biçimine çevirir"""
+        return {
+            'student_number': self.student_number,
+            'student_name': self.student_name,
+            'exam_date': self.exam_date,
+            'question_scores': list(self.question_scores),
+            'student_scores': list(self.student_scores),
+            'course_code': course_code,
+            'semester': semester
+        }
+
+    def as_json(self):
+        return asdict(self)
+
+
+def normalize_text(text):
+    """OCR karakter düzeltmelerini uygular"""
+    for old, new in OCR_REPLACEMENTS:
+        text = text.replace(old, new)
+    return text
+
+
+def parse_student_info(text):
+    """Ad soyad ve öğrenci numarasını döndürür; boşluklu numaralar birleştirilip 8 basamakla sınırlanır"""
+    match = STUDENT_INFO_PATTERN.search(text)
+    if not match:
+        return UNKNOWN_NAME, None
+
+    student_name = match.group(1).strip() or UNKNOWN_NAME
+    student_number = NON_DIGIT_PATTERN.sub('', match.group(2))[:STUDENT_NUMBER_LENGTH]
+    return student_name, student_number
+
+
+def parse_exam_date(text):
+    """İlk DD.MM.YYYY tarihini YYYY-MM-DD biçiminde döndürür"""
+    match = EXAM_DATE_PATTERN.search(text)
+    if not match:
+        return None
+    try:
+        return datetime.strptime(match.group(1), '%d.%m.%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def scan_score_table(lines):
+    """
+    Puan tablosunu satırlar üzerinde tek geçişte bulur.
+    'SoruX' başlıkları 'Toplam' satırına kadar toplanır; sonrasındaki her
+    (soru sayısı + 1) sayısal satır bir puan satırı oluşturur.
+    """
+    header_labels = []
+    score_rows = []
+    expected_count = 0
+    numeric_values = []
+
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not expected_count:
+            if line.lower().startswith('soru'):
+                header_labels.append(SORUL_PATTERN.sub('Soru1', line))
+            if 'Toplam' in line:
+                if not header_labels:
+                    break
+                expected_count = len(header_labels) + 1
+            continue
+
+        if line.isdigit():
+            numeric_values.append(int(line))
+            if len(numeric_values) == expected_count:
+                score_rows.append(numeric_values)
+                numeric_values = []
+
+    return header_labels, score_rows
+
+
+def parse_exam_text(text):
+    """OCR metnini ayrıştırıp ExamParseResult döndürür"""
+    text = normalize_text(text or '')
+    result = ExamParseResult()
+
+    result.student_name, result.student_number = parse_student_info(text)
+    result.exam_date = parse_exam_date(text)
+    result.header_labels, result.score_rows = scan_score_table(text.split('\n'))
+
+    # İlk satır soru puanları, ikinci satır öğrenci puanları; son sütun toplamdır
+    if len(result.score_rows) >= 2:
+        result.question_scores = result.score_rows[0][:-1]
+        result.student_scores = result.score_rows[1][:-1]
+
+    if result.question_scores and sum(result.question_scores) != 100:
+        result.warnings.append(f"Soru puanlarının toplamı 100 değil, {sum(result.question_scores)}")
+    if not result.student_number:
+        result.warnings.append("Öğrenci numarası bulunamadı")
+
+    return result
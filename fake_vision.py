@@ -0,0 +1,38 @@
+"""
+Google Cloud Vision istemcisinin ağ bağlantısı gerektirmeyen sahtesi.
+VISION_CLIENT_FACTORY=fake_vision.FakeVisionClient ayarlandığında yükleme ve OCR akışı
+Vision'a gitmeden çalışır; testlerde ve çevrimdışı benchmark'ta kullanılır.
+Görüntü baytları UTF-8 metin olarak çözülebiliyorsa OCR metni olarak döner, değilse
+FAKE_VISION_TEXT döner. FAKE_VISION_LATENCY (saniye) her çağrıya gecikme ekler.
+"""
+import os
+import threading
+import time
+
+from google.cloud import vision
+
+
+class FakeVisionClient:
+    """batch_annotate_images çağrılarını yerel olarak yanıtlayan ImageAnnotatorClient yerine geçer"""
+
+    def __init__(self, text=None, latency=None):
+        self.text = text if text is not None else os.getenv('FAKE_VISION_TEXT', '')
+        self.latency = latency if latency is not None else float(os.getenv('FAKE_VISION_LATENCY', '0'))
+        self.calls = 0
+        self.images = 0
+        self._lock = threading.Lock()
+
+    def _annotate(self, request):
+        try:
+            text = request.image.content.decode('utf-8')
+        except UnicodeDecodeError:
+            text = self.text
+        return vision.AnnotateImageResponse(full_text_annotation=vision.TextAnnotation(text=text))
+
+    def batch_annotate_images(self, requests, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            self.images += len(requests)
+        return vision.BatchAnnotateImagesResponse(responses=[self._annotate(request) for request in requests])
@@ -123,7 +123,8 @@ LOGOUT_REDIRECT_URL = 'user_select'  # Çıkış yapıldıktan sonra buraya yön
 SESSION_COOKIE_AGE = 86400  # 1 gün (saniye cinsinden)
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True  # Tarayıcı kapatıldığında oturumu sonlandır
 
-# Log bilgileri
+# Log bilgileri (logs/ klasörü depoda tutulmaz)
+os.makedirs(os.path.join(BASE_DIR, 'logs'), exist_ok=True)
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -154,6 +155,25 @@ LOGGING = {
     },
 }
 GOOGLE_CLOUD_CREDENTIALS = os.getenv('GOOGLE_CLOUD_CREDENTIALS_PATH')
+
+# OCR ayarları
+OCR_MAX_WORKERS = int(os.getenv('OCR_MAX_WORKERS', '4'))  # Paralel işlenecek sınav kağıdı sayısı
+OCR_BATCH_SIZE = int(os.getenv('OCR_BATCH_SIZE', '16'))  # Tek Vision isteğindeki görüntü sayısı (en fazla 16)
+OCR_BACKEND = os.getenv('OCR_BACKEND', 'vision')  # 'vision' veya 'tesseract'
+OCR_TESSERACT_LANG = os.getenv('OCR_TESSERACT_LANG', 'tur')
+OCR_TESSERACT_CMD = os.getenv('OCR_TESSERACT_CMD')  # tesseract PATH'te değilse çalıştırılabilir dosyanın yolu
+OCR_PDF_DPI = int(os.getenv('OCR_PDF_DPI', '200'))  # PDF sayfalarının OCR için render çözünürlüğü
+
+# OCR sonuç önbelleği (aynı kağıt tekrar yüklendiğinde Vision çağrısı yapılmaz)
+OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', 'True') == 'True'
+OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'ocr'))
+OCR_CACHE_MAX_BYTES = int(os.getenv('OCR_CACHE_MAX_MB', '200')) * 1024 * 1024
+OCR_CACHE_MAX_AGE = int(os.getenv('OCR_CACHE_MAX_AGE_DAYS', '180')) * 24 * 3600  # saniye cinsinden
+OCR_CACHE_EVICT_INTERVAL = int(os.getenv('OCR_CACHE_EVICT_INTERVAL', '600'))  # Tahliye taramaları arası en az süre (saniye)
+
+# Sınav kağıtlarının küçük resim ve önizleme görüntüleri (kağıt silinince birlikte silinir)
+RENDITION_CACHE_DIR = os.getenv('RENDITION_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'renditions'))
+RENDITION_FORMAT = os.getenv('RENDITION_FORMAT', 'WEBP')  # 'WEBP' veya 'JPEG'
 DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',')
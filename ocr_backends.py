@@ -0,0 +1,371 @@
+"""
+OCR motorları.
+Her motor görüntü baytlarını alıp aynı biçimde normalize edilmiş metin ve kelime
+kutuları (OcrPage) döndürür; böylece ayrıştırıcı ve önbellek hangi motorun
+kullanıldığından bağımsız çalışır. Motor OCR_BACKEND ayarıyla seçilir:
+    vision     Google Cloud Vision (varsayılan)
+    tesseract  Yerel Tesseract (ağ bağlantısı ve çağrı başına ücret gerektirmez)
+"""
+import importlib
+import io
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import List
+
+from google.api_core import exceptions as google_exceptions
+from google.cloud import vision
+from PIL import Image
+
+# Süreç genelinde paylaşılan Vision istemcisi (gRPC kanalı ve kimlik bilgisi bir kez yüklenir)
+_vision_client = None
+_vision_client_lock = threading.Lock()
+
+# Bu hatalarda istemci yeniden oluşturulup istek bir kez tekrarlanır
+VISION_RECONNECT_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.Unauthenticated,
+)
+
+
+VISION_LANGUAGE_HINTS = ['tr']
+
+# Puan tablosu satırındaki hücreler ('Soru1', 'Toplam', sayılar)
+TABLE_TOKEN_PATTERN = re.compile(r'^(?:\d+|soru\w*|toplam)$', re.IGNORECASE)
+# normalize_lines değiştiğinde artırılır; önbellek anahtarına eklendiğinden eski biçimdeki metinler kullanılmaz
+TEXT_NORMALIZATION_VERSION = 1
+
+
+@dataclass
+class OcrWord:
+    """Bir kelime ve sayfa üzerindeki kutusu (piksel); confidence 0-1 arasıdır"""
+    text: str
+    confidence: float
+    left: int
+    top: int
+    width: int
+    height: int
+
+
+@dataclass
+class OcrPage:
+    """Bir görüntünün normalize edilmiş OCR metni ve kelime kutuları"""
+    text: str
+    words: List[OcrWord] = field(default_factory=list)
+    engine: str = ''
+
+
+def normalize_lines(lines):
+    """
+    Motorlardan gelen satırları ortak biçime getirir: boş satırlar atılır ve
+    yalnızca tablo hücrelerinden oluşan satırlar ('Soru1 Soru2 Toplam', '20 30 50')
+    Vision'da olduğu gibi her hücre ayrı satırda olacak şekilde bölünür.
+    """
+    normalized = []
+    for line in lines:
+        tokens = line.split()
+        if not tokens:
+            continue
+        if len(tokens) > 1 and all(TABLE_TOKEN_PATTERN.match(token) for token in tokens):
+            normalized.extend(tokens)
+        else:
+            normalized.append(' '.join(tokens))
+    return '\n'.join(normalized)
+
+
+def initialize_vision_client():
+    """Google Cloud Vision istemcisini başlatır"""
+    try:
+        credentials_path = os.getenv('GOOGLE_CLOUD_CREDENTIALS_PATH')
+
+        print(f"Aranan kimlik dosyası yolu: {credentials_path}")
+
+        if not os.path.exists(credentials_path):
+            raise FileNotFoundError(f"Kimlik dosyası bulunamadı: {credentials_path}")
+
+        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_path
+        client = vision.ImageAnnotatorClient()
+        return client
+    except Exception as e:
+        print(f"Vision Client başlatılamadı: {str(e)}")
+        return None
+
+
+def _create_vision_client():
+    """
+    VISION_CLIENT_FACTORY çevre değişkeni ayarlıysa (ör. 'fake_vision.FakeVisionClient')
+    o fabrikayı, değilse gerçek Vision istemcisini kullanır.
+    """
+    factory_path = os.getenv('VISION_CLIENT_FACTORY')
+    if factory_path:
+        module_name, _, attr_name = factory_path.rpartition('.')
+        factory = getattr(importlib.import_module(module_name), attr_name)
+        return factory()
+    return initialize_vision_client()
+
+
+def get_vision_client():
+    """Paylaşılan Vision istemcisini döndürür, ilk çağrıda thread-safe olarak oluşturur"""
+    global _vision_client
+    if _vision_client is None:
+        with _vision_client_lock:
+            if _vision_client is None:
+                _vision_client = _create_vision_client()
+    return _vision_client
+
+
+def set_vision_client(client):
+    """Paylaşılan istemciyi değiştirir (testlerde sahte istemci kullanmak için)"""
+    global _vision_client
+    with _vision_client_lock:
+        _vision_client = client
+
+
+def reset_vision_client(failed_client=None):
+    """
+    Paylaşılan istemciyi bırakır, bir sonraki çağrıda yeniden oluşturulur.
+    failed_client verilirse yalnızca hâlâ aynı istemci kullanılıyorsa sıfırlanır.
+    """
+    global _vision_client
+    with _vision_client_lock:
+        if failed_client is None or _vision_client is failed_client:
+            _vision_client = None
+
+
+def call_vision(method_name, **kwargs):
+    """Paylaşılan istemcide bir Vision metodunu çağırır; bağlantı hatasında istemciyi yenileyip bir kez dener"""
+    client = get_vision_client()
+    if not client:
+        raise Exception("Vision Client başlatılamadı")
+
+    try:
+        return getattr(client, method_name)(**kwargs)
+    except VISION_RECONNECT_ERRORS as e:
+        print(f"Vision bağlantı hatası, istemci yeniden oluşturuluyor: {str(e)}")
+        reset_vision_client(client)
+        client = get_vision_client()
+        if not client:
+            raise
+        return getattr(client, method_name)(**kwargs)
+
+
+def build_image_context():
+    """Sınav kağıtları için kullanılan Vision ayarlarını döndürür"""
+    return vision.ImageContext(
+        language_hints=VISION_LANGUAGE_HINTS,
+        text_detection_params=vision.TextDetectionParams(
+            enable_text_detection_confidence_score=True
+        )
+    )
+
+
+def vision_batch_transport(requests):
+    """Varsayılan batch taşıyıcısı: istekleri tek bir batch_annotate_images çağrısıyla gönderir"""
+    response = call_vision('batch_annotate_images', requests=requests)
+    return list(response.responses)
+
+
+class VisionBatchAnnotator:
+    """
+    Görüntüleri en fazla batch_size'lık gruplar halinde tek bir batch_annotate_images
+    çağrısıyla Vision'a gönderir ve her yanıtı sırasıyla kendi görüntüsüne eşler.
+    transport, AnnotateImageRequest listesi alıp aynı sırada yanıt listesi döndüren
+    bir callable'dır; testlerde yerel bir stub ile değiştirilebilir.
+    """
+
+    MAX_BATCH_SIZE = 16  # Vision senkron batch isteği başına en fazla görüntü sayısı
+
+    def __init__(self, batch_size=MAX_BATCH_SIZE, transport=None):
+        self.batch_size = max(1, min(batch_size, self.MAX_BATCH_SIZE))
+        self.transport = transport or vision_batch_transport
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def annotate(self, contents):
+        """
+        Görüntü baytlarının Vision yanıtlarını (full_text_annotation) aynı sırada döndürür.
+        İçeriği None olan veya Vision'ın hata döndürdüğü görüntüler için None döner.
+        """
+        annotations = [None] * len(contents)
+        indexed_contents = [(i, content) for i, content in enumerate(contents) if content is not None]
+        feature = vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)
+        image_context = build_image_context()
+
+        for start in range(0, len(indexed_contents), self.batch_size):
+            batch = indexed_contents[start:start + self.batch_size]
+            requests = [
+                vision.AnnotateImageRequest(
+                    image=vision.Image(content=content),
+                    features=[feature],
+                    image_context=image_context
+                )
+                for _, content in batch
+            ]
+            responses = self.transport(requests)
+            with self._lock:
+                self.round_trips += 1
+
+            for (i, _), response in zip(batch, responses):
+                if response.error.message:
+                    print(f"Vision görüntü hatası: {response.error.message}")
+                    continue
+                annotations[i] = response.full_text_annotation
+
+        return annotations
+
+
+class OcrBackend:
+    """
+    OCR motoru arayüzü.
+    recognize() görüntü baytlarını alır ve aynı sırada OcrPage (okunamayanlar için None) döndürür.
+    batch_size, tek recognize() çağrısında işlenecek görüntü sayısıdır.
+    """
+
+    name = ''
+    batch_size = 1
+
+    def cache_settings(self):
+        """OCR sonucunu etkileyen motor ayarları; önbellek anahtarına eklenir"""
+        return {'engine': self.name}
+
+    def recognize(self, contents):
+        raise NotImplementedError
+
+
+class VisionBackend(OcrBackend):
+    """Google Cloud Vision DOCUMENT_TEXT_DETECTION"""
+
+    name = 'vision'
+
+    def __init__(self, batch_size=VisionBatchAnnotator.MAX_BATCH_SIZE, transport=None):
+        self.annotator = VisionBatchAnnotator(batch_size=batch_size, transport=transport)
+        self.batch_size = self.annotator.batch_size
+
+    @property
+    def round_trips(self):
+        return self.annotator.round_trips
+
+    def cache_settings(self):
+        return {
+            'engine': self.name,
+            'feature': 'DOCUMENT_TEXT_DETECTION',
+            'language_hints': VISION_LANGUAGE_HINTS,
+            'normalization': TEXT_NORMALIZATION_VERSION,
+        }
+
+    @staticmethod
+    def extract_words(annotation):
+        """full_text_annotation'daki kelimeleri kutularıyla birlikte döndürür"""
+        words = []
+        for page in annotation.pages:
+            for block in page.blocks:
+                for paragraph in block.paragraphs:
+                    for word in paragraph.words:
+                        xs = [vertex.x for vertex in word.bounding_box.vertices] or [0]
+                        ys = [vertex.y for vertex in word.bounding_box.vertices] or [0]
+                        words.append(OcrWord(
+                            text=''.join(symbol.text for symbol in word.symbols),
+                            confidence=word.confidence,
+                            left=min(xs),
+                            top=min(ys),
+                            width=max(xs) - min(xs),
+                            height=max(ys) - min(ys)
+                        ))
+        return words
+
+    def recognize(self, contents):
+        return [
+            OcrPage(
+                text=normalize_lines(annotation.text.splitlines()),
+                words=self.extract_words(annotation),
+                engine=self.name
+            ) if annotation is not None else None
+            for annotation in self.annotator.annotate(contents)
+        ]
+
+
+class TesseractBackend(OcrBackend):
+    """
+    Yerel Tesseract motoru (pytesseract).
+    Kurulum: pip install pytesseract ve Tesseract ile Türkçe dil paketi (tur).
+    """
+
+    name = 'tesseract'
+
+    def __init__(self, lang='tur', config='--psm 6', tesseract_cmd=None):
+        try:
+            self.pytesseract = importlib.import_module('pytesseract')
+        except ImportError:
+            raise ImportError("Tesseract motoru için pytesseract kurulu olmalıdır (pip install pytesseract)")
+
+        if tesseract_cmd:
+            self.pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        self.lang = lang
+        self.config = config
+
+    def cache_settings(self):
+        return {'engine': self.name, 'lang': self.lang, 'config': self.config,
+                'normalization': TEXT_NORMALIZATION_VERSION}
+
+    def recognize_one(self, content):
+        """Tek bir görüntüyü okur; kelimeler Tesseract'ın blok/paragraf/satır sırasıyla satırlara dizilir"""
+        data = self.pytesseract.image_to_data(
+            Image.open(io.BytesIO(content)),
+            lang=self.lang,
+            config=self.config,
+            output_type=self.pytesseract.Output.DICT
+        )
+
+        words = []
+        lines = {}
+        for i, text in enumerate(data['text']):
+            text = text.strip()
+            confidence = float(data['conf'][i])
+            if not text or confidence < 0:
+                continue
+            words.append(OcrWord(
+                text=text,
+                confidence=confidence / 100,
+                left=data['left'][i],
+                top=data['top'][i],
+                width=data['width'][i],
+                height=data['height'][i]
+            ))
+            line_key = (data['page_num'][i], data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(line_key, []).append(text)
+
+        return OcrPage(
+            text=normalize_lines(' '.join(line) for line in lines.values()),
+            words=words,
+            engine=self.name
+        )
+
+    def recognize(self, contents):
+        pages = []
+        for content in contents:
+            if content is None:
+                pages.append(None)
+                continue
+            try:
+                pages.append(self.recognize_one(content))
+            except Exception as e:
+                print(f"Tesseract görüntü hatası: {str(e)}")
+                pages.append(None)
+        return pages
+
+
+BACKENDS = {
+    VisionBackend.name: VisionBackend,
+    TesseractBackend.name: TesseractBackend,
+}
+
+
+def get_backend(name='vision', **options):
+    """Ada göre OCR motorunu oluşturur; options motorun __init__ parametreleridir"""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Bilinmeyen OCR motoru: {name} (seçenekler: {', '.join(sorted(BACKENDS))})")
+    return backend_class(**options)
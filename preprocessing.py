@@ -0,0 +1,194 @@
+"""
+OCR öncesi görüntü ön işleme (OpenCV).
+Sayfa eğikliği düzeltilir, görüntü küçültülür ve sınav şablonuna göre yalnızca
+başlık ve puan tablosu bölgeleri kırpılarak Vision'a daha küçük bir görüntü gönderilir.
+
+Örnek kağıtlardan oluşan bir klasörde şablonları karşılaştırmak için:
+    python preprocessing.py <klasör> --template ust_bolum
+"""
+import argparse
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+@dataclass(frozen=True)
+class PreprocessTemplate:
+    """
+    Bir sınav kağıdı şablonu için ön işleme ayarları.
+    regions: sayfa boyutuna oranla (üst, alt, sol, sağ) kırpma bölgeleri; None ise tüm sayfa.
+    Bölgeler yukarıdan aşağıya sırayla alt alta birleştirilir.
+    """
+    name: str
+    deskew: bool = True
+    max_width: int = 1600
+    regions: Optional[Tuple[Tuple[float, float, float, float], ...]] = None
+    jpeg_quality: int = 85
+
+    def as_settings(self):
+        """OCR önbellek anahtarına eklenecek ayarlar"""
+        return asdict(self)
+
+
+# Anahtarlar core.models.Exam.OCR_TEMPLATE_CHOICES ile aynı olmalı
+TEMPLATES = {
+    'standart': PreprocessTemplate(name='standart'),
+    # Başlık (ad, numara, tarih) ve puan tablosu sayfanın üst kısmında
+    'ust_bolum': PreprocessTemplate(name='ust_bolum', regions=((0.0, 0.45, 0.0, 1.0),)),
+}
+
+
+def get_template(name):
+    """Şablon adına göre ayarları döndürür; boş ya da bilinmeyen ad için None"""
+    return TEMPLATES.get(name) if name else None
+
+
+def decode_image(content):
+    """Görüntü baytlarını gri tonlamalı OpenCV matrisine çevirir"""
+    image = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError("Görüntü çözümlenemedi")
+    return image
+
+
+def encode_jpeg(image, quality=85):
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Görüntü JPEG olarak kodlanamadı")
+    return buffer.tobytes()
+
+
+def estimate_skew_angle(image, max_angle=10.0):
+    """Metin piksellerini çevreleyen en küçük dikdörtgenden sayfa eğikliğini (derece) tahmin eder"""
+    _, binary = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    coords = cv2.findNonZero(binary)
+    if coords is None:
+        return 0.0
+
+    angle = cv2.minAreaRect(coords)[-1]
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    return angle if abs(angle) <= max_angle else 0.0
+
+
+def deskew(image, max_angle=10.0):
+    """Sayfayı tahmin edilen eğiklik kadar döndürür; boşluklar beyazla doldurulur"""
+    angle = estimate_skew_angle(image, max_angle)
+    if abs(angle) < 0.1:
+        return image
+
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(image, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+
+def downsample(image, max_width):
+    """Genişlik max_width'i aşıyorsa oranı koruyarak küçültür"""
+    height, width = image.shape[:2]
+    if not max_width or width <= max_width:
+        return image
+    scale = max_width / width
+    return cv2.resize(image, (max_width, int(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def crop_regions(image, regions):
+    """Oransal bölgeleri kırpar ve alt alta birleştirir"""
+    if not regions:
+        return image
+
+    height, width = image.shape[:2]
+    crops = []
+    for top, bottom, left, right in regions:
+        crop = image[int(top * height):int(bottom * height), int(left * width):int(right * width)]
+        if crop.size:
+            crops.append(crop)
+    if not crops:
+        return image
+
+    # Farklı genişlikteki bölgeler sağdan beyazla doldurulur
+    crop_width = max(crop.shape[1] for crop in crops)
+    return np.vstack([
+        cv2.copyMakeBorder(crop, 0, 0, 0, crop_width - crop.shape[1], cv2.BORDER_CONSTANT, value=255)
+        for crop in crops
+    ])
+
+
+def preprocess_image(content, template):
+    """Görüntü baytlarını şablona göre işleyip JPEG baytları olarak döndürür"""
+    if not template:
+        return content
+
+    image = decode_image(content)
+    if template.deskew:
+        image = deskew(image)
+    image = downsample(image, template.max_width)
+    image = crop_regions(image, template.regions)
+    return encode_jpeg(image, template.jpeg_quality)
+
+
+def benchmark_folder(folder, template, ocr=False, backend='vision'):
+    """
+    Klasördeki örnek kağıtlar için ön işleme süresini, boyut değişimini ve
+    (ocr=True ise) OCR süresini ve öğrenci numarasının okunup okunmadığını ölçer.
+    """
+    # Ön işleme modülü utils'e bağımlı değildir; yalnızca benchmark için
+    import exam_parser
+    import ocr_backends
+    import utils
+
+    ocr_backend = ocr_backends.get_backend(backend) if ocr else None
+
+    rows = []
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(('.pdf', '.jpg', '.jpeg', '.png')):
+            continue
+
+        raw = utils.load_image_content(os.path.join(folder, name))
+        started = time.perf_counter()
+        processed = preprocess_image(raw, template)
+        row = {
+            'file': name,
+            'raw_kb': len(raw) / 1024,
+            'processed_kb': len(processed) / 1024,
+            'preprocess_ms': (time.perf_counter() - started) * 1000,
+        }
+
+        if ocr_backend:
+            started = time.perf_counter()
+            page = ocr_backend.recognize([processed])[0]
+            row['ocr_ms'] = (time.perf_counter() - started) * 1000
+            row['student_number'] = exam_parser.parse_exam_text(page.text).student_number if page else None
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OCR ön işleme benchmark'ı")
+    parser.add_argument('folder', help='Örnek sınav kağıtlarının bulunduğu klasör')
+    parser.add_argument('--template', default='standart', choices=sorted(TEMPLATES))
+    parser.add_argument('--ocr', action='store_true', help='İşlenmiş görüntüleri OCR motoruyla da oku')
+    parser.add_argument('--backend', default='vision', choices=['vision', 'tesseract'], help='OCR motoru')
+    args = parser.parse_args()
+
+    results = benchmark_folder(args.folder, TEMPLATES[args.template], ocr=args.ocr, backend=args.backend)
+    for row in results:
+        print(" | ".join(f"{key}: {value:.1f}" if isinstance(value, float) else f"{key}: {value}"
+                         for key, value in row.items()))
+
+    if results:
+        raw_total = sum(row['raw_kb'] for row in results)
+        processed_total = sum(row['processed_kb'] for row in results)
+        print(f"Toplam: {raw_total:.0f} KB -> {processed_total:.0f} KB "
+              f"(%{100 * (1 - processed_total / raw_total):.0f} küçülme), "
+              f"ortalama ön işleme {sum(row['preprocess_ms'] for row in results) / len(results):.1f} ms")
+        if args.ocr:
+            found = sum(1 for row in results if row['student_number'])
+            print(f"Öğrenci numarası okunan: {found}/{len(results)}, "
+                  f"ortalama OCR {sum(row['ocr_ms'] for row in results) / len(results):.0f} ms")
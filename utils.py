@@ -1,10 +1,31 @@
-from google.cloud import vision
 import os
 import io
 from PIL import Image
-import re
-from datetime import datetime
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import threading
+import hashlib
+import json
+import time
+import exam_parser
+import preprocessing
+from exam_parser import PARSER_VERSION
+from ocr_backends import VisionBackend
+from django.conf import settings as django_settings
+
+# Sayfa seçimi ve render ayarları; OCR motorunun ayarlarıyla birlikte önbellek anahtarına girer
+OCR_SETTINGS = {
+    'pdf_page': 1,
+}
+DEFAULT_PDF_DPI = 200
+
+
+def get_pdf_dpi():
+    """PDF render çözünürlüğü settings.OCR_PDF_DPI'dan okunur; Django ayarları yüklü değilse (ör. benchmark) varsayılan"""
+    if not django_settings.configured:
+        return DEFAULT_PDF_DPI
+    return getattr(django_settings, 'OCR_PDF_DPI', DEFAULT_PDF_DPI)
 
 
 def get_project_root():
@@ -18,24 +39,6 @@ def get_project_root():
     return project_root
 
 
-def initialize_vision_client():
-    """Google Cloud Vision istemcisini başlatır"""
-    try:
-        credentials_path = os.getenv('GOOGLE_CLOUD_CREDENTIALS_PATH')
-
-        print(f"Aranan kimlik dosyası yolu: {credentials_path}")
-
-        if not os.path.exists(credentials_path):
-            raise FileNotFoundError(f"Kimlik dosyası bulunamadı: {credentials_path}")
-
-        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_path
-        client = vision.ImageAnnotatorClient()
-        return client
-    except Exception as e:
-        print(f"Vision Client başlatılamadı: {str(e)}")
-        return None
-
-
 def test_credentials():
     """Kimlik dosyası yolunu test eder"""
     try:
@@ -54,171 +57,314 @@ def test_credentials():
         return None
 
 
-def process_exam_file(file_path, course_code, semester):
+def split_source(source):
     """
-    Google Cloud Vision API kullanarak sınav kağıdındaki bilgileri okur.
-    Dinamik soru sayısı desteği ve boşluk içeren öğrenci numarasını
-    8 basamakla sınırlamak için ek kontrol içerir.
+    Kaynağı (dosya yolu, sayfa no) olarak döndürür.
+    Kaynak bir dosya yolu ya da toplu taramalar için (dosya yolu, sayfa no) ikilisi olabilir.
     """
+    if isinstance(source, (tuple, list)):
+        return source[0], source[1]
+    return source, None
 
-    try:
-        client = initialize_vision_client()
-        if not client:
-            raise Exception("Vision Client başlatılamadı")
-
-        # poppler_path'i çevre değişkeninden al
-        poppler_path = os.getenv('POPPLER_PATH')
-        if not poppler_path or not os.path.exists(poppler_path):
-            print("Uyarı: poppler_path bulunamadı, varsayılan PATH kullanılacak.")
-            poppler_path = None
-
-        # PDF ise resme dönüştür
-        if file_path.lower().endswith('.pdf'):
-            images = convert_from_path(file_path, poppler_path=poppler_path)
-            img = images[0]  # İlk sayfayı kullan
-            temp_path = os.path.join(os.path.dirname(file_path), "temp_image.jpg")
-            img.save(temp_path)
-            file_path = temp_path
-
-        # Resmi oku
-        with io.open(file_path, 'rb') as image_file:
-            content = image_file.read()
-
-        image = vision.Image(content=content)
-        context = vision.ImageContext(
-            language_hints=['tr'],
-            text_detection_params=vision.TextDetectionParams(
-                enable_text_detection_confidence_score=True
-            )
-        )
 
-        response = client.document_text_detection(image=image, image_context=context)
-        text = response.full_text_annotation.text
+def describe_source(source):
+    """Kaynağı loglar için okunabilir hale getirir (ör. 'tarama.pdf#sayfa=12')"""
+    file_path, page = split_source(source)
+    return f"{file_path}#sayfa={page}" if page else file_path
 
-        # Eğer geçici dosya yarattıysak sil
-        if file_path.endswith("temp_image.jpg"):
-            os.remove(file_path)
 
-        print(f"OCR'den alınan metin:\n{text}\n")
+@functools.lru_cache(maxsize=32)
+def _file_sha256(file_path, size, mtime_ns):
+    """Dosya içeriğinin SHA-256 durumunu döndürür; çok sayfalı PDF'ler sayfa başına tekrar okunmaz"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest
 
-        # OCR düzeltmeleri
-        text = text.replace("§", "g")
-        text = text.replace("O§", "Og")
-        text = text.replace("é", "")
 
-        # Öğrenci bilgilerini bul - boşluklu ve bazen fazla karakterli no için gelişmiş düzen
-        student_info_match = re.search(
-            r'Ad\s*Soyad:?\s*([\w\sçöşğüıÇÖŞĞÜİ-]+).*?(?:Ogrenci|Öğrenci|Ögrenci)\s*No:?\s*(\d+(?:\s*\d+)*)',
-            text,
-            re.IGNORECASE | re.DOTALL
-        )
+def get_ocr_settings(preprocess=None, backend=None):
+    """OCR sonucunu etkileyen ayarları OCR motoru ve ön işleme şablonuyla birlikte döndürür"""
+    settings = dict(OCR_SETTINGS, pdf_dpi=get_pdf_dpi(), **(backend or VisionBackend()).cache_settings())
+    if preprocess:
+        settings['preprocess'] = preprocess.as_settings()
+    return settings
 
-        student_name = "Bilinmiyor"
-        student_number = None
-
-        if student_info_match:
-            s_name = student_info_match.group(1).strip()
-            student_number_raw = student_info_match.group(2).strip()
-            # Boşlukları ve rakam dışı karakterleri temizle
-            student_number = re.sub(r'\D', '', student_number_raw)
-            # İlk 8 basamağı al
-            if len(student_number) > 8:
-                student_number = student_number[:8]
-            student_name = s_name if s_name else "Bilinmiyor"
-            print(f"Bulunan öğrenci no: {student_number}")
-        else:
-            student_name = "Bilinmiyor"
-            student_number = None
-
-        # Sınav tarihi
-        exam_date_match = re.search(r'(\d{2}\.\d{2}\.\d{4})', text)
-        exam_date = None
-        if exam_date_match:
-            raw_date = exam_date_match.group(1)
-            exam_date = datetime.strptime(raw_date, '%d.%m.%Y').strftime('%Y-%m-%d')
-
-        lines = text.split('\n')
-        cleaned_lines = []
-        for line in lines:
-            # 'Sorul' → 'Soru1'
-            line = re.sub(r'\bSorul\b', 'Soru1', line, flags=re.IGNORECASE)
-            cleaned_lines.append(line.strip())
-
-        # Başlıkları bul (SoruX + Toplam)
-        soru_lines = []
-        header_found = False
-        header_line_index = -1
-        for i, line in enumerate(cleaned_lines):
-            if line.lower().startswith('soru'):
-                soru_lines.append(line)
-            if 'Toplam' in line:
-                soru_lines.append('Toplam')
-                header_found = True
-                header_line_index = i
-                print(f"Başlık(lar) bulundu: {soru_lines}")
-                break
 
-        total_sorular = 0
-        if header_found and 'Toplam' in soru_lines:
-            total_sorular = len(soru_lines) - 1
-
-        score_data = []
-        if header_found and total_sorular > 0:
-            # Her satır (total_sorular + 1) sayıdan oluşmalı
-            expected_count = total_sorular + 1
-            numeric_lines = []
-            for line in cleaned_lines[header_line_index + 1:]:
-                if line.isdigit():
-                    numeric_lines.append(int(line))
-                    if len(numeric_lines) == expected_count:
-                        score_data.append(numeric_lines)
-                        numeric_lines = []
-
-        print(f"Bulunan tüm puan satırları: {score_data}")
-
-        question_scores = []
-        student_scores = []
-
-        if len(score_data) >= 2:
-            first_row = score_data[0]
-            second_row = score_data[1]
-
-            # Eğer her iki satırın son elemanı 100 ise onu toplam kabul edip çıkar
-            if first_row[-1] == 100 and second_row[-1] == 100:
-                question_scores = first_row[:-1]
-                student_scores = second_row[:-1]
-            else:
-                # Aksi halde son elemanı toplam varsayıp, onu hariç tutuyoruz
-                question_scores = first_row[:-1]
-                student_scores = second_row[:-1]
-
-        print(f"Soru puanları: {question_scores}")
-        print(f"Öğrenci puanları: {student_scores}")
-
-        # Soru puanlarının toplamını kontrol et
-        if question_scores:
-            total = sum(question_scores)
-            if total != 100:
-                print(f"Uyarı: Soru puanlarının toplamı 100 değil, {total}")
-
-        return {
-            'student_number': student_number,
-            'student_name': student_name,
-            'exam_date': exam_date,
-            'question_scores': question_scores,
-            'student_scores': student_scores,
-            'course_code': course_code,
-            'semester': semester
+def ocr_cache_key(file_path, ocr_settings=None, page=None):
+    """Dosya içeriğinin, sayfa numarasının ve OCR ayarlarının SHA-256 özetini döndürür"""
+    stat = os.stat(file_path)
+    digest = _file_sha256(file_path, stat.st_size, stat.st_mtime_ns).copy()
+    digest.update(json.dumps(ocr_settings or get_ocr_settings(), sort_keys=True).encode('utf-8'))
+    if page:
+        digest.update(f"#page={page}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class OcrResultCache:
+    """
+    İçerik özetine göre anahtarlanan, diskte kalıcı OCR sonuç önbelleği.
+    Her kayıt ham OCR metnini ve ayrıştırılmış sonucu tutar; aynı kağıt tekrar
+    yüklendiğinde PDF dönüştürme ve Vision çağrısı atlanır.
+    Süresi dolan kayıtlar ve toplam boyut sınırını aşan en eski kayıtlar evict() ile silinir.
+    """
+
+    EVICT_MARKER = '.last_evict'
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024, max_age_seconds=180 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key, touch=True):
+        """
+        Kayıt varsa ve süresi dolmamışsa {'text', 'parsed', ...} sözlüğünü döndürür.
+        touch=False ile okunan kayıtların son kullanım zamanı (tahliye sırası) değişmez.
+        """
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age_seconds:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if touch:
+                os.utime(path)  # Son kullanım zamanını güncelle (boyut tahliyesi için)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def last_used(self, key):
+        """Kaydın son kullanım zamanı, kayıt yoksa None"""
+        try:
+            return os.path.getmtime(self._path(key))
+        except OSError:
+            return None
+
+    def keys(self):
+        """Önbellekteki tüm anahtarları döndürür"""
+        if not os.path.isdir(self.directory):
+            return
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.json'):
+                    yield name[:-len('.json')]
+
+    def set(self, key, text, parsed, last_used=None):
+        """
+        OCR metnini ve ayrıştırılmış sonucu (derse özgü alanlar hariç) atomik olarak yazar.
+        last_used verilirse kaydın son kullanım zamanı bu değerde bırakılır.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            'text': text,
+            'parsed': {k: v for k, v in parsed.items() if k not in ('course_code', 'semester')},
+            'parser_version': PARSER_VERSION,
+            'created_at': time.time(),
         }
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        if last_used is not None:
+            os.utime(path, (last_used, last_used))
+
+    def evict_if_due(self, interval_seconds):
+        """
+        Son tahliyeden bu yana interval_seconds geçtiyse evict() çalıştırır, aksi halde 0 döner.
+        Tahliye tüm klasörü taradığından worker her grupta değil bu aralıkla çağırır;
+        son tahliye zamanı klasördeki işaret dosyasında tutulduğundan süreçler arasında paylaşılır.
+        """
+        marker = os.path.join(self.directory, self.EVICT_MARKER)
+        try:
+            if time.time() - os.path.getmtime(marker) < interval_seconds:
+                return 0
+        except OSError:
+            pass
+        os.makedirs(self.directory, exist_ok=True)
+        with open(marker, 'a'):
+            os.utime(marker)
+        return self.evict()
+
+    def evict(self):
+        """Süresi dolan kayıtları, ardından boyut sınırı aşılıyorsa en eski kullanılanları siler"""
+        if not os.path.isdir(self.directory):
+            return 0
+
+        now = time.time()
+        entries = []
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name == self.EVICT_MARKER:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.max_age_seconds:
+                    os.remove(path)
+                    removed += 1
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            os.remove(path)
+            total_size -= size
+            removed += 1
+        return removed
 
-    except Exception as e:
-        print(f"OCR işlemi sırasında hata oluştu: {str(e)}")
-        import traceback
-        traceback.print_exc()
+
+def _parse_cached_entry(entry, course_code, semester):
+    """Önbellek kaydından sonuç üretir; ayrıştırıcı sürümü değiştiyse metni yeniden ayrıştırır"""
+    if entry.get('parser_version') != PARSER_VERSION or entry.get('parsed') is None:
+        return parse_exam_text(entry['text'], course_code, semester)
+    return dict(entry['parsed'], course_code=course_code, semester=semester)
+
+
+def _store_cached_result(cache, key, text, result):
+    """Ayrıştırılmış sonucu önbelleğe yazar; yazma hatası OCR sonucunu etkilemez"""
+    try:
+        cache.set(key, text, result)
+    except OSError as e:
+        print(f"OCR önbelleğine yazılamadı: {str(e)}")
+
+
+def _get_poppler_path():
+    """poppler_path'i çevre değişkeninden alır, bulunamazsa varsayılan PATH kullanılır"""
+    poppler_path = os.getenv('POPPLER_PATH')
+    if not poppler_path or not os.path.exists(poppler_path):
+        print("Uyarı: poppler_path bulunamadı, varsayılan PATH kullanılacak.")
         return None
+    return poppler_path
+
+
+def get_pdf_page_count(file_path):
+    """PDF'in sayfa sayısını sayfaları render etmeden döndürür"""
+    return int(pdfinfo_from_path(file_path, poppler_path=_get_poppler_path())['Pages'])
+
+
+def load_image_content(file_path, dpi=None, page=None):
+    """
+    Sınav dosyasını Vision'a gönderilecek görüntü baytlarına dönüştürür.
+    PDF'lerin yalnızca istenen sayfası (varsayılan ilk sayfa) render edilir ve
+    diske yazılmadan bellekte JPEG'e çevrilir.
+    """
+    if not file_path.lower().endswith('.pdf'):
+        with io.open(file_path, 'rb') as image_file:
+            return image_file.read()
+
+    buffer = io.BytesIO()
+    render_pdf_page(file_path, dpi=dpi, page=page).save(buffer, format='JPEG')
+    return buffer.getvalue()
 
 
-def cleanup_temp_files():
-    """Geçici dosyaları temizler"""
-    if os.path.exists("temp_image.jpg"):
-        os.remove("temp_image.jpg")
+def render_pdf_page(file_path, dpi=None, page=None):
+    """PDF'in istenen sayfasını (varsayılan ilk sayfa) PIL görüntüsü olarak render eder"""
+    page = page or OCR_SETTINGS['pdf_page']
+    images = convert_from_path(
+        file_path,
+        dpi=dpi or get_pdf_dpi(),
+        first_page=page,
+        last_page=page,
+        poppler_path=_get_poppler_path()
+    )
+    return images[0]
+
+
+def parse_exam_text(text, course_code, semester):
+    """OCR metnini exam_parser ile ayrıştırıp process_exam_files'ın döndürdüğü sözlük olarak döndürür"""
+    parsed = exam_parser.parse_exam_text(text)
+    for warning in parsed.warnings:
+        print(f"Uyarı: {warning}")
+    return parsed.to_dict(course_code, semester)
+
+
+def _process_exam_file_batch(sources, course_code, semester, backend, cache=None, preprocess=None):
+    """
+    Bir grup dosyayı/sayfayı görüntüye dönüştürür, OCR motorunun tek bir recognize()
+    çağrısıyla okur ve ayrıştırır. Önbellekte bulunan kaynaklar OCR'a gönderilmez.
+    """
+    ocr_settings = get_ocr_settings(preprocess, backend)
+    results = [None] * len(sources)
+    cache_keys = [None] * len(sources)
+    pending = []  # Önbellekte bulunamayan kaynakların indeksleri
+
+    for i, source in enumerate(sources):
+        file_path, page = split_source(source)
+        if cache:
+            try:
+                cache_keys[i] = ocr_cache_key(file_path, ocr_settings, page=page)
+                entry = cache.get(cache_keys[i])
+                if entry:
+                    results[i] = _parse_cached_entry(entry, course_code, semester)
+                    continue
+            except Exception as e:
+                print(f"OCR önbelleği okunamadı ({describe_source(source)}): {str(e)}")
+        pending.append(i)
+
+    if not pending:
+        return results
+
+    contents = []
+    for i in pending:
+        file_path, page = split_source(sources[i])
+        try:
+            contents.append(preprocessing.preprocess_image(load_image_content(file_path, page=page), preprocess))
+        except Exception as e:
+            print(f"Dosya okunamadı ({describe_source(sources[i])}): {str(e)}")
+            contents.append(None)
+
+    try:
+        pages = backend.recognize(contents)
+    except Exception as e:
+        print(f"OCR işlemi sırasında hata oluştu: {str(e)}")
+        return results
+
+    for i, ocr_page in zip(pending, pages):
+        if ocr_page is None:
+            continue
+        try:
+            results[i] = parse_exam_text(ocr_page.text, course_code, semester)
+        except Exception as e:
+            print(f"OCR metni ayrıştırılamadı ({describe_source(sources[i])}): {str(e)}")
+            continue
+        if cache_keys[i]:
+            _store_cached_result(cache, cache_keys[i], ocr_page.text, results[i])
+    return results
+
+
+def process_exam_files(sources, course_code, semester, max_workers=4, batch_size=16, transport=None,
+                       cache=None, preprocess=None, backend=None):
+    """
+    Birden fazla sınav kağıdını sınırlı bir iş parçacığı havuzunda paralel işler.
+    Kaynaklar dosya yolu ya da toplu taramalar için (dosya yolu, sayfa no) ikilisidir.
+    preprocess verilirse görüntüler şablona göre ön işlemden geçirilir.
+    backend verilmezse Vision kullanılır; kaynaklar batch_size'lık gruplara bölünür ve
+    her grup tek bir batch_annotate_images çağrısıyla okunur. Sayfalar yalnızca kendi
+    grubu işlenirken render edilir.
+    Sonuçlar kaynak sırasıyla döner; okunamayanlar için None döner.
+    """
+    if not sources:
+        return []
+
+    backend = backend or VisionBackend(batch_size=batch_size, transport=transport)
+    batches = [
+        sources[start:start + backend.batch_size]
+        for start in range(0, len(sources), backend.batch_size)
+    ]
+
+    max_workers = max(1, min(max_workers, len(batches)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        batch_results = executor.map(
+            lambda batch: _process_exam_file_batch(batch, course_code, semester, backend, cache, preprocess),
+            batches
+        )
+        return [result for results in batch_results for result in results]